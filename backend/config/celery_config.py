@@ -24,4 +24,7 @@ app.autodiscover_tasks(['backend.tasks'])
 # 任务序列化配置
 app.conf.task_serializer = 'json'
 app.conf.result_serializer = 'json'
-app.conf.accept_content = ['json']
\ No newline at end of file
+app.conf.accept_content = ['json']
+
+# worker发送任务事件（相当于 celery worker -E）：API进程据此推送任务状态变化，不轮询结果后端
+app.conf.worker_send_task_events = True
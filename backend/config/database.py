@@ -1,8 +1,24 @@
+import codecs
+import ctypes
+import ctypes.util
+import io
 import os
-import pandas as pd
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+import numpy as np
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional, Dict
+from typing import TYPE_CHECKING, Any, Iterator, List, Optional, Dict, Tuple, Union
+from backend.config.metrics import metrics, sample, timed
+from backend.config.snapshot import (SNAPSHOT_ENABLED, key_matches_file, load_snapshot, read_appended,
+                                     resolve_snapshot_key, save_snapshot, snapshot_build_lock)
+
+if TYPE_CHECKING:
+    import pandas as pd  # 运行时在解析CSV的函数内延迟导入：由快照映射启动时无需加载pandas
 
 
 # --------------------------
@@ -11,29 +27,95 @@ from typing import List, Optional, Dict
 def get_root_dir() -> str:
     """获取项目根目录（与backend同级的目录）"""
     current_file = os.path.abspath(__file__)
-    """直接返回容器工作目录 /app（无需多级跳转）"""
-    return os.path.abspath("/app")
+    """直接返回容器工作目录 /app（无需多级跳转），可用 EV_DATA_ROOT 覆盖（基准测试/本地调试）"""
+    return os.path.abspath(os.getenv("EV_DATA_ROOT", "/app"))
 
 
-def load_csv_data(file_name: Optional[str] = None) -> pd.DataFrame:
-    """读取根目录下的CSV文件，处理编码和路径问题"""
-    root_dir = get_root_dir()
-    file_name = file_name or "Electric_Vehicle_Population_Datas.csv"
-    file_path = os.path.join(root_dir,"data",file_name)
+DEFAULT_CSV_NAME = "Electric_Vehicle_Population_Datas.csv"
+
+
+def get_csv_path(file_name: Optional[str] = None) -> str:
+    """解析CSV文件的绝对路径，并校验文件存在且为CSV格式"""
+    file_name = file_name or DEFAULT_CSV_NAME
+    file_path = os.path.join(get_root_dir(), "data", file_name)
 
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"根目录下未找到文件：{file_path}")
     if not file_path.endswith(".csv"):
         raise ValueError("仅支持CSV文件格式")
+    return file_path
+
+
+# 兼容不同系统导出的CSV编码（按顺序尝试，latin-1可解码任意字节，作为兜底）
+ENCODING_CANDIDATES = ("utf-8", "gbk", "latin-1")
+SNIFF_BYTES = 64 * 1024  # 编码探测读取的前缀大小
+
+
+def detect_encoding(file_path: str, sample_size: int = SNIFF_BYTES) -> str:
+    """根据文件前缀探测编码，避免对整个文件逐个编码重复解析"""
+    with open(file_path, "rb") as f:
+        sample = f.read(sample_size)
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    for encoding in ENCODING_CANDIDATES:
+        try:
+            sample.decode(encoding)
+            return encoding
+        except UnicodeDecodeError as e:
+            # 前缀可能恰好截断了一个多字节字符，末尾几个字节处的错误不代表编码不符
+            if len(sample) == sample_size and e.start >= sample_size - 4:
+                return encoding
+    return ENCODING_CANDIDATES[-1]
+
+
+def _read_csv_typed(source: Union[str, bytes], encoding: str) -> "pd.DataFrame":
+    """只读取记录模型映射的列，并按显式类型解析（分类列/可空整数/可空浮点）；source为文件路径或CSV字节"""
+    import pandas as pd
+    wanted = set(CSV_DTYPES)
+
+    def _read(dtype: Dict[str, str]) -> "pd.DataFrame":
+        handle = io.BytesIO(source) if isinstance(source, bytes) else source
+        return pd.read_csv(handle, encoding=encoding, usecols=lambda column: column in wanted, dtype=dtype)
+
+    try:
+        return _read(CSV_DTYPES)
+    except UnicodeDecodeError:
+        raise
+    except (ValueError, TypeError):
+        # 数值列混有非数字内容时退回按字符串读取，由列式存储统一做容错转换
+        fallback = {column: ("string" if column in NUMERIC_FIELDS.values() else dtype)
+                    for column, dtype in CSV_DTYPES.items()}
+        return _read(fallback)
+
+
+def load_csv_data(file_name: Optional[str] = None) -> "pd.DataFrame":
+    """读取根目录下的CSV文件，处理编码和路径问题"""
+    return read_ev_csv(get_csv_path(file_name))
+
 
-    # 尝试多种编码兼容不同系统的CSV文件
-    encodings = ["utf-8", "gbk", "latin-1"]
+@timed("load")
+def read_ev_csv(file_path: str) -> "pd.DataFrame":
+    """按探测到的编码、显式类型和列裁剪解析任意路径的电动汽车CSV"""
+    # 先按探测到的编码解析；探测前缀之后出现异常字节时，再按其余候选编码兜底
+    detected = detect_encoding(file_path)
+    encodings = [detected] + [encoding for encoding in ENCODING_CANDIDATES if encoding != detected]
     for encoding in encodings:
         try:
-            return pd.read_csv(file_path, encoding=encoding)
+            return _read_csv_typed(file_path, encoding)
         except UnicodeDecodeError:
             continue
-    raise UnicodeDecodeError("无法解析CSV文件（尝试多种编码失败）")
+    raise ValueError("无法解析CSV文件（尝试多种编码失败）")
+
+
+def read_ev_csv_tail(file_path: str, header: bytes, tail: bytes) -> Optional["pd.DataFrame"]:
+    """解析CSV末尾追加的行（拼上表头行后按与全量解析相同的列裁剪和类型解析）
+
+    只按文件前缀探测到的编码解析：追加部分与已导入部分编码不一致时返回None，由调用方全量重建。
+    """
+    try:
+        return _read_csv_typed(header + tail, detect_encoding(file_path))
+    except UnicodeDecodeError:
+        return None
 
 
 # --------------------------
@@ -72,17 +154,1000 @@ class ElectricVehicleRecord:
     vehicle_count: int = 1
 
 
+# --------------------------
+# 列式记录存储（替代ElectricVehicleRecord对象列表）
+# --------------------------
+# 字符串字段 -> CSV列名（字典编码：每列一个int32编码数组 + 去重后的取值表）
+STRING_FIELDS: Dict[str, str] = {
+    "vin_1_to_10": "VIN (1-10)",
+    "county": "County",
+    "city": "City",
+    "state": "State",
+    "make": "Make",
+    "model": "Model",
+    "ev_type": "Electric Vehicle Type",
+    "cafv_eligibility": "Clean Alternative Fuel Vehicle (CAFV) Eligibility",
+    "electric_utility": "Electric Utility",
+}
+# 数值字段 -> CSV列名（NumPy定长数组）
+NUMERIC_FIELDS: Dict[str, str] = {
+    "model_year": "Model Year",
+    "electric_range": "Electric Range",
+    "base_msrp": "Base MSRP",
+    "vehicle_count": "Vehicle Count",
+}
+# CSV解析类型：低基数字符串列读为分类；整数列用可空整数，浮点列用NaN表示缺失
+# （pandas的可空Float64解析明显慢于原生float64，而NaN已足以表达缺失）
+CSV_DTYPES: Dict[str, str] = {
+    "VIN (1-10)": "string",
+    "County": "category",
+    "City": "category",
+    "State": "category",
+    "Make": "category",
+    "Model": "category",
+    "Electric Vehicle Type": "category",
+    "Clean Alternative Fuel Vehicle (CAFV) Eligibility": "category",
+    "Electric Utility": "category",
+    "Model Year": "Int16",
+    "Electric Range": "float64",
+    "Base MSRP": "float64",
+    "Vehicle Count": "Int32",
+}
+UNKNOWN_STATE = "未知"  # 州字段为空时的占位值（与原记录模型保持一致）
+MISSING_YEAR = 0  # model_year为int16数组，0表示缺失
+MISSING_CODE = -1  # 字符串编码数组中-1表示缺失（解码为None）
+RECORD_FIELDS: Tuple[str, ...] = tuple(ElectricVehicleRecord.__dataclass_fields__)
+
+
+def _encode_strings(series: "pd.Series", fill: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """字符串列字典编码：去除首尾空白，空串视为缺失
+
+    分类列只在类别上做清洗和去重，再把行编码映射过去，无需逐行处理字符串。
+    """
+    import pandas as pd
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = pd.Series(series.cat.categories).astype("string").str.strip()
+        category_codes, uniques = pd.factorize(categories.mask(categories == ""), use_na_sentinel=True)
+        # 末尾追加-1，使原本缺失的行（编码-1）映射后仍为-1
+        field_codes = np.append(category_codes, MISSING_CODE).take(series.cat.codes.to_numpy())
+    else:
+        values = series.astype("string").str.strip()
+        field_codes, uniques = pd.factorize(values.mask(values == ""), use_na_sentinel=True)
+    field_codes = field_codes.astype(np.int32)
+    vocab = np.asarray(uniques, dtype=object)
+
+    missing = field_codes == MISSING_CODE
+    if fill is not None and missing.any():
+        existing = np.flatnonzero(vocab == fill)
+        if len(existing):
+            fill_code = existing[0]
+        else:
+            vocab, fill_code = np.append(vocab, fill).astype(object), len(vocab)
+        field_codes[missing] = fill_code
+    return field_codes, vocab
+
+
+class EVRecordStore:
+    """列式电动汽车数据存储
+
+    - 字符串列做字典编码：codes为int32数组，vocab为去重后的取值（object数组）
+    - 数值列为NumPy数组：model_year(int16, 0=缺失)、electric_range/base_msrp(float64, NaN=缺失)、
+      vehicle_count(int32, 缺失按1计)
+    - 行号即数组下标，对外ID为行号+1（与原get_records的ID规则一致）
+    """
+
+    def __init__(self, codes: Dict[str, np.ndarray], vocabs: Dict[str, np.ndarray],
+                 numerics: Dict[str, np.ndarray], folded: Optional[Dict[str, np.ndarray]] = None):
+        self._codes = codes
+        self._vocabs = vocabs
+        self._numerics = numerics
+        self.size = len(numerics["vehicle_count"])
+        # 解码表：在取值表末尾追加None，使编码-1可直接通过take解码为None
+        self._decode_tables = {
+            field: np.append(vocab, None).astype(object) for field, vocab in vocabs.items()
+        }
+        self._folded_vocabs: Dict[str, np.ndarray] = {}
+        self._folded_codes: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._folded_display: Dict[str, np.ndarray] = {}
+        self._folded_rows = folded or {}  # 快照中已算好的逐行小写编码（映射自共享文件）
+
+    @classmethod
+    @timed("convert")
+    def from_dataframe(cls, df: "pd.DataFrame") -> "EVRecordStore":
+        """由CSV DataFrame整列构建存储（向量化转换，无逐行iterrows）"""
+        import pandas as pd
+        codes, vocabs, numerics = {}, {}, {}
+        n_rows = len(df)
+
+        for field, column in STRING_FIELDS.items():
+            if column in df.columns:
+                values = df[column]
+            else:
+                values = pd.Series(pd.NA, index=df.index, dtype="string")
+            # 州字段确保非空（缺失时使用占位值）
+            fill = UNKNOWN_STATE if field == "state" else None
+            codes[field], vocabs[field] = _encode_strings(values, fill)
+
+        for field, column in NUMERIC_FIELDS.items():
+            if column in df.columns:
+                values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            else:
+                values = np.full(n_rows, np.nan)
+            if field == "model_year":
+                numerics[field] = np.nan_to_num(np.trunc(values), nan=MISSING_YEAR).astype(np.int16)
+            elif field == "vehicle_count":
+                # 车辆数量：优先使用CSV中的列，无则默认1
+                numerics[field] = np.nan_to_num(np.trunc(values), nan=1).astype(np.int32)
+            else:
+                numerics[field] = values
+        return cls(codes, vocabs, numerics)
+
+    def append(self, tail: "EVRecordStore") -> "EVRecordStore":
+        """在末尾追加另一存储的行，返回新存储（自身不变）
+
+        取值表只在末尾追加新出现的取值，已有行的编码不变（索引、聚合表可在此基础上增量合并）。
+        """
+        codes, vocabs, numerics = {}, {}, {}
+        for field, vocab in self._vocabs.items():
+            lookup = {value: code for code, value in enumerate(vocab)}
+            for value in tail.vocab(field):
+                lookup.setdefault(value, len(lookup))
+            vocabs[field] = np.array(list(lookup), dtype=object)
+            remap = np.array([lookup[value] for value in tail.vocab(field)] + [MISSING_CODE], dtype=np.int32)
+            codes[field] = np.concatenate((self._codes[field], remap.take(tail.codes(field))))
+        for field, values in self._numerics.items():
+            numerics[field] = np.concatenate((values, tail.values(field)))
+        return EVRecordStore(codes, vocabs, numerics)
+
+    def tail(self, start: int) -> "EVRecordStore":
+        """从start行起的子存储（共享取值表，数组为视图），行号从0重新计"""
+        return EVRecordStore({field: codes[start:] for field, codes in self._codes.items()}, self._vocabs,
+                             {field: values[start:] for field, values in self._numerics.items()})
+
+    def columns(self) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+        """全部列数组（编码、取值表、数值列），用于写出快照"""
+        return self._codes, self._vocabs, self._numerics
+
+    def derived_arrays(self) -> Dict[str, np.ndarray]:
+        """派生数组（逐行小写编码），随快照写出，其他worker直接映射而不必重算"""
+        return {f"folded.{field}": self.folded_codes(field)[0] for field in self._codes}
+
+    # ---- 列访问 ----
+    def codes(self, field: str) -> np.ndarray:
+        """字符串列的编码数组（-1表示缺失）"""
+        return self._codes[field]
+
+    def vocab(self, field: str) -> np.ndarray:
+        """字符串列的取值表（编码 -> 原始字符串）"""
+        return self._vocabs[field]
+
+    def folded_vocab(self, field: str) -> np.ndarray:
+        """取值表的小写形式（惰性计算，用于不区分大小写的匹配）"""
+        folded = self._folded_vocabs.get(field)
+        if folded is None:
+            folded = np.array([value.lower() for value in self._vocabs[field]], dtype=object)
+            self._folded_vocabs[field] = folded
+        return folded
+
+    def folded_codes(self, field: str) -> Tuple[np.ndarray, np.ndarray]:
+        """把取值编码映射为小写取值编码：返回（逐行小写编码，小写取值表），惰性计算"""
+        cached = self._folded_codes.get(field)
+        if cached is None:
+            import pandas as pd
+            fold_codes, fold_vocab = pd.factorize(self.folded_vocab(field))
+            mapped = self._folded_rows.get(field)
+            if mapped is None:
+                row_codes = self._codes[field]
+                mapped = np.where(row_codes == MISSING_CODE, MISSING_CODE,
+                                  fold_codes.astype(np.int32).take(row_codes, mode="clip")).astype(np.int32)
+            cached = (mapped, np.asarray(fold_vocab, dtype=object))
+            self._folded_codes[field] = cached
+        return cached
+
+    def folded_display(self, field: str) -> np.ndarray:
+        """小写取值编码 -> 展示值（取值表中第一个折叠为该小写取值的原始写法），惰性计算"""
+        display = self._folded_display.get(field)
+        if display is None:
+            first: Dict[str, str] = {}
+            for value in self._vocabs[field]:
+                first.setdefault(value.lower(), value)
+            display = np.array([first[value] for value in self.folded_codes(field)[1]], dtype=object)
+            self._folded_display[field] = display
+        return display
+
+    def values(self, field: str) -> np.ndarray:
+        """数值列的原始数组"""
+        return self._numerics[field]
+
+    def decode(self, field: str, field_codes: np.ndarray) -> np.ndarray:
+        """把编码数组解码为字符串数组（缺失为None）"""
+        return self._decode_tables[field].take(field_codes)
+
+    def vocab_rank(self, field: str, folded: bool = False) -> np.ndarray:
+        """取值编码 -> 该取值在排序后取值表中的名次（用于在编码上直接排序）"""
+        vocab = self.folded_vocab(field) if folded else self._vocabs[field]
+        order = np.argsort(vocab, kind="stable")
+        rank = np.empty(len(vocab), dtype=np.int64)
+        rank[order] = np.arange(len(vocab))
+        return rank
+
+    def match_codes(self, field: str, value: str) -> np.ndarray:
+        """返回与value（不区分大小写）相等的所有取值编码"""
+        return np.flatnonzero(self.folded_vocab(field) == value.lower()).astype(np.int32)
+
+    def value(self, field: str, idx: int) -> Any:
+        """读取单个单元格，返回与ElectricVehicleRecord字段一致的Python类型"""
+        if field in self._codes:
+            code = self._codes[field][idx]
+            return None if code == MISSING_CODE else self._vocabs[field][code]
+        if field == "id":
+            return int(idx) + 1
+        raw = self._numerics[field][idx]
+        if field == "model_year":
+            return None if raw == MISSING_YEAR else int(raw)
+        if field == "vehicle_count":
+            return int(raw)
+        return None if np.isnan(raw) else float(raw)
+
+    # ---- 行访问 ----
+    def row(self, idx: int) -> "EVRecordView":
+        return EVRecordView(self, idx)
+
+    def record(self, idx: int) -> ElectricVehicleRecord:
+        """物化单行为ElectricVehicleRecord（仅供确实需要对象的调用方使用）"""
+        return ElectricVehicleRecord(**{name: self.value(name, idx) for name in RECORD_FIELDS})
+
+    def rows(self, ids: Optional[np.ndarray] = None) -> "EVRecordSet":
+        return EVRecordSet(self, ids)
+
+    @property
+    def nbytes(self) -> int:
+        """数组部分占用的字节数（不含取值表中的字符串对象）"""
+        return (sum(arr.nbytes for arr in self._codes.values())
+                + sum(arr.nbytes for arr in self._numerics.values()))
+
+
+class EVRecordView:
+    """单行的惰性视图：属性访问时才从列中读取，接口与ElectricVehicleRecord一致"""
+    __slots__ = ("_store", "_idx")
+
+    def __init__(self, store: EVRecordStore, idx: int):
+        self._store = store
+        self._idx = int(idx)
+
+    def __getattr__(self, name: str) -> Any:
+        if name not in RECORD_FIELDS:
+            raise AttributeError(name)
+        return self._store.value(name, self._idx)
+
+    def to_record(self) -> ElectricVehicleRecord:
+        return self._store.record(self._idx)
+
+    def __repr__(self) -> str:
+        return repr(self.to_record())
+
+
+class EVRecordSet:
+    """行集合：存储 + 行号数组（None表示全部行）
+
+    支持len/迭代/下标/切片，迭代时产出EVRecordView；需要批量计算时通过
+    codes()/values()直接拿到所选行的列数组。
+    """
+
+    def __init__(self, store: EVRecordStore, ids: Optional[np.ndarray] = None):
+        self.store = store
+        self.ids = ids
+
+    def __len__(self) -> int:
+        return self.store.size if self.ids is None else len(self.ids)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __iter__(self) -> Iterator[EVRecordView]:
+        if self.ids is None:
+            return (EVRecordView(self.store, idx) for idx in range(self.store.size))
+        return (EVRecordView(self.store, idx) for idx in self.ids)
+
+    def __getitem__(self, item: Union[int, slice]) -> Union[EVRecordView, "EVRecordSet"]:
+        if isinstance(item, slice):
+            return EVRecordSet(self.store, self.row_ids()[item])
+        return EVRecordView(self.store, self.row_ids()[item])
+
+    def row_ids(self) -> np.ndarray:
+        if self.ids is None:
+            return np.arange(self.store.size)
+        return self.ids
+
+    def codes(self, field: str) -> np.ndarray:
+        field_codes = self.store.codes(field)
+        return field_codes if self.ids is None else field_codes[self.ids]
+
+    def values(self, field: str) -> np.ndarray:
+        field_values = self.store.values(field)
+        return field_values if self.ids is None else field_values[self.ids]
+
+    def column(self, field: str) -> np.ndarray:
+        """所选行的字符串列（已解码，缺失为None）"""
+        return self.store.decode(field, self.codes(field))
+
+    @timed("filter")
+    def where(self, field: str, value: str) -> "EVRecordSet":
+        """在当前集合内按字符串字段过滤（不区分大小写）"""
+        # 取值表上的布尔查找表（末位对应缺失编码-1），按编码一次取出掩码，无需isin排序
+        matches = np.append(self.store.folded_vocab(field) == value.lower(), False)
+        return EVRecordSet(self.store, self.row_ids()[matches.take(self.codes(field))])
+
+    @timed("distinct")
+    def distinct(self, field: str) -> List[str]:
+        """所选行中某字符串列的去重取值（排序，不含缺失）"""
+        present = np.unique(self.codes(field))
+        present = present[present != MISSING_CODE]
+        return sorted(self.store.vocab(field)[present].tolist())
+
+    def total_vehicles(self) -> int:
+        return int(self.values("vehicle_count").sum(dtype=np.int64))
+
+    def count_present(self, field: str) -> int:
+        """所选行中某字符串列非空的行数"""
+        return int(np.count_nonzero(self.codes(field) != MISSING_CODE))
+
+    def weighted_counts(self, field: str) -> Dict[str, int]:
+        """按字符串列分组累加vehicle_count（按取值首次出现的顺序，不含缺失）"""
+        field_codes = self.codes(field)
+        present = field_codes != MISSING_CODE
+        field_codes = field_codes[present]
+        if not len(field_codes):
+            return {}
+        sums = np.bincount(field_codes, weights=self.values("vehicle_count")[present],
+                           minlength=len(self.store.vocab(field)))
+        uniques, first_seen = np.unique(field_codes, return_index=True)
+        vocab = self.store.vocab(field)
+        return {vocab[code]: int(sums[code]) for code in uniques[np.argsort(first_seen)]}
+
+    def to_records(self) -> List[ElectricVehicleRecord]:
+        return [self.store.record(idx) for idx in self.row_ids()]
+
+    def chunks(self, size: int) -> Iterator["EVRecordSet"]:
+        """按size行切分为若干子集合（行号数组的切片视图，不复制数据）"""
+        row_ids = self.row_ids()
+        for start in range(0, len(row_ids), size):
+            yield EVRecordSet(self.store, row_ids[start:start + size])
+
+    def to_columns(self, fields: Tuple[str, ...] = RECORD_FIELDS) -> Dict[str, List[Any]]:
+        """所选行按列批量解码为Python列表（取值类型与ElectricVehicleRecord一致，缺失为None）"""
+        columns: Dict[str, List[Any]] = {}
+        for field in fields:
+            if field == "id":
+                columns[field] = (self.row_ids() + 1).tolist()
+            elif field in STRING_FIELDS:
+                columns[field] = self.column(field).tolist()
+            elif field == "model_year":
+                years = self.values(field)
+                columns[field] = np.where(years == MISSING_YEAR, None, years.astype(object)).tolist()
+            elif field == "vehicle_count":
+                columns[field] = self.values(field).tolist()
+            else:
+                values = self.values(field)
+                columns[field] = np.where(np.isnan(values), None, values.astype(object)).tolist()
+        return columns
+
+
+# --------------------------
+# 二级索引（不区分大小写的键 -> 行号数组）
+# --------------------------
+# 单列与组合索引：键为小写后的取值元组
+INDEX_KEYS: Tuple[Tuple[str, ...], ...] = (
+    ("make",), ("model",), ("state",), ("city",), ("county",), ("ev_type",),
+    ("make", "model"), ("state", "city"), ("state", "county"), ("state", "city", "county"),
+)
+
+
+class EVDataIndex:
+    """基于列式存储一次性构建的哈希索引
+
+    每个索引由一个按键排序的行号数组（int32）加一个 键 -> (起, 止) 的字典组成，
+    查找返回该数组的切片视图，复杂度为O(匹配数)；同一键内行号保持升序。
+    传入base（store为base.store末尾追加行后的存储）时，只对追加的行排序并归并进base的排序结果。
+    """
+
+    def __init__(self, store: EVRecordStore, keys: Tuple[Tuple[str, ...], ...] = INDEX_KEYS,
+                 arrays: Optional[Dict[str, np.ndarray]] = None, base: Optional["EVDataIndex"] = None):
+        self.store = store
+        self._order: Dict[Tuple[str, ...], np.ndarray] = {}
+        self._bounds: Dict[Tuple[str, ...], Tuple[np.ndarray, np.ndarray]] = {}
+        self._spans: Dict[Tuple[str, ...], Dict[Tuple[str, ...], Tuple[int, int]]] = {}
+        folded = {field: store.folded_codes(field) for spec in keys for field in spec}
+        arrays = arrays or {}
+        for spec in keys:
+            name = self._array_name(spec)
+            if f"{name}.order" in arrays:
+                # 快照中已有排序结果：直接映射共享数组，只在本进程重建小的键->区间字典
+                self._order[spec] = arrays[f"{name}.order"]
+                self._bounds[spec] = (arrays[f"{name}.keys"], arrays[f"{name}.starts"])
+            elif base is not None:
+                self._merge(spec, folded, base)
+            else:
+                self._sort(spec, folded)
+            self._spans[spec] = self._build_spans(spec, folded)
+
+    @staticmethod
+    def _array_name(spec: Tuple[str, ...]) -> str:
+        return "index." + "+".join(spec)
+
+    def _combined_keys(self, spec: Tuple[str, ...], folded: Dict[str, Tuple[np.ndarray, np.ndarray]],
+                       start: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """从start行起按键稳定排序：返回（排序后的行号，对应的组合键）"""
+        # 多列编码合成一个int64组合键（任一列缺失的行不进入索引）
+        combined = np.zeros(self.store.size - start, dtype=np.int64)
+        valid = np.ones(self.store.size - start, dtype=bool)
+        for field in spec:
+            row_codes, vocab = folded[field]
+            row_codes = row_codes[start:]
+            valid &= row_codes != MISSING_CODE
+            combined = combined * len(vocab) + row_codes
+        row_ids = np.flatnonzero(valid)
+        combined = combined[row_ids]
+        order = np.argsort(combined, kind="stable")
+        return row_ids[order] + start, combined[order]
+
+    def _set_sorted(self, spec: Tuple[str, ...], row_ids: np.ndarray, sorted_keys: np.ndarray) -> None:
+        self._order[spec] = row_ids.astype(np.int32)
+        # 每个键的组合键值及其在排序数组中的起点（末尾追加总长度作为最后一组的终点）
+        if len(sorted_keys):
+            starts = np.concatenate(([0], np.flatnonzero(np.diff(sorted_keys)) + 1))
+        else:
+            starts = np.empty(0, dtype=np.int64)
+        self._bounds[spec] = (sorted_keys[starts], np.append(starts, len(sorted_keys)).astype(np.int64))
+
+    def _sort(self, spec: Tuple[str, ...], folded: Dict[str, Tuple[np.ndarray, np.ndarray]]) -> None:
+        self._set_sorted(spec, *self._combined_keys(spec, folded))
+
+    def _merge(self, spec: Tuple[str, ...], folded: Dict[str, Tuple[np.ndarray, np.ndarray]],
+               base: "EVDataIndex") -> None:
+        """追加行归并：已有行的小写编码不变，只需把base的组合键换算到新的取值表长度（不改变键序），
+        再把排好序的追加行按键插入（同一键内追加行排在已有行之后，行号仍保持升序）"""
+        base_keys, base_starts = base._bounds[spec]
+        keys = np.zeros(len(base_keys), dtype=np.int64)
+        rest = base_keys
+        for i in range(len(spec) - 1, -1, -1):
+            field = spec[i]
+            rest, code = np.divmod(rest, len(base.store.folded_codes(field)[1]))
+            keys += code * int(np.prod([len(folded[f][1]) for f in spec[i + 1:]], dtype=np.int64))
+        row_keys = np.repeat(keys, np.diff(base_starts))
+        tail_rows, tail_keys = self._combined_keys(spec, folded, start=base.store.size)
+        positions = np.searchsorted(row_keys, tail_keys, side="right")
+        self._set_sorted(spec, np.insert(base._order[spec], positions, tail_rows),
+                         np.insert(row_keys, positions, tail_keys))
+
+    def _build_spans(self, spec: Tuple[str, ...],
+                     folded: Dict[str, Tuple[np.ndarray, np.ndarray]]) -> Dict[Tuple[str, ...], Tuple[int, int]]:
+        key_values, bounds = self._bounds[spec]
+        spans = {}
+        for i, key in enumerate(key_values.tolist()):
+            parts = []
+            for field in reversed(spec):
+                vocab = folded[field][1]
+                key, code = divmod(key, len(vocab))
+                parts.append(vocab[code])
+            spans[tuple(reversed(parts))] = (int(bounds[i]), int(bounds[i + 1]))
+        return spans
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """索引数组（排序后的行号、键值、区间起点），随快照写出供其他worker映射"""
+        arrays = {}
+        for spec, order in self._order.items():
+            name = self._array_name(spec)
+            arrays[f"{name}.order"] = order
+            arrays[f"{name}.keys"], arrays[f"{name}.starts"] = self._bounds[spec]
+        return arrays
+
+    @timed("index_lookup")
+    def lookup(self, fields: Tuple[str, ...], values: Tuple[str, ...]) -> np.ndarray:
+        """按（不区分大小写的）键查找行号，未命中返回空数组"""
+        span = self._spans[fields].get(tuple(value.lower() for value in values))
+        if span is None:
+            return np.empty(0, dtype=np.int32)
+        return self._order[fields][span[0]:span[1]]
+
+    def keys(self, fields: Tuple[str, ...]) -> List[Tuple[str, ...]]:
+        """某索引下全部（小写）键"""
+        return list(self._spans[fields])
+
+
+# --------------------------
+# 预计算聚合立方体（区域/车型统计O(1)查表）
+# --------------------------
+# 立方体维度：区域/品牌/车型按小写编码（查询不区分大小写），年份按数值，
+# 电动车类型与州保留原始编码（分布统计的键沿用CSV原始写法）
+CUBE_FOLDED_DIMS: Tuple[str, ...] = ("state", "county", "city", "make", "model")
+REGION_KEYS: Tuple[Tuple[str, ...], ...] = (
+    ("state",), ("state", "city"), ("state", "county"), ("state", "city", "county"),
+)
+
+
+DENSE_GROUP_LIMIT = 1 << 20  # 合成键取值范围在此以内（或不超过行数）时按稠密计数表分组
+
+
+def group_cells(columns: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """按多列分组：返回（每组的键行，逐元素的组号）
+
+    各列按取值范围做混合进制合成一个int64键后一维去重，比按行去重快一个数量级；
+    合成键的取值范围不超过 DENSE_GROUP_LIMIT 时用bincount直接映射（O(n)，免排序）；
+    取值范围乘积超出int64时退回按行去重。
+    """
+    columns = [np.asarray(column, dtype=np.int64) for column in columns]
+    if not len(columns[0]):
+        return np.empty((0, len(columns)), dtype=np.int64), np.empty(0, dtype=np.int64)
+    lows = [int(column.min()) for column in columns]
+    spans = [int(column.max()) - low + 1 for column, low in zip(columns, lows)]
+    if np.prod([float(span) for span in spans]) >= 2 ** 62:
+        keys, inverse = np.unique(np.stack(columns, axis=1), axis=0, return_inverse=True)
+        return keys, inverse.reshape(-1)
+
+    combined = np.zeros(len(columns[0]), dtype=np.int64)
+    for column, low, span in zip(columns, lows, spans):
+        combined = combined * span + (column - low)
+    key_range = int(np.prod([float(span) for span in spans]))
+    if key_range <= max(DENSE_GROUP_LIMIT, len(combined)):
+        unique_keys = np.flatnonzero(np.bincount(combined, minlength=key_range))
+        remap = np.empty(key_range, dtype=np.int64)
+        remap[unique_keys] = np.arange(len(unique_keys))
+        inverse = remap.take(combined)
+    else:
+        unique_keys, inverse = np.unique(combined, return_inverse=True)
+    keys = np.empty((len(unique_keys), len(columns)), dtype=np.int64)
+    for i in range(len(columns) - 1, -1, -1):
+        unique_keys, keys[:, i] = np.divmod(unique_keys, spans[i])
+        keys[:, i] += lows[i]
+    return keys, inverse.reshape(-1)
+
+
+def _merge_counts(base: Dict[Any, int], added: Dict[Any, int]) -> Dict[Any, int]:
+    """合并两个计数字典（已有键保持原顺序，新键依次追加在后）"""
+    merged = dict(base)
+    for key, count in added.items():
+        merged[key] = merged.get(key, 0) + count
+    return merged
+
+
+class EVAggregateCube:
+    """每个数据版本构建一次的聚合立方体
+
+    先把全部行按（州、县、市、品牌、车型、年份、电动车类型、原始州）归并为单元格，
+    每个单元格累计车辆数、记录数、有电力供应商的记录数、续航/价格的和与计数、
+    首次出现的行号；再由单元格汇总出区域表和车型表，接口查询时只做字典查找。
+    """
+
+    def __init__(self, store: EVRecordStore):
+        self.store = store
+        self.total_vehicles = int(store.values("vehicle_count").sum(dtype=np.int64))
+        self._regions: Dict[Tuple[str, ...], Dict[Tuple[str, ...], Dict[str, Any]]] = {}
+        self._models: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        if store.size:
+            self._build_cells()
+            for spec in REGION_KEYS:
+                self._regions[spec] = self._build_regions(spec)
+            self._models = self._build_models()
+            # 单元格数组只在构建期使用（规模接近行数），构建后释放，只保留汇总表
+            del self._cells, self._cell_keys
+
+    def _build_cells(self) -> None:
+        store = self.store
+        dims = [store.folded_codes(field)[0] for field in CUBE_FOLDED_DIMS]
+        dims += [store.values("model_year"), store.codes("ev_type"), store.codes("state")]
+        keys, inverse = group_cells(dims)
+        n_cells = len(keys)
+
+        ranges, prices = store.values("electric_range"), store.values("base_msrp")
+        has_range = ~np.isnan(ranges) & (ranges != 0)  # 0与缺失值不参与平均（与原逻辑一致）
+        has_price = ~np.isnan(prices) & (prices != 0)
+        first_row = np.full(n_cells, store.size, dtype=np.int64)
+        np.minimum.at(first_row, inverse, np.arange(store.size))
+
+        self._cell_keys = {name: keys[:, i] for i, name in enumerate(
+            CUBE_FOLDED_DIMS + ("model_year", "ev_type", "raw_state"))}
+        self._cells = {
+            "vehicles": np.bincount(inverse, weights=store.values("vehicle_count"), minlength=n_cells),
+            "records": np.bincount(inverse, minlength=n_cells),
+            "utility_records": np.bincount(
+                inverse, weights=store.codes("electric_utility") != MISSING_CODE, minlength=n_cells),
+            "range_sum": np.bincount(inverse, weights=np.where(has_range, ranges, 0), minlength=n_cells),
+            "range_n": np.bincount(inverse, weights=has_range, minlength=n_cells),
+            "msrp_sum": np.bincount(inverse, weights=np.where(has_price, prices, 0), minlength=n_cells),
+            "msrp_n": np.bincount(inverse, weights=has_price, minlength=n_cells),
+            "first_row": first_row,
+        }
+
+    def _sub_groups(self, spec: Tuple[str, ...], detail: str):
+        """把单元格按spec分组，并在组内按detail维度再细分，产出（组键，细分键，汇总）"""
+        valid = np.ones(len(self._cells["records"]), dtype=bool)
+        for field in spec:
+            valid &= self._cell_keys[field] != MISSING_CODE
+        cells = np.flatnonzero(valid)
+        keys, inverse = group_cells([self._cell_keys[field][cells] for field in spec + (detail,)])
+        n_groups = len(keys)
+        sums = {name: np.bincount(inverse, weights=self._cells[name][cells], minlength=n_groups)
+                for name in ("vehicles", "records", "utility_records", "range_sum", "range_n",
+                             "msrp_sum", "msrp_n")}
+        first_row = np.full(n_groups, self.store.size, dtype=np.int64)
+        np.minimum.at(first_row, inverse, self._cells["first_row"][cells])
+        sums["first_row"] = first_row
+        # 按首次出现的行号排序，保证分布字典的键顺序与逐行累加时一致
+        for g in np.argsort(first_row, kind="stable"):
+            group_key = tuple(self.store.folded_codes(field)[1][keys[g, i]] for i, field in enumerate(spec))
+            yield group_key, int(keys[g, -1]), {name: values[g] for name, values in sums.items()}
+
+    def _build_regions(self, spec: Tuple[str, ...]) -> Dict[Tuple[str, ...], Dict[str, Any]]:
+        ev_vocab = self.store.vocab("ev_type")
+        regions: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        for key, ev_code, sums in self._sub_groups(spec, "ev_type"):
+            region = regions.setdefault(key, {"vehicles": 0, "records": 0, "utility_records": 0,
+                                              "ev_type_distribution": {}})
+            region["vehicles"] += int(sums["vehicles"])
+            region["records"] += int(sums["records"])
+            region["utility_records"] += int(sums["utility_records"])
+            if ev_code != MISSING_CODE:
+                region["ev_type_distribution"][ev_vocab[ev_code]] = int(sums["vehicles"])
+        return regions
+
+    def _build_models(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        store = self.store
+        models: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for key, state_code, sums in self._sub_groups(("make", "model"), "raw_state"):
+            first_row = int(sums["first_row"])
+            model = models.get(key)
+            if model is None:
+                # 品牌/车型展示名取该车型首次出现的记录（与原first_record逻辑一致）
+                model = models[key] = {
+                    "make": store.value("make", first_row), "model": store.value("model", first_row),
+                    "first_row": first_row, "vehicles": 0, "records": 0,
+                    "range_sum": 0.0, "range_n": 0, "msrp_sum": 0.0, "msrp_n": 0, "states": {},
+                }
+            model["vehicles"] += int(sums["vehicles"])
+            model["records"] += int(sums["records"])
+            for name in ("range_sum", "msrp_sum"):
+                model[name] += float(sums[name])
+            for name in ("range_n", "msrp_n"):
+                model[name] += int(sums[name])
+            model["states"][store.vocab("state")[state_code]] = int(sums["vehicles"])
+
+        # 按年份、电动车类型细分的车辆数（年份升序；类型按首次出现顺序）
+        ev_vocab = store.vocab("ev_type")
+        for key, year, sums in self._sub_groups(("make", "model"), "model_year"):
+            if year != MISSING_YEAR:
+                models[key].setdefault("year_vehicles", {})[year] = int(sums["vehicles"])
+        for key, ev_code, sums in self._sub_groups(("make", "model"), "ev_type"):
+            if ev_code != MISSING_CODE:
+                models[key].setdefault("ev_type_vehicles", {})[ev_vocab[ev_code]] = int(sums["vehicles"])
+        for model in models.values():
+            model["year_vehicles"] = dict(sorted(model.get("year_vehicles", {}).items()))
+            model["ev_type_vehicles"] = model.get("ev_type_vehicles", {})
+            model["model_years"] = list(model["year_vehicles"])
+            model["ev_types"] = sorted(model["ev_type_vehicles"])
+        return models
+
+    def appended(self, store: EVRecordStore) -> "EVAggregateCube":
+        """store为self.store末尾追加行后的存储：只对追加的行建立立方体，再把计数合并进本立方体的副本
+
+        合并结果与对全部行重建一致（分布字典的键仍按首次出现顺序），本立方体不被修改。
+        """
+        start = self.store.size
+        tail = EVAggregateCube(store.tail(start))
+        cube = EVAggregateCube.__new__(EVAggregateCube)
+        cube.store = store
+        cube.total_vehicles = self.total_vehicles + tail.total_vehicles
+        cube._regions = {}
+        for spec in REGION_KEYS:
+            regions = dict(self._regions.get(spec, {}))
+            for key, added in tail._regions.get(spec, {}).items():
+                region = regions.get(key)
+                if region is not None:
+                    added = {name: region[name] + added[name] for name in ("vehicles", "records", "utility_records")}
+                    added["ev_type_distribution"] = _merge_counts(region["ev_type_distribution"],
+                                                                  tail._regions[spec][key]["ev_type_distribution"])
+                regions[key] = added
+            cube._regions[spec] = regions
+        cube._models = dict(self._models)
+        for key, added in tail._models.items():
+            model = cube._models.get(key)
+            if model is None:
+                added["first_row"] += start
+                cube._models[key] = added
+                continue
+            merged = dict(model)
+            for name in ("vehicles", "records", "range_sum", "range_n", "msrp_sum", "msrp_n"):
+                merged[name] = model[name] + added[name]
+            for name in ("states", "ev_type_vehicles"):
+                merged[name] = _merge_counts(model[name], added[name])
+            merged["year_vehicles"] = dict(sorted(_merge_counts(model["year_vehicles"], added["year_vehicles"]).items()))
+            merged["model_years"] = list(merged["year_vehicles"])
+            merged["ev_types"] = sorted(merged["ev_type_vehicles"])
+            cube._models[key] = merged
+        return cube
+
+    def models(self) -> List[Dict[str, Any]]:
+        """全部车型汇总（按首次出现顺序）"""
+        return list(self._models.values())
+
+    @timed("aggregate")
+    def region(self, state: str, city: Optional[str] = None, county: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """区域汇总（不区分大小写）：车辆数、记录数、有电力供应商的记录数、电动车类型分布"""
+        spec, key = ("state",), (state,)
+        if city:
+            spec, key = spec + ("city",), key + (city,)
+        if county:
+            spec, key = spec + ("county",), key + (county,)
+        return self._regions.get(spec, {}).get(tuple(value.lower() for value in key))
+
+    @timed("aggregate")
+    def model(self, make: str, model: str) -> Optional[Dict[str, Any]]:
+        """车型汇总（不区分大小写）：车辆数、续航/价格累计、各州/年份/类型车辆数"""
+        return self._models.get((make.lower(), model.lower()))
+
+
+# --------------------------
+# 取值表搜索索引（前缀 + 子串，用于模糊查询与输入联想）
+# --------------------------
+SEARCH_FIELDS: Tuple[str, ...] = ("make", "model", "state", "city", "county")
+NGRAM = 3  # 子串倒排表的最长n-gram；更短的查询串直接查对应长度的倒排表
+
+
+class EVSearchIndex:
+    """每个数据版本构建一次的取值表搜索索引
+
+    只对各字段去重后的小写取值（词条）建索引，规模取决于取值表大小而非行数：
+    - 前缀：词条排序列表，二分查找定位前缀区间
+    - 子串：1~NGRAM-gram -> 词条id倒排表；长查询串对其全部NGRAM-gram的倒排表求交后再逐个核对
+    命中的词条经单列二级索引映射为行号（postings），全程不扫描行。
+    """
+
+    def __init__(self, store: EVRecordStore, index: EVDataIndex, fields: Tuple[str, ...] = SEARCH_FIELDS):
+        self.store = store
+        self.index = index
+        self._terms: Dict[str, np.ndarray] = {}  # 词条id -> 小写词条
+        self._sorted: Dict[str, Tuple[List[str], np.ndarray]] = {}  # （排序后的词条，对应的词条id）
+        self._grams: Dict[str, Dict[str, np.ndarray]] = {}  # n-gram -> 包含它的词条id（升序）
+        self._vocab_terms: Dict[str, np.ndarray] = {}  # 原始取值编码 -> 词条id
+        self._labels: Dict[str, List[str]] = {}  # 词条id -> 展示值（车辆数最多的原始写法）
+        self._weights: Dict[str, np.ndarray] = {}  # 词条id -> 车辆数
+        for field in fields:
+            self._build(field)
+
+    def _build(self, field: str) -> None:
+        row_codes, terms = self.store.folded_codes(field)
+        term_ids = {term: i for i, term in enumerate(terms)}
+        vocab_terms = np.array([term_ids[value] for value in self.store.folded_vocab(field)], dtype=np.int64)
+        codes = self.store.codes(field)
+        present = codes != MISSING_CODE
+        vocab_weights = np.bincount(codes[present], weights=self.store.values("vehicle_count")[present],
+                                    minlength=len(vocab_terms))
+        labels, best = [None] * len(terms), np.full(len(terms), -1.0)
+        for code, term in enumerate(vocab_terms):
+            if vocab_weights[code] > best[term]:
+                labels[term], best[term] = self.store.vocab(field)[code], vocab_weights[code]
+        grams: Dict[str, List[int]] = {}
+        for i, term in enumerate(terms):
+            for n in range(1, NGRAM + 1):
+                for gram in {term[j:j + n] for j in range(len(term) - n + 1)}:
+                    grams.setdefault(gram, []).append(i)
+        order = sorted(range(len(terms)), key=terms.__getitem__)
+        self._terms[field] = terms
+        self._sorted[field] = ([terms[i] for i in order], np.array(order, dtype=np.int64))
+        self._grams[field] = {gram: np.array(ids, dtype=np.int64) for gram, ids in grams.items()}
+        self._vocab_terms[field] = vocab_terms
+        self._labels[field] = labels
+        self._weights[field] = np.bincount(vocab_terms, weights=vocab_weights, minlength=len(terms))
+
+    def prefix(self, field: str, query: str) -> np.ndarray:
+        """以query开头（不区分大小写）的词条id"""
+        query = query.lower()
+        terms, term_ids = self._sorted[field]
+        return term_ids[bisect_left(terms, query):bisect_left(terms, query + "\U0010ffff")]
+
+    def contains(self, field: str, query: str) -> np.ndarray:
+        """包含query子串（不区分大小写）的词条id（升序）"""
+        query = query.lower()
+        grams = self._grams[field]
+        if len(query) <= NGRAM:
+            return grams.get(query, np.empty(0, dtype=np.int64))
+        postings = sorted((grams.get(query[j:j + NGRAM], ()) for j in range(len(query) - NGRAM + 1)), key=len)
+        candidates = postings[0]
+        for posting in postings[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+        terms = self._terms[field]
+        return np.array([i for i in np.asarray(candidates, dtype=np.int64) if query in terms[i]], dtype=np.int64)
+
+    def vocab_mask(self, field: str, query: str) -> np.ndarray:
+        """原始取值表上的布尔掩码：取值包含query子串（不区分大小写）"""
+        return np.isin(self._vocab_terms[field], self.contains(field, query))
+
+    def rows(self, field: str, term_ids: np.ndarray) -> np.ndarray:
+        """词条id -> 行号（合并各词条的索引切片，升序）"""
+        terms = self._terms[field]
+        parts = [self.index.lookup((field,), (terms[i],)) for i in term_ids]
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int32)
+
+    @timed("search")
+    def suggest(self, field: str, query: str, limit: int = 10,
+                within: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """输入联想：前缀命中在前、仅子串命中在后，各自按车辆数降序；within限定候选词条id"""
+        weights = self._weights[field]
+        prefix = self.prefix(field, query)
+        substring = np.setdiff1d(self.contains(field, query), prefix, assume_unique=True)
+        suggestions: List[Dict[str, Any]] = []
+        for term_ids in (prefix, substring):
+            if within is not None:
+                term_ids = term_ids[np.isin(term_ids, within)]
+            for i in term_ids[np.argsort(-weights[term_ids], kind="stable")][:limit - len(suggestions)]:
+                suggestions.append({"value": self._labels[field][i], "vehicles": int(weights[i])})
+            if len(suggestions) >= limit:
+                break
+        return suggestions
+
+    def term_ids(self, field: str, values: List[str]) -> np.ndarray:
+        """一组取值（不区分大小写）对应的词条id（未出现的取值忽略）"""
+        lookup = {term: i for i, term in enumerate(self._terms[field])}
+        return np.array([lookup[value.lower()] for value in values if value.lower() in lookup], dtype=np.int64)
+
+
+# --------------------------
+# 排行榜（按数据版本惰性构建的有序计数表）
+# --------------------------
+RANK_DIMENSIONS: Tuple[str, ...] = ("make", "model", "state", "city", "county", "electric_utility")
+RANK_SCOPE_FIELDS: Tuple[str, ...] = ("state", "county", "city", "make", "model", "ev_type")
+RANK_METRICS: Tuple[str, ...] = ("vehicles", "records", "share")
+RANK_TABLES_MAX = int(os.getenv("EV_RANK_TABLES_MAX", "64"))  # 每个数据版本最多保留的排行表数
+
+
+class EVRankingTable:
+    """某一（范围字段，排名维度，指标）下的排行表
+
+    对全部行按（范围字段..., 维度）的小写编码一次分组累计车辆数/记录数，再按
+    （范围键，指标降序，展示值升序）整体排序；每个范围键对应排序数组中的一段，
+    查询时取该段的前N项，耗时与数据行数无关。
+    """
+
+    def __init__(self, store: EVRecordStore, scope: Tuple[str, ...], dimension: str, metric: str,
+                 share_of: Optional[np.ndarray] = None):
+        fields = scope + (dimension,)
+        columns = [store.folded_codes(field)[0] for field in fields]
+        if share_of is not None:
+            columns.append(store.codes("ev_type"))
+        valid = np.ones(store.size, dtype=bool)
+        for column in columns[:len(fields)]:
+            valid &= column != MISSING_CODE
+        rows = np.flatnonzero(valid)
+        counts = store.values("vehicle_count")[rows]
+        self.store, self.dimension = store, dimension
+        if not len(rows):
+            self.codes = self.vehicles = self.records = self.scores = np.empty(0)
+            self._spans: Dict[Tuple[str, ...], Tuple[int, int, int]] = {}
+            return
+        keys, inverse = group_cells([column[rows] for column in columns[:len(fields)]])
+        n_groups = len(keys)
+        vehicles = np.bincount(inverse, weights=counts, minlength=n_groups)
+        records = np.bincount(inverse, minlength=n_groups)
+        if share_of is not None:
+            # 指定电动车类型的车辆数占该组车辆数的百分比
+            typed = np.bincount(inverse, weights=counts * np.isin(columns[-1][rows], share_of), minlength=n_groups)
+            scores = np.where(vehicles > 0, typed / np.maximum(vehicles, 1) * 100, 0.0)
+        else:
+            scores = vehicles if metric == "vehicles" else records.astype(np.float64)
+        if scope:
+            scope_keys, scope_ids = group_cells([keys[:, i] for i in range(len(scope))])
+        else:
+            scope_keys, scope_ids = np.empty((1, 0), dtype=np.int64), np.zeros(n_groups, dtype=np.int64)
+        names = store.folded_display(dimension)
+        name_rank = np.argsort(np.argsort(names, kind="stable"))
+        order = np.lexsort((name_rank[keys[:, -1]], -scores, scope_ids))
+        self.codes = keys[order, -1]
+        self.vehicles = vehicles[order].astype(np.int64)
+        self.records = records[order]
+        self.scores = scores[order]
+        scope_totals = np.bincount(scope_ids, weights=vehicles, minlength=len(scope_keys)).astype(np.int64)
+        bounds = np.searchsorted(scope_ids[order], np.arange(len(scope_keys) + 1))
+        folded_vocabs = [store.folded_codes(field)[1] for field in scope]
+        self._spans = {
+            tuple(vocab[code] for vocab, code in zip(folded_vocabs, scope_keys[i].tolist())):
+                (int(bounds[i]), int(bounds[i + 1]), int(scope_totals[i]))
+            for i in range(len(scope_keys))
+        }
+
+    def top(self, scope_values: Tuple[str, ...], limit: int,
+            min_vehicles: int = 0) -> Optional[Tuple[List[Dict[str, Any]], int, int]]:
+        """范围键（不区分大小写）下的前limit项，返回（排行，范围内车辆总数，范围内分组数）；范围未命中返回None"""
+        span = self._spans.get(tuple(value.lower() for value in scope_values))
+        if span is None:
+            return None
+        start, end, total = span
+        positions = np.arange(start, end)
+        if min_vehicles > 1:
+            positions = positions[self.vehicles[start:end] >= min_vehicles]
+        positions = positions[:limit]
+        names = self.store.folded_display(self.dimension)
+        ranking = [{"rank": rank, "value": names[self.codes[i]], "vehicles": int(self.vehicles[i]),
+                    "records": int(self.records[i]), "score": float(self.scores[i])}
+                   for rank, i in enumerate(positions.tolist(), 1)]
+        return ranking, total, end - start
+
+
+class EVRankingIndex:
+    """每个数据版本一份的排行表集合：首次查询某（范围字段，维度，指标）时构建，之后只做切片
+
+    构建一次约为一次全表分组（数十毫秒），超过 RANK_TABLES_MAX 时淘汰最久未用的表。
+    """
+
+    def __init__(self, store: EVRecordStore, max_tables: int = RANK_TABLES_MAX):
+        self.store = store
+        self.max_tables = max_tables
+        self._tables: "OrderedDict[Tuple[Any, ...], EVRankingTable]" = OrderedDict()
+        self._building: Dict[Tuple[Any, ...], threading.Lock] = {}  # 正在构建的表 -> 该表的构建锁
+        self._lock = threading.Lock()  # 只保护 _tables/_building 的查找与插入，不在构建期间持有
+
+    def share_codes(self, ev_type: str) -> np.ndarray:
+        """电动车类型（不区分大小写，可用括号内缩写如BEV/PHEV）对应的原始取值编码"""
+        folded = self.store.folded_vocab("ev_type")
+        query = ev_type.strip().lower()
+        codes = np.flatnonzero((folded == query) | np.char.endswith(folded.astype(str), f"({query})"))
+        if not len(codes):
+            raise ValueError(f"未知的电动车类型：{ev_type}")
+        return codes
+
+    def table(self, scope: Tuple[str, ...], dimension: str, metric: str,
+              share_of: Optional[str] = None) -> EVRankingTable:
+        key = (scope, dimension, metric, share_of.strip().lower() if share_of else None)
+        with self._lock:
+            table = self._lookup(key)
+            if table is not None:
+                return table
+            build_lock = self._building.setdefault(key, threading.Lock())
+        # 按表加锁构建：并发的相同查询等待同一次构建，而不是各自全表分组；不同表的构建及已建表的查询互不阻塞
+        with build_lock:
+            with self._lock:
+                table = self._lookup(key)
+            if table is not None:
+                return table
+            try:
+                table = _build_ranking_table(self.store, scope, dimension, metric,
+                                             self.share_codes(share_of) if share_of else None)
+                with self._lock:
+                    self._tables[key] = table
+                    while len(self._tables) > self.max_tables:
+                        self._tables.popitem(last=False)
+            finally:
+                with self._lock:
+                    if self._building.get(key) is build_lock:
+                        del self._building[key]
+            return table
+
+    def _lookup(self, key: Tuple[Any, ...]) -> Optional[EVRankingTable]:
+        # 调用方须持有 self._lock
+        table = self._tables.get(key)
+        if table is not None:
+            self._tables.move_to_end(key)
+        return table
+
+
+@timed("ranking_build")
+def _build_ranking_table(store: EVRecordStore, scope: Tuple[str, ...], dimension: str, metric: str,
+                         share_of: Optional[np.ndarray]) -> EVRankingTable:
+    return EVRankingTable(store, scope, dimension, metric, share_of)
+
+
 # --------------------------
 # CSV数据加载工具（带缓存和完整映射）
 # --------------------------
 class EVDataLoader:
-    """加载CSV数据并完整映射到模型类，处理类型转换和缺失值"""
-    _cache: Dict[str, pd.DataFrame] = {}  # 缓存CSV数据（key为文件名）
+    """加载CSV数据并完整映射到列式存储，处理类型转换和缺失值"""
+    _cache: Dict[str, "pd.DataFrame"] = {}  # 缓存CSV数据（key为文件名）
 
     @classmethod
-    def load_data(cls, file_name: Optional[str] = None, force_reload: bool = False) -> pd.DataFrame:
+    def load_data(cls, file_name: Optional[str] = None, force_reload: bool = False) -> "pd.DataFrame":
         """加载CSV数据（带缓存，避免重复IO）"""
-        file_name = file_name or "Electric_Vehicle_Population_Datas.csv"
+        file_name = file_name or DEFAULT_CSV_NAME
         if file_name in cls._cache and not force_reload:
             return cls._cache[file_name]
         
@@ -92,154 +1157,622 @@ class EVDataLoader:
         return df
 
     @classmethod
-    def get_records(cls, file_name: Optional[str] = None) -> List[ElectricVehicleRecord]:
-        """将CSV数据转换为模型列表，处理类型转换和缺失值"""
-        df = cls.load_data(file_name)
-        records = []
-        
-        for idx, row in df.iterrows():
-            # 处理数值类型转换（避免字符串转数值失败）
-            model_year = row.get("Model Year")
-            try:
-                model_year = int(model_year) if pd.notna(model_year) else None
-            except (ValueError, TypeError):
-                model_year = None
+    def get_store(cls, file_name: Optional[str] = None) -> EVRecordStore:
+        """获取列式存储（复用当前版本的物化数据集，不重复转换）"""
+        return EVDataRegistry.get(file_name).store
 
-            electric_range = row.get("Electric Range")
-            try:
-                electric_range = float(electric_range) if pd.notna(electric_range) else None
-            except (ValueError, TypeError):
-                electric_range = None
+    @classmethod
+    def get_records(cls, file_name: Optional[str] = None) -> EVRecordSet:
+        """获取全部记录（惰性行视图集合，按需读取字段）"""
+        return cls.get_store(file_name).rows()
 
-            base_msrp = row.get("Base MSRP")
-            try:
-                base_msrp = float(base_msrp) if pd.notna(base_msrp) else None
-            except (ValueError, TypeError):
-                base_msrp = None
+    @classmethod
+    def clear_cache(cls) -> None:
+        """CSV文件更新后调用：已加载的数据集在后台重建并原子替换（DataFrame缓存随替换一并丢弃），
+        未加载时直接清空；请求不会因此在调用线程内同步重建"""
+        EVDataRegistry.refresh()
+
+
+# --------------------------
+# 物化数据集（全局唯一、带版本号、只读）
+# --------------------------
+DISTINCT_FIELDS: Tuple[str, ...] = ("state", "county", "city", "make", "model", "ev_type")
+# 按上级取值（不区分大小写）分组的去重下级取值：州 -> 城市、品牌 -> 车型
+GROUPED_FIELDS: Tuple[Tuple[str, str], ...] = (("state", "city"), ("make", "model"))
+
+
+class EVDataset:
+    """某一版本CSV数据的物化结果：列式存储 + 二级索引 + 聚合立方体
+
+    构建完成后所有数组均设为只读，所有入口共享同一实例；数据更新时整体
+    替换为新版本，而不是原地修改。CSV只在末尾追加了行时，新版本以旧版本为base，
+    索引、聚合表和去重取值只对追加的行计算后合并。
+    """
+
+    @timed("build")
+    def __init__(self, store: EVRecordStore, version: int, file_name: str, build_seconds: float,
+                 source: str = "csv", fingerprint: Optional[str] = None,
+                 shared: Optional[Dict[str, np.ndarray]] = None, source_size: Optional[int] = None,
+                 modified_at: Optional[float] = None, base: Optional["EVDataset"] = None):
+        self.store = store
+        self.version = version
+        self.file_name = file_name
+        self.build_seconds = build_seconds
+        self.source = source  # csv：解析CSV构建；snapshot：由二进制快照映射；append：增量导入追加的行
+        self.fingerprint = fingerprint  # CSV内容哈希（快照键），禁用快照时为None
+        self.source_size = source_size  # 内容哈希覆盖的CSV字节数，增量导入从此偏移处续读
+        self.modified_at = modified_at or time.time()  # CSV修改时间（HTTP Last-Modified），未知时取构建时间
+        for field in STRING_FIELDS:
+            store.folded_codes(field)  # 预先计算，构建后不再有惰性写入
+            store.codes(field).flags.writeable = False
+        for field in NUMERIC_FIELDS:
+            store.values(field).flags.writeable = False
+        self.index = EVDataIndex(store, arrays=shared, base=base.index if base else None)
+        for array in self.index.arrays().values():
+            array.flags.writeable = False
+        self.aggregates = base.aggregates.appended(store) if base else EVAggregateCube(store)
+        self.search = EVSearchIndex(store, self.index)
+        self.rankings = EVRankingIndex(store)
+        # 预排序的去重取值（区域/品牌/车型下拉列表及分页直接复用，元组保证共享后不被修改）
+        if base is None:
+            self.distinct_values = {field: tuple(self.rows().distinct(field)) for field in DISTINCT_FIELDS}
+        else:
+            added = self.rows(np.arange(base.store.size, store.size))
+            self.distinct_values = {field: tuple(sorted(set(values).union(added.distinct(field))))
+                                    for field, values in base.distinct_values.items()}
+        self.states = tuple(state for state in self.distinct_values["state"] if state != UNKNOWN_STATE)
+        self.grouped_values = {spec: self._build_grouped(*spec) for spec in GROUPED_FIELDS}
+        self.brand_model_codes = self._build_brand_model_codes(base)
+        self.brand_model_pairs = tuple(zip(store.vocab("make")[self.brand_model_codes[0]].tolist(),
+                                           store.vocab("model")[self.brand_model_codes[1]].tolist()))
+
+    def _build_grouped(self, parent: str, child: str) -> Dict[str, Tuple[str, ...]]:
+        """上级小写取值 -> 该上级下出现过的下级原始取值（去重、排序，不含缺失）"""
+        parent_codes, parent_vocab = self.store.folded_codes(parent)
+        child_codes = self.store.codes(child)
+        valid = (parent_codes != MISSING_CODE) & (child_codes != MISSING_CODE)
+        pairs, _ = group_cells([parent_codes[valid], child_codes[valid]])
+        if not len(pairs):
+            return {}
+        pairs = pairs[np.lexsort((self.store.vocab_rank(child)[pairs[:, 1]], pairs[:, 0]))]
+        child_vocab = self.store.vocab(child)
+        groups = np.split(pairs, np.flatnonzero(np.diff(pairs[:, 0])) + 1)
+        return {parent_vocab[group[0, 0]]: tuple(child_vocab[group[:, 1]].tolist()) for group in groups}
+
+    def _build_brand_model_codes(self, base: Optional["EVDataset"] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """去重后的（品牌编码，车型编码）数组，按原始字符串排序（有base时只在其结果上并入追加的行）"""
+        make_codes, model_codes = self.store.codes("make"), self.store.codes("model")
+        if base is not None:
+            start = base.store.size
+            make_codes = np.concatenate((base.brand_model_codes[0], make_codes[start:]))
+            model_codes = np.concatenate((base.brand_model_codes[1], model_codes[start:]))
+        valid = (make_codes != MISSING_CODE) & (model_codes != MISSING_CODE)
+        pairs, _ = group_cells([make_codes[valid], model_codes[valid]])
+        makes, models = pairs[:, 0], pairs[:, 1]
+        order = np.lexsort((self.store.vocab_rank("model")[models], self.store.vocab_rank("make")[makes]))
+        return makes[order], models[order]
+
+    def rows(self, ids: Optional[np.ndarray] = None) -> EVRecordSet:
+        return self.store.rows(ids)
+
+    def shared_arrays(self) -> Dict[str, np.ndarray]:
+        """可随快照写出、由其他worker零拷贝映射的派生数组（小写编码 + 索引）"""
+        return {**self.store.derived_arrays(), **self.index.arrays()}
+
+
+def _release_free_heap() -> None:
+    """把构建期临时数组释放后的空闲堆内存归还操作系统（glibc的malloc_trim，其他平台忽略）
+
+    构建索引/聚合表时的大块临时数组释放后，glibc往往把空闲块留在本进程堆里，
+    每个worker因此多占数十MB独占内存；数据集本身已映射自共享快照。
+    """
+    try:
+        ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+# 设置 EV_INCREMENTAL_INGEST=0 可禁用增量导入（CSV变化一律全量重建）
+INCREMENTAL_INGEST = os.getenv("EV_INCREMENTAL_INGEST", "1") != "0"
+
+
+class EVDataRegistry:
+    """物化数据集注册表：每个CSV文件每个数据版本只做一次DataFrame -> 列式存储转换
+
+    热重载时在后台构建新版本（列式存储、索引、聚合表），完成后整体替换注册表字典；
+    读者无锁读取当前字典，构建期间一直拿到旧版本，不会等待重建。
+    """
+    _datasets: Dict[str, EVDataset] = {}
+    _version: int = 0  # 全局单调递增的数据版本号
+    _conversions: int = 0  # 累计转换次数（用于校验“每个版本只转换一次”）
+    _lock = threading.Lock()
+    _version_lock = threading.Lock()
+    _reload_lock = threading.Lock()  # 同一时刻只有一个重建在进行
+    _reload_state: Dict[str, Dict[str, Any]] = {}  # 文件名 -> 后台重建状态
+    # 请求级固定：同一请求/任务内多次取数据集都落在同一版本（见 pinned()）
+    _pinned: ContextVar[Optional[Dict[str, EVDataset]]] = ContextVar("ev_pinned_datasets", default=None)
+
+    @classmethod
+    def get(cls, file_name: Optional[str] = None) -> EVDataset:
+        """获取数据集：处于 pinned() 范围内时返回该范围首次取到的版本，否则返回当前版本"""
+        file_name = file_name or DEFAULT_CSV_NAME
+        pinned = cls._pinned.get()
+        if pinned is None:
+            return cls._current(file_name)
+        dataset = pinned.get(file_name)
+        if dataset is None:
+            dataset = pinned[file_name] = cls._current(file_name)
+        return dataset
+
+    @classmethod
+    def is_loaded(cls, file_name: Optional[str] = None) -> bool:
+        """当前版本（或请求已固定的版本）是否已就绪：为False时 get() 会同步构建数据集"""
+        file_name = file_name or DEFAULT_CSV_NAME
+        pinned = cls._pinned.get()
+        return file_name in cls._datasets or (pinned is not None and file_name in pinned)
+
+    @classmethod
+    def _current(cls, file_name: str) -> EVDataset:
+        """当前版本数据集（首次访问时构建，并发访问只构建一次）"""
+        dataset = cls._datasets.get(file_name)
+        if dataset is not None:
+            return dataset
+        with cls._lock:
+            dataset = cls._datasets.get(file_name)
+            if dataset is None:
+                dataset = cls._build(file_name)
+                cls._datasets = {**cls._datasets, file_name: dataset}
+                _release_free_heap()
+        return dataset
+
+    @classmethod
+    @contextmanager
+    def pinned(cls) -> Iterator[None]:
+        """在范围内固定数据集版本：一次请求的多次查询不会跨越热重载读到两个版本"""
+        token = cls._pinned.set({})
+        try:
+            yield
+        finally:
+            cls._pinned.reset(token)
+
+    @classmethod
+    def _next_version(cls) -> int:
+        with cls._version_lock:
+            cls._version += 1
+            return cls._version
+
+    @classmethod
+    def _build(cls, file_name: str, reuse_frame: bool = True) -> EVDataset:
+        start = time.perf_counter()
+        version = cls._next_version()
+        df = EVDataLoader._cache.get(file_name) if reuse_frame else None
+        if not SNAPSHOT_ENABLED or df is not None:
+            return cls._from_dataframe(file_name, df, version, start)
+
+        # 优先映射二进制快照（键为CSV路径/大小/修改时间/内容哈希），命中时无需解析CSV；
+        # 多个worker同时启动时只有持有构建锁的一个解析CSV并写出快照，其余等待后直接映射
+        csv_path = get_csv_path(file_name)
+        dataset = cls._from_snapshot(csv_path, file_name, version, start)
+        if dataset is None:
+            with snapshot_build_lock(csv_path):
+                dataset = cls._from_snapshot(csv_path, file_name, version, start)
+                if dataset is None:
+                    key = resolve_snapshot_key(csv_path)
+                    dataset = cls._from_dataframe(file_name, None, version, start, key)
+                    if save_snapshot(csv_path, key, *dataset.store.columns(), derived=dataset.shared_arrays()):
+                        # 构建者也改为映射刚写出的快照，释放本进程堆上的那一份数组
+                        dataset = cls._from_snapshot(csv_path, file_name, version, start) or dataset
+        return dataset
+
+    @classmethod
+    @timed("snapshot_map")
+    def _from_snapshot(cls, csv_path: str, file_name: str, version: int, start: float) -> Optional[EVDataset]:
+        key = resolve_snapshot_key(csv_path)
+        columns = load_snapshot(csv_path, key)
+        if columns is None:
+            return None
+        codes, vocabs, numerics, derived = columns
+        folded = {name[len("folded."):]: array for name, array in derived.items() if name.startswith("folded.")}
+        store = EVRecordStore(codes, vocabs, numerics, folded=folded)
+        return EVDataset(store, version, file_name, time.perf_counter() - start,
+                         source="snapshot", fingerprint=key["hash"], shared=derived, source_size=key["size"],
+                         modified_at=key["mtime_ns"] / 1e9)
+
+    @classmethod
+    def _from_dataframe(cls, file_name: str, df: Optional["pd.DataFrame"], version: int, start: float,
+                        key: Optional[Dict] = None) -> EVDataset:
+        # 已有DataFrame缓存则复用；否则直接解析，转换后不再额外常驻一份DataFrame
+        if df is None:
+            # 解析前记下CSV的大小与内容哈希（与是否启用快照无关），作为之后增量导入的起点；
+            # 解析期间文件被改动时不记录（无法确定解析到了哪里），下次变化时全量重建
+            csv_path = get_csv_path(file_name)
+            key = key or (resolve_snapshot_key(csv_path) if INCREMENTAL_INGEST else None)
+            df = load_csv_data(file_name)
+            if key and not key_matches_file(csv_path, key):
+                key = None
+        store = EVRecordStore.from_dataframe(df)
+        cls._conversions += 1
+        return EVDataset(store, version, file_name, time.perf_counter() - start,
+                         source="csv", fingerprint=key["hash"] if key else None,
+                         source_size=key["size"] if key else None,
+                         modified_at=key["mtime_ns"] / 1e9 if key else None)
+
+    @classmethod
+    @timed("append")
+    def _append(cls, file_name: str, base: EVDataset) -> Optional[EVDataset]:
+        """增量导入：CSV只在末尾追加了行时，只解析新增部分并在base上追加；不满足条件返回None（全量重建）"""
+        if not (INCREMENTAL_INGEST and base.fingerprint and base.source_size):
+            return None
+        start = time.perf_counter()
+        csv_path = get_csv_path(file_name)
+        appended = read_appended(csv_path, base.source_size, base.fingerprint)
+        if appended is None:
+            return None  # 表头或已导入部分被改动、文件被截断，或上次导入止于半行
+        header, tail, key = appended
+        if not tail:
+            return base  # 追加的行还没写完整，继续使用当前版本，写完后再导入
+        df = read_ev_csv_tail(csv_path, header, tail)
+        if df is None:
+            return None
+        store = base.store.append(EVRecordStore.from_dataframe(df))
+        cls._conversions += 1
+        dataset = EVDataset(store, cls._next_version(), file_name, time.perf_counter() - start,
+                            source="append", fingerprint=key["hash"], source_size=key["size"],
+                            modified_at=key["mtime_ns"] / 1e9, base=base)
+        if SNAPSHOT_ENABLED:
+            # 写出完整快照，重启或新worker直接映射，无需再次解析
+            save_snapshot(csv_path, key, *store.columns(), derived=dataset.shared_arrays())
+        print(f"增量导入 {len(df)} 行（共 {store.size} 行，数据版本 v{dataset.version}，"
+              f"耗时 {time.perf_counter() - start:.2f}s）")
+        return dataset
+
+    @classmethod
+    def reload(cls, file_name: Optional[str] = None, force: bool = False) -> EVDataset:
+        """在调用线程重建数据集并原子替换为新版本（不影响并发读者）
+
+        新版本完全构建好（含索引、聚合表）后才替换。CSV只在末尾追加了行时走增量导入；
+        内容哈希与当前版本一致时（文件只是被touch）保留当前版本；其余情况或force时全量重建。
+        仍被进行中请求引用的旧版本在请求结束后自然回收。
+        """
+        file_name = file_name or DEFAULT_CSV_NAME
+        with cls._reload_lock:
+            current = cls._datasets.get(file_name)
+            dataset = None
+            if current is not None and not force:
+                dataset = cls._append(file_name, current)
+                if dataset is current:
+                    return current
+                if dataset is None and current.fingerprint \
+                        and resolve_snapshot_key(get_csv_path(file_name))["hash"] == current.fingerprint:
+                    return current
+            dataset = dataset or cls._build(file_name, reuse_frame=False)
+            with cls._lock:
+                cls._datasets = {**cls._datasets, file_name: dataset}
+                EVDataLoader._cache.pop(file_name, None)  # DataFrame缓存与数据集同时换代
+            _release_free_heap()
+        return dataset
+
+    @classmethod
+    def reload_async(cls, file_name: Optional[str] = None, force: bool = False) -> Dict[str, Any]:
+        """在后台线程重建并替换，立即返回重建状态；重建进行中再次请求时合并为其后的一次重建"""
+        file_name = file_name or DEFAULT_CSV_NAME
+        with cls._lock:
+            state = cls._reload_state.setdefault(file_name, {
+                "running": False, "pending": False, "force": False, "last_error": None,
+                "last_reload_at": None, "reloads": 0})
+            state["force"] = state["force"] or force
+            if state["running"]:
+                state["pending"] = True
+            else:
+                state["running"] = True
+                threading.Thread(target=cls._reload_worker, args=(file_name,),
+                                 name="ev-data-reload", daemon=True).start()
+            return dict(state)
 
-            # 处理车辆数量（优先使用CSV中的列，无则默认1）
-            vehicle_count = row.get("Vehicle Count")  # 假设CSV可能有该列
+    @classmethod
+    def _reload_worker(cls, file_name: str) -> None:
+        state = cls._reload_state[file_name]
+        while True:
+            with cls._lock:
+                force, state["force"], state["pending"] = state["force"], False, False
             try:
-                vehicle_count = int(vehicle_count) if pd.notna(vehicle_count) else 1
-            except (ValueError, TypeError):
-                vehicle_count = 1
-
-            # 构建模型实例（完整映射所有字段）
-            records.append(
-                ElectricVehicleRecord(
-                    id=idx + 1,  # 自动生成ID（从1开始）
-                    vin_1_to_10=str(row.get("VIN (1-10)", "")).strip() or None,
-                    county=str(row.get("County", "")).strip() or None,
-                    city=str(row.get("City", "")).strip() or None,
-                    state=str(row.get("State", "")).strip() or "未知",  # 确保非空（避免空字符串）
-                    model_year=model_year,
-                    make=str(row.get("Make", "")).strip() or None,
-                    model=str(row.get("Model", "")).strip() or None,
-                    ev_type=str(row.get("Electric Vehicle Type", "")).strip() or None,
-                    cafv_eligibility=str(row.get("Clean Alternative Fuel Vehicle (CAFV) Eligibility", "")).strip() or None,
-                    electric_range=electric_range,
-                    base_msrp=base_msrp,
-                    electric_utility=str(row.get("Electric Utility", "")).strip() or None,
-                    vehicle_count=vehicle_count
-                )
-            )
-        return records
+                dataset = cls.reload(file_name, force=force)
+                error = None
+            except Exception as e:
+                # 重建失败时继续使用旧版本
+                print(f"CSV数据重建失败，继续使用当前版本：{str(e)}")
+                dataset, error = None, str(e)
+            with cls._lock:
+                state["last_error"] = error
+                if dataset is not None:
+                    state["last_reload_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    state["reloads"] += 1
+                if not state["pending"]:
+                    state["running"] = False
+                    return
 
     @classmethod
-    def clear_cache(cls) -> None:
-        """清空缓存（CSV文件更新后调用）"""
-        cls._cache = {}
+    def reload_status(cls, file_name: Optional[str] = None) -> Dict[str, Any]:
+        """当前数据版本与后台重建状态"""
+        file_name = file_name or DEFAULT_CSV_NAME
+        dataset = cls._datasets.get(file_name)
+        with cls._lock:
+            state = dict(cls._reload_state.get(file_name, {"running": False, "pending": False}))
+        state.pop("force", None)
+        state.update({"file_name": file_name, "version": dataset.version if dataset else None,
+                      "source": dataset.source if dataset else None,
+                      "fingerprint": dataset.fingerprint if dataset else None,
+                      "source_size": dataset.source_size if dataset else None,
+                      "records": dataset.store.size if dataset else 0})
+        return state
+
+    @classmethod
+    def refresh(cls, file_name: Optional[str] = None) -> None:
+        """数据源更新后调用：已加载时后台重建并原子替换，未加载时清空（下次访问再构建）"""
+        file_name = file_name or DEFAULT_CSV_NAME
+        if file_name in cls._datasets:
+            cls.reload_async(file_name)
+        else:
+            cls.invalidate()
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """使所有已物化的数据集失效（下次访问时以新版本号重建）"""
+        with cls._lock:
+            cls._datasets = {}
+            EVDataLoader._cache = {}
+
+    @classmethod
+    def conversion_count(cls) -> int:
+        return cls._conversions
+
+
+def _dataset_metrics() -> Iterator[str]:
+    """/metrics 采集回调：当前数据集版本、记录数与重建次数"""
+    status = EVDataRegistry.reload_status()
+    yield from sample("ev_dataset_version", "gauge", "当前数据版本号", status["version"] or 0)
+    yield from sample("ev_dataset_records", "gauge", "当前数据集记录数", status["records"])
+    yield from sample("ev_dataset_reloads_total", "counter", "后台重建完成次数", status.get("reloads", 0))
+    yield from sample("ev_dataset_conversions_total", "counter", "CSV转换为列式存储的次数",
+                      EVDataRegistry.conversion_count())
+
+
+metrics.register_collector(_dataset_metrics)
 
 
 # --------------------------
 # 数据查询工具（优化查询效率）
 # --------------------------
 class EVDataQuery:
-    """封装CSV数据查询方法，增加缓存和过滤优化"""
-    _record_cache: Optional[List[ElectricVehicleRecord]] = None  # 缓存记录列表
+    """封装CSV数据查询方法，基于共享物化数据集（列式存储 + 预建哈希索引）"""
+
+    @classmethod
+    def _get_dataset(cls, file_name: Optional[str] = None) -> EVDataset:
+        return EVDataRegistry.get(file_name)
+
+    @classmethod
+    def _get_store(cls, file_name: Optional[str] = None) -> EVRecordStore:
+        """获取列式存储（与EVDataLoader共享同一物化数据集）"""
+        return cls._get_dataset(file_name).store
 
     @classmethod
-    def _get_all_records(cls, file_name: Optional[str] = None) -> List[ElectricVehicleRecord]:
-        """获取所有记录（带本地缓存，减少重复转换）"""
-        if cls._record_cache is None:
-            cls._record_cache = EVDataLoader.get_records(file_name)
-        return cls._record_cache
+    def _get_index(cls) -> EVDataIndex:
+        """获取二级索引（每个数据版本构建一次）"""
+        return cls._get_dataset().index
+
+    @classmethod
+    def _get_aggregates(cls) -> EVAggregateCube:
+        """获取预计算聚合立方体（每个数据版本构建一次）"""
+        return cls._get_dataset().aggregates
+
+    @classmethod
+    def _get_all_records(cls, file_name: Optional[str] = None) -> EVRecordSet:
+        """获取所有记录（行视图集合）"""
+        return cls._get_store(file_name).rows()
 
     @staticmethod
     def clear_query_cache() -> None:
-        """清空查询缓存（数据更新后调用）"""
-        EVDataQuery._record_cache = None
+        """数据更新后调用：与 EVDataLoader.clear_cache 相同，后台重建存储、索引和聚合表后原子替换"""
+        EVDataRegistry.refresh()
 
     @classmethod
-    def get_by_brand(cls, brand: str) -> List[ElectricVehicleRecord]:
+    def _lookup(cls, fields: Tuple[str, ...], values: Tuple[str, ...]) -> EVRecordSet:
+        """通过二级索引取行（不区分大小写）"""
+        index = cls._get_index()
+        return index.store.rows(index.lookup(fields, values))
+
+    @classmethod
+    def get_by_brand(cls, brand: str) -> EVRecordSet:
         """根据品牌查询（不区分大小写）"""
-        brand_lower = brand.lower()
-        return [
-            record for record in cls._get_all_records()
-            if record.make and record.make.lower() == brand_lower
-        ]
+        return cls._lookup(("make",), (brand,))
 
     @classmethod
-    def get_by_state(cls, state: str) -> List[ElectricVehicleRecord]:
+    def get_by_state(cls, state: str) -> EVRecordSet:
         """根据州查询（不区分大小写）"""
-        state_lower = state.lower()
-        return [
-            record for record in cls._get_all_records()
-            if record.state and record.state.lower() == state_lower
-        ]
+        return cls._lookup(("state",), (state,))
+
+    @classmethod
+    def get_by_city(cls, city: str) -> EVRecordSet:
+        """根据城市查询（不区分大小写，不限州）"""
+        return cls._lookup(("city",), (city,))
+
+    @classmethod
+    def get_by_brand_model(cls, brand: str, model: str) -> EVRecordSet:
+        """根据品牌+车型查询（不区分大小写）"""
+        return cls._lookup(("make", "model"), (brand, model))
+
+    @classmethod
+    def get_by_region(cls, state: str, city: Optional[str] = None, county: Optional[str] = None) -> EVRecordSet:
+        """根据州/市/县组合查询（市、县可选，不区分大小写）"""
+        fields, values = ("state",), (state,)
+        if city:
+            fields, values = fields + ("city",), values + (city,)
+        if county:
+            fields, values = fields + ("county",), values + (county,)
+        return cls._lookup(fields, values)
+
+    @classmethod
+    def filter_records(cls, filters: Dict[str, str], model_year: Optional[int] = None) -> EVRecordSet:
+        """按多个字符串字段组合过滤（不区分大小写，等值匹配），可再按车型年份过滤
+
+        在覆盖到的二级索引中取命中行数最少的一个起步，其余条件在该结果上做向量化掩码过滤。
+        """
+        filters = {field: value for field, value in filters.items() if value}
+        unknown = set(filters) - set(STRING_FIELDS)
+        if unknown:
+            raise ValueError(f"不支持的过滤字段：{', '.join(sorted(unknown))}")
+        dataset = cls._get_dataset()
+        records, covered = dataset.rows(), ()
+        for spec in INDEX_KEYS:
+            if all(field in filters for field in spec):
+                candidate = dataset.rows(dataset.index.lookup(spec, tuple(filters[field] for field in spec)))
+                if not covered or len(candidate) < len(records):
+                    records, covered = candidate, spec
+        for field, value in filters.items():
+            if field not in covered:
+                records = records.where(field, value)
+        if model_year is not None:
+            records = dataset.rows(records.row_ids()[records.values("model_year") == model_year])
+        return records
 
     @classmethod
     def get_brand_models(cls, brand: str) -> List[str]:
-        """查询指定品牌的所有车型（去重，排序）"""
-        brand_records = cls.get_by_brand(brand)
-        models = {record.model for record in brand_records if record.model}
-        return sorted(models)  # 排序后返回，更友好
+        """查询指定品牌的所有车型（去重，排序，预先计算）"""
+        return list(cls._get_dataset().grouped_values[("make", "model")].get(brand.lower(), ()))
+
+    @classmethod
+    def get_state_cities(cls, state: str) -> List[str]:
+        """查询指定州的所有城市（去重，排序，预先计算）"""
+        return list(cls._get_dataset().grouped_values[("state", "city")].get(state.lower(), ()))
 
     @classmethod
     def get_state_ev_count(cls, state: str) -> int:
-        """统计指定州的电动汽车总数（基于vehicle_count）"""
-        state_records = cls.get_by_state(state)
-        return sum(record.vehicle_count for record in state_records)
+        """统计指定州的电动汽车总数（基于vehicle_count，查聚合表）"""
+        summary = cls._get_aggregates().region(state)
+        return summary["vehicles"] if summary else 0
+
+    @classmethod
+    def get_region_summary(cls, state: str, city: Optional[str] = None,
+                           county: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """区域汇总统计（车辆数、记录数、电动车类型分布等），未命中返回None"""
+        return cls._get_aggregates().region(state, city, county)
+
+    @classmethod
+    def get_model_summary(cls, brand: str, model: str) -> Optional[Dict[str, Any]]:
+        """车型汇总统计（车辆数、续航/价格累计、各州分布等），未命中返回None"""
+        return cls._get_aggregates().model(brand, model)
+
+    @classmethod
+    def get_model_first_record(cls, brand: str, model: str) -> Optional[EVRecordView]:
+        """车型首次出现的记录（不区分大小写，查聚合表中的首行行号），未命中返回None"""
+        summary = cls._get_aggregates().model(brand, model)
+        return cls._get_store().row(summary["first_row"]) if summary else None
+
+    @classmethod
+    def get_total_vehicles(cls) -> int:
+        """全部数据的车辆总数"""
+        return cls._get_aggregates().total_vehicles
 
     @classmethod
-    def get_by_ev_type(cls, ev_type: str) -> List[ElectricVehicleRecord]:
+    def get_data_version(cls) -> int:
+        """当前数据集版本（数据重载后递增，可作为结果缓存键的一部分）"""
+        return cls._get_dataset().version
+
+    @classmethod
+    def get_by_ev_type(cls, ev_type: str) -> EVRecordSet:
         """新增：根据电动车类型查询（扩展查询能力）"""
-        ev_type_lower = ev_type.lower()
-        return [
-            record for record in cls._get_all_records()
-            if record.ev_type and record.ev_type.lower() == ev_type_lower
-        ]
+        return cls._lookup(("ev_type",), (ev_type,))
+
+    @classmethod
+    def search_values(cls, field: str, prefix: str, limit: int = 10,
+                      brand: Optional[str] = None) -> List[Dict[str, Any]]:
+        """输入联想：field取值中以prefix开头或包含prefix的项（展示值 + 车辆数）；车型可按品牌限定"""
+        if field not in SEARCH_FIELDS:
+            raise ValueError(f"不支持联想的字段：{field}（可选：{', '.join(SEARCH_FIELDS)}）")
+        dataset = cls._get_dataset()
+        within = None
+        if brand and field == "model":
+            within = dataset.search.term_ids("model", cls.get_brand_models(brand))
+        return dataset.search.suggest(field, prefix, limit, within)
+
+    @classmethod
+    def get_ranking(cls, dimension: str, scope: Dict[str, Optional[str]], metric: str = "vehicles",
+                    share_of: Optional[str] = None, limit: int = 10,
+                    min_vehicles: int = 0) -> Optional[Tuple[List[Dict[str, Any]], int, int]]:
+        """排行榜：范围（州/县/市/品牌/车型/电动车类型，不区分大小写）内按维度取前limit项
+
+        返回（排行，范围内车辆总数，范围内分组数），范围内无数据时返回None；参数无效时抛出ValueError。
+        """
+        if dimension not in RANK_DIMENSIONS:
+            raise ValueError(f"不支持的排行维度：{dimension}（可选：{', '.join(RANK_DIMENSIONS)}）")
+        if metric not in RANK_METRICS:
+            raise ValueError(f"不支持的排行指标：{metric}（可选：{', '.join(RANK_METRICS)}）")
+        if (metric == "share") != bool(share_of):
+            raise ValueError("share指标须同时指定share_of（电动车类型，如BEV），且share_of只用于share指标")
+        fields = tuple(field for field in RANK_SCOPE_FIELDS if scope.get(field))
+        if dimension in fields:
+            raise ValueError(f"排行维度 {dimension} 不能同时作为范围条件")
+        table = cls._get_dataset().rankings.table(fields, dimension, metric, share_of)
+        return table.top(tuple(scope[field] for field in fields), limit, min_vehicles)
+
+    @classmethod
+    def get_brand_model_codes(cls) -> Tuple[np.ndarray, np.ndarray]:
+        """所有（品牌编码，车型编码）组合（去重，按原始字符串排序，预先计算）"""
+        return cls._get_dataset().brand_model_codes
+
+    @classmethod
+    def get_brand_model_pairs(cls) -> List[Tuple[str, str]]:
+        """所有（品牌，车型）组合（去重，按原始字符串排序，预先计算）"""
+        return list(cls._get_dataset().brand_model_pairs)
+
+    @classmethod
+    def get_distinct(cls, field: str) -> List[str]:
+        """某字段全部去重取值（排序，不含缺失，预先计算）"""
+        return list(cls._get_dataset().distinct_values[field])
+
+    @classmethod
+    def get_states(cls) -> List[str]:
+        """所有州（去重排序，不含占位值，预先计算）"""
+        return list(cls._get_dataset().states)
 
 
 # --------------------------
 # 初始化函数（预加载数据，带错误处理）
 # --------------------------
-def init_ev_data() -> None:
-    """初始化电动汽车数据，预加载并验证数据完整性"""
+# 启动耗时预算（秒），超出时打印告警，便于发现数据量或解析路径的退化
+STARTUP_BUDGET_SECONDS = float(os.getenv("EV_STARTUP_BUDGET_SECONDS", "10"))
+
+
+def init_ev_data() -> bool:
+    """初始化电动汽车数据，预加载并验证数据完整性；返回是否加载成功"""
     try:
-        # 预加载数据并缓存
-        EVDataLoader.load_data()
-        # 触发一次记录转换，验证映射是否正确
-        sample_records = EVDataLoader.get_records()[:5]  # 只验证前5条
-        # 修复：用get_records()获取实际模型列表长度（与前端展示的数据量一致）
-        total_records = len(EVDataLoader.get_records())
-        print(f"CSV数据初始化成功，共加载 {total_records} 条记录")
-        print(f"示例数据：{sample_records[0] if sample_records else '无数据'}")
+        # 预加载并物化数据集（每个数据版本只转换一次，后续所有入口共享）
+        start = time.perf_counter()
+        dataset = EVDataRegistry.get()
+        elapsed = time.perf_counter() - start
+        records = dataset.rows()
+        print(f"CSV数据初始化成功，共加载 {len(records)} 条记录"
+              f"（数据版本 v{dataset.version}，来源 {dataset.source}，耗时 {elapsed:.2f}s）")
+        print(f"示例数据：{records[0] if records else '无数据'}")
+        if elapsed > STARTUP_BUDGET_SECONDS:
+            print(f"警告：数据初始化耗时 {elapsed:.2f}s，超出启动预算 {STARTUP_BUDGET_SECONDS:.1f}s")
+        return True
     except Exception as e:
         print(f"CSV数据初始化失败：{str(e)}")
         # 初始化失败时清空缓存，避免后续调用出错
         EVDataLoader.clear_cache()
         EVDataQuery.clear_query_cache()
+        return False
 
 
 # --------------------------
 # 新增：供main.py导入的3个核心函数（解决ImportError）
 # --------------------------
-def get_ev_data(file_name: Optional[str] = None) -> List[ElectricVehicleRecord]:
+def get_ev_data(file_name: Optional[str] = None) -> Union[EVRecordSet, List[ElectricVehicleRecord]]:
     """获取所有电动汽车记录（供接口调用）"""
     try:
-        # 复用EVDataLoader的现有逻辑，避免重复代码
-        return EVDataLoader.get_records(file_name)
+        # 复用共享的物化数据集，避免重复转换
+        return EVDataRegistry.get(file_name).rows()
     except Exception as e:
         print(f"获取所有电动汽车数据失败：{str(e)}")
         return []  # 失败时返回空列表，避免前端崩溃
@@ -248,27 +1781,22 @@ def get_ev_data(file_name: Optional[str] = None) -> List[ElectricVehicleRecord]:
 def get_all_models(file_name: Optional[str] = None) -> List[str]:
     """获取所有车型（去重、排序，供前端下拉选择等场景）"""
     try:
-        all_records = EVDataLoader.get_records(file_name)
-        # 提取非空车型，去重后排序
-        all_models = {record.model for record in all_records if record.model}
-        return sorted(all_models)
+        # 直接在车型编码列上去重，无需逐条构建记录
+        return EVDataRegistry.get(file_name).rows().distinct("model")
     except Exception as e:
         print(f"获取所有车型列表失败：{str(e)}")
         return []
 
 
-def get_model_details(model_name: str, file_name: Optional[str] = None) -> Optional[List[ElectricVehicleRecord]]:
+def get_model_details(model_name: str, file_name: Optional[str] = None) -> Optional[EVRecordSet]:
     """根据车型名称查询详细数据（不区分大小写，支持模糊匹配）"""
     try:
         if not model_name:
             return None
-        model_name_lower = model_name.lower()
-        all_records = EVDataLoader.get_records(file_name)
-        # 筛选匹配的车型（不区分大小写，确保兼容性）
-        matched_records = [
-            record for record in all_records
-            if record.model and model_name_lower in record.model.lower()
-        ]
+        dataset = EVDataRegistry.get(file_name)
+        # 子串匹配走搜索索引（n-gram倒排表定位词条），再由车型索引取行，不扫描全部行
+        search = dataset.search
+        matched_records = dataset.rows(search.rows("model", search.contains("model", model_name)))
         return matched_records if matched_records else None
     except Exception as e:
         print(f"查询车型[{model_name}]详情失败：{str(e)}")
@@ -0,0 +1,151 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from backend import __version__
+from backend.config.database import EVDataRegistry
+from backend.config.metrics import is_profiling, metrics, sample
+
+# --------------------------
+# HTTP条件请求与响应体缓存（按数据版本）
+# --------------------------
+# 只读查询接口：响应只取决于路径、查询参数和已加载的数据版本
+CACHEABLE_PREFIXES: Tuple[str, ...] = ("/api/models", "/api/regions", "/api/search", "/api/rankings")
+UNCACHEABLE_PATHS: Tuple[str, ...] = ("/api/models/detailed-report",)  # 提交任务，有副作用
+HTTP_CACHE_SIZE = int(os.getenv("EV_HTTP_CACHE_SIZE", "512"))  # 最多缓存的响应体数（LRU淘汰）
+HTTP_CACHE_MAX_BODY = int(os.getenv("EV_HTTP_CACHE_MAX_BODY", str(1 << 20)))  # 单个响应体上限（字节），更大的不缓存
+# 构建标识计入ETag：数据未变但发布了新代码（响应结构变化）时，旧ETag不再命中；默认取应用版本号
+BUILD_ID = os.getenv("EV_BUILD_ID") or __version__
+# 构建时刻（Unix秒，EV_BUILD_TIME，默认为进程启动时刻）：Last-Modified取数据修改时间与它的较大者，
+# 只带If-Modified-Since的客户端在发布新代码后同样会拿到新响应（重启只会多一次完整响应，不会返回旧内容）
+BUILD_TIME = float(os.getenv("EV_BUILD_TIME") or time.time())
+
+
+class ResponseCache:
+    """ETag -> 已序列化响应体（LRU）；ETag中含数据版本，数据重载后旧条目不再命中，随LRU淘汰
+
+    只在事件循环线程中访问，无需加锁。
+    """
+
+    def __init__(self, max_entries: int = HTTP_CACHE_SIZE, max_body: int = HTTP_CACHE_MAX_BODY):
+        self.max_entries = max_entries
+        self.max_body = max_body
+        self._entries: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()  # etag -> (响应体, Content-Type)
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, etag: str) -> Optional[Tuple[bytes, str]]:
+        entry = self._entries.get(etag)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(etag)
+        self.hits += 1
+        return entry
+
+    def put(self, etag: str, body: bytes, media_type: str) -> None:
+        if len(body) > self.max_body:
+            return
+        self._entries[etag] = (body, media_type)
+        self._entries.move_to_end(etag)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "not_modified": self.not_modified}
+
+
+# API进程内共享的响应缓存
+response_cache = ResponseCache()
+
+
+def _cache_metrics():
+    """/metrics 采集回调：响应缓存条目数、各结果计数与命中率（304也计为命中）"""
+    stats = response_cache.stats()
+    served = stats["hits"] + stats["not_modified"]
+    total = served + stats["misses"]
+    yield from sample("ev_http_cache_entries", "gauge", "HTTP响应缓存条目数", stats["entries"])
+    yield from sample("ev_http_cache_requests_total", "counter", "可缓存请求按结果计数",
+                      {"hit": stats["hits"], "not_modified": stats["not_modified"], "miss": stats["misses"]},
+                      label="result")
+    yield from sample("ev_http_cache_hit_ratio", "gauge", "HTTP响应缓存命中率（含304）",
+                      round(served / total, 6) if total else 0)
+
+
+metrics.register_collector(_cache_metrics)
+
+
+def is_cacheable(request: Request) -> bool:
+    path = request.url.path
+    return (request.method == "GET" and path.startswith(CACHEABLE_PREFIXES)
+            and not path.rstrip("/").endswith(UNCACHEABLE_PATHS))
+
+
+def compute_etag(data_tag: str, request: Request) -> str:
+    """强ETag：数据版本标识 + 路径 + 规范化（按键排序）的查询参数"""
+    query = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+    digest = hashlib.blake2b(f"{data_tag}\x1f{request.url.path}\x1f{query}".encode("utf-8"), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def _not_modified_since(header: str, modified_at: Optional[float]) -> bool:
+    try:
+        return int(modified_at) <= parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+async def conditional_get(request: Request, call_next):
+    """条件GET中间件：附加ETag/Last-Modified，If-None-Match（或If-Modified-Since）命中时返回304，
+    命中响应体缓存时跳过查询计算与JSON序列化"""
+    if not is_cacheable(request) or is_profiling():
+        return await call_next(request)  # 剖析请求须真实执行查询，不走缓存
+    try:
+        # 与路由处理函数取到同一（请求级固定的）数据版本；内容哈希在多worker、重启之间保持一致
+        dataset = EVDataRegistry.get()
+    except Exception:
+        return await call_next(request)  # 数据未能加载时不缓存，由路由返回错误
+    etag = compute_etag(f"{BUILD_ID}:{dataset.fingerprint or f'v{dataset.version}'}", request)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}  # 允许缓存，但每次使用前须向服务端确认（数据可能已重载）
+    # 数据修改时间未知时不提供Last-Modified，也不按If-Modified-Since判断
+    modified_at = max(dataset.modified_at, BUILD_TIME) if dataset.modified_at else None
+    if modified_at is not None:
+        headers["Last-Modified"] = formatdate(modified_at, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if (if_none_match and _etag_matches(if_none_match, etag)) or (
+            not if_none_match and if_modified_since and _not_modified_since(if_modified_since, modified_at)):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+
+    cached = response_cache.get(etag)
+    if cached is not None:
+        body, media_type = cached
+        return Response(content=body, media_type=media_type, headers={**headers, "X-Cache": "HIT"})
+
+    response = await call_next(request)
+    if response.status_code != 200:
+        return response
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    media_type = response.headers.get("content-type", "application/json")
+    response_cache.put(etag, body, media_type)
+    passthrough = {key: value for key, value in response.headers.items() if key.lower() != "content-length"}
+    return Response(content=body, status_code=200, media_type=media_type,
+                    headers={**passthrough, **headers, "X-Cache": "MISS"})
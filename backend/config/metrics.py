@@ -0,0 +1,215 @@
+import cProfile
+import functools
+import os
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar, Union
+
+from fastapi.responses import JSONResponse
+
+# --------------------------
+# 运行指标（Prometheus文本格式）与单请求分阶段计时/剖析
+# --------------------------
+# 不依赖prometheus_client：指标量少，直接输出 text/plain; version=0.0.4 格式即可被Prometheus抓取
+# 设置 EV_METRICS=0 可关闭数据层分阶段计时（计时装饰器退化为直接调用）
+METRICS_ENABLED = os.getenv("EV_METRICS", "1") != "0"
+PROFILE_TOP_N = int(os.getenv("EV_PROFILE_TOP_N", "40"))  # 剖析结果返回的函数条数（按自身耗时）
+# 请求剖析默认须携带有效的管理令牌；设置 EV_PROFILING=1 时无需令牌即可剖析（仅限受信任的环境）
+PROFILING_OPEN = os.getenv("EV_PROFILING", "0") == "1"
+
+# 接口延迟桶（秒）与数据层阶段耗时桶（秒，覆盖微秒级查表到秒级构建）
+HTTP_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class Histogram:
+    """带标签的累积直方图（线程安全）"""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...], buckets: Tuple[float, ...]):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # 标签值 -> 各桶计数 + [总和, 总数]
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def collect(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for label_values, series in sorted(snapshot.items()):
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, label_values))
+            prefix = labels + "," if labels else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f'{self.name}_bucket{{{prefix}le="{le}"}} {cumulative}'
+            suffix = f"{{{labels}}}" if labels else ""
+            yield f"{self.name}_sum{suffix} {series[-2]:.9f}"
+            yield f"{self.name}_count{suffix} {series[-1]}"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """直方图 + 采集时调用的回调（缓存命中数、数据集版本等由各模块在采集时读取，无需逐次上报）"""
+
+    def __init__(self):
+        self._histograms: List[Histogram] = []
+        self._collectors: List[Callable[[], Iterator[str]]] = []
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...], buckets: Tuple[float, ...]) -> Histogram:
+        histogram = Histogram(name, help_text, labels, buckets)
+        self._histograms.append(histogram)
+        return histogram
+
+    def register_collector(self, collector: Callable[[], Iterator[str]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for histogram in self._histograms:
+            lines.extend(histogram.collect())
+        for collector in self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                lines.append(f"# 采集失败 {getattr(collector, '__name__', collector)}: {_escape(str(e))}")
+        return "\n".join(lines) + "\n"
+
+
+def sample(name: str, metric_type: str, help_text: str, value: Union[float, Dict[str, float]],
+           label: Optional[str] = None) -> Iterator[str]:
+    """输出计数器/仪表盘样本（供采集回调使用）；value为字典时按 label=键 输出多条样本"""
+    yield f"# HELP {name} {help_text}"
+    yield f"# TYPE {name} {metric_type}"
+    if not isinstance(value, dict):
+        yield f"{name} {value}"
+        return
+    for label_value, item in value.items():
+        yield f'{name}{{{label}="{_escape(label_value)}"}} {item}'
+
+
+# API进程内的指标注册表
+metrics = MetricsRegistry()
+http_latency = metrics.histogram("ev_http_request_duration_seconds", "HTTP请求耗时（秒）",
+                                 ("method", "route", "status"), HTTP_BUCKETS)
+stage_latency = metrics.histogram("ev_data_stage_duration_seconds", "数据层各阶段单次调用耗时（秒，嵌套阶段各自计时）",
+                                  ("stage",), STAGE_BUCKETS)
+
+# 当前请求的分阶段耗时（阶段 -> [累计秒数, 调用次数]）；仅在开启了请求级计时的请求内为非None
+_request_stages: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar("ev_request_stages", default=None)
+# 当前请求是否正在剖析（剖析期间数据层调用不切换到线程池，保证被cProfile捕获）
+_profiling: ContextVar[bool] = ContextVar("ev_profiling", default=False)
+_profile_lock = threading.Lock()  # 同一进程同一时刻只剖析一个请求（cProfile全局生效）
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    stage_latency.observe(seconds, stage)
+    stages = _request_stages.get()
+    if stages is not None:
+        entry = stages.setdefault(stage, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+
+def timed(stage: str) -> Callable[[F], F]:
+    """数据层阶段计时装饰器：记入阶段直方图，并累加到当前请求的分阶段耗时（Server-Timing/剖析结果）"""
+    def decorator(func: F) -> F:
+        if not METRICS_ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe_stage(stage, time.perf_counter() - start)
+        return wrapper  # type: ignore[return-value]
+    return decorator
+
+
+def start_request_stages() -> Dict[str, List[float]]:
+    """为当前请求开启分阶段计时，返回（与下游任务/工作线程共享的）耗时表"""
+    stages: Dict[str, List[float]] = {}
+    _request_stages.set(stages)
+    return stages
+
+
+def server_timing(stages: Dict[str, List[float]], total: float) -> str:
+    """Server-Timing响应头：各阶段累计耗时（毫秒）与调用次数"""
+    parts = [f'{stage};dur={seconds * 1e3:.3f};desc="{int(count)}x"'
+             for stage, (seconds, count) in sorted(stages.items(), key=lambda item: -item[1][0])]
+    parts.append(f"total;dur={total * 1e3:.3f}")
+    return ", ".join(parts)
+
+
+def is_profiling() -> bool:
+    return _profiling.get()
+
+
+class TimedJSONResponse(JSONResponse):
+    """默认响应类：JSON序列化计入 json_encode 阶段"""
+
+    def render(self, content: Any) -> bytes:
+        if not METRICS_ENABLED:
+            return super().render(content)
+        start = time.perf_counter()
+        try:
+            return super().render(content)
+        finally:
+            observe_stage("json_encode", time.perf_counter() - start)
+
+
+class ProfilerBusy(Exception):
+    """已有请求正在剖析（同一进程同一时刻只允许一个）"""
+
+
+class RequestProfiler:
+    """单请求剖析（cProfile，剖析期间事件循环线程上执行的全部Python代码都会被记录）"""
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+        self._token = None
+
+    def __enter__(self) -> "RequestProfiler":
+        if not _profile_lock.acquire(blocking=False):
+            raise ProfilerBusy("已有请求正在剖析，请稍后重试")
+        self._token = _profiling.set(True)
+        self._profile.enable()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._profile.disable()
+        _profiling.reset(self._token)
+        _profile_lock.release()
+
+    def top(self, limit: int = PROFILE_TOP_N) -> List[Dict[str, Any]]:
+        """按自身耗时排序的前limit个函数（累计耗时会被事件循环、中间件等外层帧占满）"""
+        stats = pstats.Stats(self._profile)
+        rows = []
+        for (file_name, line, function), (_, calls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({"function": f"{function} ({os.path.basename(file_name)}:{line})", "calls": calls,
+                         "tottime_ms": round(tottime * 1e3, 3), "cumtime_ms": round(cumtime * 1e3, 3)})
+        rows.sort(key=lambda row: -row["tottime_ms"])
+        return rows[:limit]
@@ -0,0 +1,381 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from backend.config.database import (INDEX_KEYS, MISSING_CODE, MISSING_YEAR, NUMERIC_FIELDS, STRING_FIELDS,
+                                     EVDataRegistry, EVDataset, EVRecordStore, group_cells)
+from backend.config.metrics import metrics, sample, timed
+
+# --------------------------
+# 声明式过滤/分组查询（编译为列式数据上的向量化执行计划）
+# --------------------------
+# 查询格式（均可省略）：
+#   filters:  {字段: 取值 | [取值, ...] | {"eq"/"ne"/"in"/"gt"/"gte"/"lt"/"lte": 取值}}，各条件取交集
+#   group_by: [字段, ...]                 字符串字段分组不区分大小写
+#   metrics:  ["count", "count:字段", "sum/mean/min/max:数值字段", ...]，默认 ["count"]
+#   order_by: [指标名或分组字段, ...]      前缀"-"为降序；默认按第一个指标降序
+#   limit:    返回的分组数（top-k），默认 DEFAULT_GROUP_LIMIT
+# 缺失值（空字符串、缺失年份、续航/价格为0或缺失）不满足任何过滤条件，也不参与sum/mean/min/max
+QUERY_FIELDS: Tuple[str, ...] = tuple(STRING_FIELDS) + tuple(NUMERIC_FIELDS)
+STRING_OPS = ("eq", "ne", "in")
+NUMERIC_OPS = ("eq", "ne", "in", "gt", "gte", "lt", "lte")
+AGGREGATE_OPS = ("count", "sum", "mean", "min", "max")
+MAX_GROUP_BY = 4
+DEFAULT_GROUP_LIMIT = 100
+MAX_GROUP_LIMIT = 1000
+PLAN_CACHE_SIZE = int(os.getenv("EV_QUERY_PLAN_CACHE_SIZE", "256"))
+# 整数分组列的取值跨度不超过 max(有效行数×4, 4096) 时按差值稠密编码，否则（如稀疏的大数值）排序去重
+DENSE_INT_SPAN_FACTOR = 4
+DENSE_INT_SPAN_MIN = 1 << 12
+
+_COMPARE: Dict[str, Callable[[np.ndarray, Any], np.ndarray]] = {
+    "eq": np.equal, "ne": np.not_equal, "gt": np.greater, "gte": np.greater_equal,
+    "lt": np.less, "lte": np.less_equal,
+}
+
+
+def _numeric_present(field: str, values: np.ndarray) -> np.ndarray:
+    """数值列的非缺失掩码（与聚合表口径一致：续航/价格为0视为未知）"""
+    if field == "model_year":
+        return values != MISSING_YEAR
+    if field == "vehicle_count":
+        return np.ones(len(values), dtype=bool)
+    return ~np.isnan(values) & (values != 0)
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class QueryPlan:
+    """编译后的执行计划（绑定某一数据版本）
+
+    - 单值等值的字符串条件若覆盖某个二级索引，先按索引取行（取覆盖字段最多的索引）
+    - 其余字符串条件编译为取值表上的布尔查找表，按编码一次take出掩码；数值条件为向量化比较
+    - 分组列：字符串用小写编码，数值用去重后的序号，经 group_cells 合成分组号后 bincount 聚合
+    """
+
+    def __init__(self, store: EVRecordStore, spec: Dict[str, Any]):
+        self.store = store
+        if not isinstance(spec, dict):
+            raise ValueError("查询须为JSON对象")
+        unknown = set(spec) - {"filters", "group_by", "metrics", "order_by", "limit"}
+        if unknown:
+            raise ValueError(f"不支持的查询项：{', '.join(sorted(unknown))}")
+        self.index_spec, self.index_values = None, None
+        self.filters: List[Tuple[str, Callable[[np.ndarray], np.ndarray]]] = []
+        self._compile_filters(spec.get("filters") or {})
+        self.group_by = self._compile_group_by(spec.get("group_by") or [])
+        # 只有未给出metrics时才默认计数；显式给出空列表/null视为无效查询
+        self.metrics = self._compile_metrics(spec.get("metrics", ["count"]))
+        self.order_by = self._compile_order_by(spec.get("order_by"))
+        limit = spec.get("limit", DEFAULT_GROUP_LIMIT)
+        if not isinstance(limit, int) or isinstance(limit, bool) or not 1 <= limit <= MAX_GROUP_LIMIT:
+            raise ValueError(f"limit须为1~{MAX_GROUP_LIMIT}的整数")
+        self.limit = limit
+        # 字符串分组列的排序名次（小写编码 -> 展示值的字典序名次），排序时直接在编码上比较
+        self._ranks = {field: np.argsort(np.argsort(store.folded_display(field), kind="stable"))
+                       for field in self.group_by if field in STRING_FIELDS}
+
+    # ---- 编译 ----
+    def _compile_filters(self, filters: Dict[str, Any]) -> None:
+        if not isinstance(filters, dict):
+            raise ValueError("filters须为 {字段: 条件} 对象")
+        equals: Dict[str, str] = {}
+        conditions: List[Tuple[str, str, Any]] = []
+        for field, condition in filters.items():
+            if field not in QUERY_FIELDS:
+                raise ValueError(f"不支持的过滤字段：{field}（可选：{', '.join(QUERY_FIELDS)}）")
+            if isinstance(condition, dict):
+                if not condition:
+                    raise ValueError(f"{field} 的过滤条件为空")
+                items = list(condition.items())
+            else:
+                items = [("in" if isinstance(condition, list) else "eq", condition)]
+            for op, value in items:
+                conditions.append((field, op, value))
+                if op == "eq" and isinstance(value, str) and field in STRING_FIELDS:
+                    equals[field] = value
+
+        # 覆盖字段最多的索引作为起点，其条件不再重复过滤
+        for spec in INDEX_KEYS:
+            if all(field in equals for field in spec) and len(spec) > len(self.index_spec or ()):
+                self.index_spec = spec
+        covered = set(self.index_spec or ())
+        if self.index_spec:
+            self.index_values = tuple(equals[field] for field in self.index_spec)
+        for field, op, value in conditions:
+            if op == "eq" and field in covered and isinstance(value, str) and value == equals[field]:
+                continue
+            if field in STRING_FIELDS:
+                self.filters.append((field, self._string_filter(field, op, value)))
+            else:
+                self.filters.append((field, self._numeric_filter(field, op, value)))
+
+    def _string_filter(self, field: str, op: str, value: Any) -> Callable[[np.ndarray], np.ndarray]:
+        if op not in STRING_OPS:
+            raise ValueError(f"字符串字段 {field} 不支持运算 {op}（可选：{', '.join(STRING_OPS)}）")
+        values = value if op == "in" else [value]
+        if not isinstance(values, list) or not values or not all(isinstance(v, str) for v in values):
+            raise ValueError(f"{field} 的 {op} 条件须为{'非空字符串列表' if op == 'in' else '字符串'}")
+        folded = self.store.folded_vocab(field)
+        matches = np.isin(folded, [v.lower() for v in values])
+        if op == "ne":
+            matches = ~matches
+        # 末位对应缺失编码-1：缺失值不满足任何条件
+        table = np.append(matches, False)
+        return lambda codes: table.take(codes)
+
+    def _numeric_filter(self, field: str, op: str, value: Any) -> Callable[[np.ndarray], np.ndarray]:
+        if op not in NUMERIC_OPS:
+            raise ValueError(f"数值字段 {field} 不支持运算 {op}（可选：{', '.join(NUMERIC_OPS)}）")
+        if op == "in":
+            if not isinstance(value, list) or not value or not all(_is_number(v) for v in value):
+                raise ValueError(f"{field} 的 in 条件须为非空数值列表")
+            return lambda values: _numeric_present(field, values) & np.isin(values, value)
+        if not _is_number(value):
+            raise ValueError(f"{field} 的 {op} 条件须为数值")
+        compare = _COMPARE[op]
+        return lambda values: _numeric_present(field, values) & compare(values, value)
+
+    @staticmethod
+    def _compile_group_by(group_by: Any) -> Tuple[str, ...]:
+        if isinstance(group_by, str):
+            group_by = [group_by]
+        if not isinstance(group_by, list) or len(group_by) > MAX_GROUP_BY:
+            raise ValueError(f"group_by须为字段列表（最多{MAX_GROUP_BY}个）")
+        for field in group_by:
+            if field not in QUERY_FIELDS:
+                raise ValueError(f"不支持的分组字段：{field}（可选：{', '.join(QUERY_FIELDS)}）")
+        if len(set(group_by)) != len(group_by):
+            raise ValueError("group_by中字段重复")
+        return tuple(group_by)
+
+    @staticmethod
+    def _compile_metrics(names: Any) -> Tuple[Tuple[str, str, Optional[str]], ...]:
+        """指标 -> （输出名，运算，字段）；输出名为 count 或 运算_字段"""
+        if isinstance(names, str):
+            names = [names]
+        if not isinstance(names, list) or not names:
+            raise ValueError("metrics须为非空列表，如 [\"count\", \"mean:electric_range\"]")
+        compiled = []
+        for name in names:
+            op, _, field = str(name).partition(":")
+            if op not in AGGREGATE_OPS:
+                raise ValueError(f"不支持的指标运算：{op}（可选：{', '.join(AGGREGATE_OPS)}）")
+            if not field:
+                if op != "count":
+                    raise ValueError(f"{op} 须指定数值字段，如 {op}:electric_range")
+                compiled.append(("count", op, None))
+            elif op == "count" and field in QUERY_FIELDS or field in NUMERIC_FIELDS:
+                compiled.append((f"{op}_{field}", op, field))
+            else:
+                raise ValueError(f"指标 {name} 的字段无效（{op}只支持数值字段：{', '.join(NUMERIC_FIELDS)}）")
+        if len({alias for alias, _, _ in compiled}) != len(compiled):
+            raise ValueError("metrics中指标重复")
+        return tuple(compiled)
+
+    def _compile_order_by(self, order_by: Any) -> Tuple[Tuple[str, bool], ...]:
+        """排序项 -> （指标名或分组字段，是否降序）；末尾总是追加分组字段升序，保证结果确定"""
+        if order_by is None:
+            order_by = ["-" + self.metrics[0][0]]
+        elif isinstance(order_by, str):
+            order_by = [order_by]
+        if not isinstance(order_by, list):
+            raise ValueError("order_by须为列表，如 [\"-count\"]")
+        names = {alias for alias, _, _ in self.metrics} | set(self.group_by)
+        compiled = []
+        for item in order_by:
+            item = str(item)
+            name = item.lstrip("-")
+            if name not in names:
+                raise ValueError(f"不支持的排序项：{name}（只能是指标或分组字段：{', '.join(sorted(names))}）")
+            compiled.append((name, item.startswith("-")))
+        compiled += [(field, False) for field in self.group_by if field not in dict(compiled)]
+        return tuple(compiled)
+
+    # ---- 执行 ----
+    def _select(self, dataset: EVDataset) -> Optional[np.ndarray]:
+        """满足全部过滤条件的行号（None表示全部行）"""
+        store = self.store
+        rows = None
+        if self.index_spec:
+            rows = dataset.index.lookup(self.index_spec, self.index_values)
+        if not self.filters:
+            return rows
+        mask = None
+        for field, condition in self.filters:
+            column = store.codes(field) if field in STRING_FIELDS else store.values(field)
+            matched = condition(column if rows is None else column[rows])
+            mask = matched if mask is None else mask & matched
+        return np.flatnonzero(mask) if rows is None else rows[mask]
+
+    def _group_column(self, field: str, rows: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """分组列：返回（逐行分组编码，编码 -> 展示值）；缺失编码为-1"""
+        if field in STRING_FIELDS:
+            codes = self.store.folded_codes(field)[0]
+            return (codes if rows is None else codes[rows]), self.store.folded_display(field)
+        values = self.store.values(field)
+        values = values if rows is None else values[rows]
+        present = _numeric_present(field, values)
+        if not present.any():
+            return np.full(len(values), MISSING_CODE, dtype=np.int64), np.empty(0, dtype=object)
+        if values.dtype.kind == "i":
+            # 整数列（年份、车辆数）以与最小值的差为编码，分组走稠密计数表，无需排序去重；
+            # 跨度远大于行数时稠密编码的展示值表会远大于实际分组数，改走下方的排序去重
+            low, high = int(values[present].min()), int(values[present].max())
+            if high - low < max(DENSE_INT_SPAN_FACTOR * int(present.sum()), DENSE_INT_SPAN_MIN):
+                codes = np.where(present, values.astype(np.int64) - low, MISSING_CODE)
+                return codes, np.arange(low, high + 1).astype(object)
+        codes = np.full(len(values), MISSING_CODE, dtype=np.int64)
+        uniques, codes[present] = np.unique(values[present], return_inverse=True)
+        return codes, np.array(uniques.tolist(), dtype=object)
+
+    def _aggregate(self, op: str, field: Optional[str], rows: Optional[np.ndarray],
+                   inverse: np.ndarray, n_groups: int) -> np.ndarray:
+        """单个指标按分组归约，返回float64数组（无有效值的分组为NaN）"""
+        if field is None:
+            return np.bincount(inverse, minlength=n_groups).astype(np.float64)
+        if field in STRING_FIELDS:
+            codes = self.store.codes(field)
+            present = (codes if rows is None else codes[rows]) != MISSING_CODE
+            return np.bincount(inverse, weights=present, minlength=n_groups)
+        values = self.store.values(field)
+        values = (values if rows is None else values[rows]).astype(np.float64)
+        present = _numeric_present(field, values)
+        if op == "count":
+            return np.bincount(inverse, weights=present, minlength=n_groups)
+        counts = np.bincount(inverse[present], minlength=n_groups)
+        if op in ("sum", "mean"):
+            sums = np.bincount(inverse[present], weights=values[present], minlength=n_groups)
+            if op == "sum":
+                return sums
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return np.where(counts > 0, sums / counts, np.nan)
+        ufunc, initial = (np.minimum, np.inf) if op == "min" else (np.maximum, -np.inf)
+        if n_groups == 1:
+            return np.array([ufunc.reduce(values[present]) if counts[0] else np.nan])
+        result = np.full(n_groups, initial)
+        ufunc.at(result, inverse[present], values[present])
+        return np.where(counts > 0, result, np.nan)
+
+    def _order(self, keys: np.ndarray, results: Dict[str, np.ndarray], n_groups: int) -> np.ndarray:
+        """按order_by取前limit个分组的下标（单一主序键时先partition缩小候选再精确排序）"""
+        sort_keys = []
+        for name, descending in self.order_by:
+            if name in results:
+                values = results[name]
+                values = np.where(np.isnan(values), np.inf, -values if descending else values)
+            else:
+                column = keys[:, self.group_by.index(name)]
+                rank = self._ranks.get(name)
+                values = (rank.take(column, mode="clip") if rank is not None else column).astype(np.float64)
+                values = np.where(column == MISSING_CODE, np.inf, -values if descending else values)
+            sort_keys.append(values)
+        candidates = np.arange(n_groups)
+        if self.limit < n_groups:
+            # 主序键不大于第limit小值的分组才可能入选（含并列），其余分组不参与多键排序
+            threshold = np.partition(sort_keys[0], self.limit - 1)[self.limit - 1]
+            candidates = np.flatnonzero(sort_keys[0] <= threshold)
+        order = np.lexsort([key[candidates] for key in reversed(sort_keys)] or [candidates])
+        return candidates[order][:self.limit]
+
+    @timed("query_execute")
+    def execute(self, dataset: EVDataset) -> Dict[str, Any]:
+        rows = self._select(dataset)
+        matched = self.store.size if rows is None else len(rows)
+        if self.group_by:
+            columns = [self._group_column(field, rows) for field in self.group_by]
+            if matched:
+                keys, inverse = group_cells([codes for codes, _ in columns])
+            else:
+                keys, inverse = np.empty((0, len(columns)), dtype=np.int64), np.empty(0, dtype=np.int64)
+        else:
+            keys, inverse = np.empty((1, 0), dtype=np.int64), np.zeros(matched, dtype=np.int64)
+        n_groups = len(keys)
+        results = {alias: self._aggregate(op, field, rows, inverse, n_groups) for alias, op, field in self.metrics}
+
+        groups = []
+        for g in self._order(keys, results, n_groups).tolist():
+            group: Dict[str, Any] = {}
+            for i, (field, (_, display)) in enumerate(zip(self.group_by, columns if self.group_by else [])):
+                code = keys[g, i]
+                group[field] = None if code == MISSING_CODE else display[code]
+            for alias, op, field in self.metrics:
+                value = results[alias][g]
+                if np.isnan(value):
+                    group[alias] = None
+                elif op == "count" or field in ("model_year", "vehicle_count") and op != "mean":
+                    group[alias] = int(value)
+                else:
+                    group[alias] = round(float(value), 2)
+            groups.append(group)
+        return {"groups": groups, "total_groups": n_groups, "matched_records": int(matched)}
+
+
+class QueryPlanCache:
+    """执行计划LRU缓存：键为（数据版本，规范化后的查询JSON），数据重载后旧版本的计划自然失效"""
+
+    def __init__(self, max_entries: int = PLAN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._plans: "OrderedDict[Tuple[int, str], QueryPlan]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, dataset: EVDataset, spec: Dict[str, Any]) -> QueryPlan:
+        try:
+            key = (dataset.version, json.dumps(spec, sort_keys=True, ensure_ascii=False))
+        except (TypeError, ValueError):
+            raise ValueError("查询须为JSON对象")
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                self.hits += 1
+                return plan
+            self.misses += 1
+        plan = _compile(dataset.store, spec)
+        if self.max_entries > 0:
+            with self._lock:
+                self._plans[key] = plan
+                while len(self._plans) > self.max_entries:
+                    self._plans.popitem(last=False)
+        return plan
+
+    def clear(self) -> None:
+        with self._lock:
+            self._plans.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._plans), "hits": self.hits, "misses": self.misses}
+
+
+@timed("query_compile")
+def _compile(store: EVRecordStore, spec: Dict[str, Any]) -> QueryPlan:
+    return QueryPlan(store, spec)
+
+
+plan_cache = QueryPlanCache()
+
+
+def run_aggregate_query(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """执行声明式查询（当前请求固定的数据版本），查询无效时抛出ValueError"""
+    dataset = EVDataRegistry.get()
+    result = plan_cache.get(dataset, spec).execute(dataset)
+    result["data_version"] = dataset.version
+    return result
+
+
+def _plan_cache_metrics() -> Iterator[str]:
+    stats = plan_cache.stats()
+    yield from sample("ev_query_plan_cache_entries", "gauge", "已缓存的查询执行计划数", stats["entries"])
+    yield from sample("ev_query_plan_cache_requests_total", "counter", "查询执行计划缓存查找次数",
+                      {"hit": stats["hits"], "miss": stats["misses"]}, label="result")
+
+
+metrics.register_collector(_plan_cache_metrics)
@@ -0,0 +1,54 @@
+import functools
+import os
+from typing import Any, Callable, Optional, TypeVar
+
+import anyio
+from anyio import to_thread
+
+from backend.config.database import EVDataRegistry
+from backend.config.metrics import is_profiling
+
+# --------------------------
+# 数据查询线程池（让事件循环不被CPU密集的数据层调用阻塞）
+# --------------------------
+# 同时执行的数据层调用上限；独立于anyio默认线程池（静态文件、同步依赖项等使用），
+# 大查询排队时不会占满默认线程池。0表示不使用线程池，在事件循环中直接调用。
+# 默认留一个核给事件循环：单核机器上工作线程无法与事件循环并行，反复争抢GIL只会拉高尾延迟
+QUERY_THREADS = int(os.getenv("EV_QUERY_THREADS", str(min(8, (os.cpu_count() or 1) - 1))))
+
+T = TypeVar("T")
+_limiter: Optional[anyio.CapacityLimiter] = None
+
+
+def _get_limiter() -> anyio.CapacityLimiter:
+    # 在事件循环内首次使用时创建
+    global _limiter
+    if _limiter is None:
+        _limiter = anyio.CapacityLimiter(QUERY_THREADS)
+    return _limiter
+
+
+async def run_query(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """在数据查询线程池中执行同步的数据层调用并等待结果
+
+    工作线程继承当前上下文（含 EVDataRegistry.pinned() 固定的数据版本），与在事件循环中直接调用结果一致。
+    适用于耗时随记录数增长的调用（如索引未覆盖条件的掩码过滤）；
+    索引/聚合表上的O(1)查找只需数微秒，直接调用即可，切换线程的开销反而更大。
+    """
+    if QUERY_THREADS <= 0 or is_profiling():
+        return func(*args, **kwargs)  # 剖析中的请求在当前线程执行，才能被cProfile记录
+    return await to_thread.run_sync(functools.partial(func, *args, **kwargs), limiter=_get_limiter())
+
+
+async def ensure_dataset(file_name: Optional[str] = None) -> None:
+    """数据集尚未加载（启动时加载失败、已失效）时在线程池中构建，避免首个请求在事件循环中解析CSV
+
+    构建失败时不抛出：由路由中的查询再次触发并按原有方式返回错误。
+    """
+    if EVDataRegistry.is_loaded(file_name):
+        return
+    try:
+        # 构建耗时数秒，无论 QUERY_THREADS 如何设置都不在事件循环中执行
+        await to_thread.run_sync(EVDataRegistry.get, file_name)
+    except Exception:
+        pass
@@ -0,0 +1,65 @@
+import os
+import threading
+from typing import Optional, Tuple
+
+from backend.config.database import DEFAULT_CSV_NAME, EVDataRegistry, get_csv_path
+
+# --------------------------
+# CSV文件监视（变更后后台重建数据集并原子替换）
+# --------------------------
+# CSV变更的轮询间隔（秒），0表示不启用文件监视（仍可通过 POST /api/admin/reload 手动触发）
+RELOAD_INTERVAL = float(os.getenv("EV_RELOAD_INTERVAL", "0"))
+
+
+class CSVWatcher:
+    """轮询CSV的大小/修改时间，变化且连续两次轮询保持不变（文件已写完）后触发后台重建
+
+    用stat轮询而非inotify：容器挂载卷、网络文件系统上同样可用，且无需额外依赖。
+    多worker部署时每个worker各自监视，快照构建锁保证只有一个worker解析CSV。
+    """
+
+    def __init__(self, file_name: Optional[str] = None, interval: float = RELOAD_INTERVAL):
+        self.file_name = file_name or DEFAULT_CSV_NAME
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(get_csv_path(self.file_name))
+        except (OSError, ValueError):
+            return None  # 文件暂时不存在（如先删除再写入），等它重新出现
+        return stat.st_size, stat.st_mtime_ns
+
+    def start(self) -> bool:
+        if self.interval <= 0 or self._thread is not None:
+            return False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ev-csv-watch", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def _run(self) -> None:
+        loaded = self._signature()
+        seen = loaded
+        while not self._stop.wait(self.interval):
+            current = self._signature()
+            if current is None or current == loaded:
+                seen = current
+                continue
+            if current != seen:
+                seen = current  # 仍在变化（写入中），下一次轮询再确认
+                continue
+            loaded = current
+            print(f"检测到CSV文件变更，后台重建数据集：{self.file_name}")
+            EVDataRegistry.reload_async(self.file_name)
+
+
+# API进程内的CSV监视器（由main.py在启动/关闭时启停）
+csv_watcher = CSVWatcher()
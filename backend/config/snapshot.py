@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows：无文件锁，退化为各worker各自构建
+    fcntl = None
+
+# --------------------------
+# CSV二进制快照（内存映射的NumPy数组）
+# --------------------------
+# 快照格式版本：列式存储的布局变化时递增，旧快照自动失效
+# v2：增加派生数组（逐行小写编码、索引排序结果），多worker直接映射共享
+SNAPSHOT_FORMAT = 2
+# 设置 EV_SNAPSHOT=0 可禁用快照（每次启动都解析CSV）
+SNAPSHOT_ENABLED = os.getenv("EV_SNAPSHOT", "1") != "0"
+_HASH_CHUNK = 1 << 20
+
+# （编码列，取值表，数值列，派生数组）
+SnapshotColumns = Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray], Dict[str, np.ndarray], Dict[str, np.ndarray]]
+
+
+def snapshot_root(csv_path: str) -> str:
+    """快照根目录：默认与CSV同目录的 .snapshots/，可用 EV_SNAPSHOT_DIR 覆盖"""
+    return os.getenv("EV_SNAPSHOT_DIR") or os.path.join(os.path.dirname(csv_path), ".snapshots")
+
+
+def file_hash(path: str) -> str:
+    """CSV内容哈希（blake2b，分块读取避免整文件入内存）"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_appended(path: str, offset: int, expected_hash: str) -> Optional[Tuple[bytes, bytes, Dict]]:
+    """读取CSV在offset之后追加的字节（增量导入用）
+
+    前offset字节的内容哈希须等于expected_hash（表头及已导入部分未被改动）且offset处恰为行尾，
+    否则返回None由调用方全量重建；成功时返回（表头行，追加部分，新文件的快照键），
+    新键的哈希在同一遍读取中接着前缀计算。
+    追加部分截止到最后一个换行符：写入方追加到一半时只导入完整的行，键的大小与哈希也只覆盖到该处，
+    未写完的行留待下次导入（追加部分还没有完整的行时返回空字节串）。
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        if offset <= 0 or stat.st_size <= offset:
+            return None
+        header = f.readline()
+        f.seek(0)
+        remaining, last = offset, b""
+        while remaining:
+            chunk = f.read(min(_HASH_CHUNK, remaining))
+            if not chunk:
+                return None
+            digest.update(chunk)
+            remaining -= len(chunk)
+            last = chunk[-1:]
+        if digest.hexdigest() != expected_hash or last != b"\n":
+            return None
+        tail = f.read()
+    tail = tail[:tail.rfind(b"\n") + 1]
+    digest.update(tail)
+    key = {"path": os.path.abspath(path), "size": offset + len(tail), "mtime_ns": stat.st_mtime_ns,
+           "hash": digest.hexdigest()}
+    return header, tail, key
+
+
+def key_matches_file(path: str, key: Dict) -> bool:
+    """文件的路径/大小/修改时间仍与键一致（计算键之后文件未被改动）"""
+    return all(key.get(name) == value for name, value in _stat_key(path).items())
+
+
+def _stat_key(csv_path: str) -> Dict:
+    stat = os.stat(csv_path)
+    return {"path": os.path.abspath(csv_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _pointer_path(csv_path: str) -> str:
+    """指向当前快照目录的清单文件（按CSV文件名区分）"""
+    return os.path.join(snapshot_root(csv_path), os.path.basename(csv_path) + ".json")
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def resolve_snapshot_key(csv_path: str) -> Dict:
+    """计算快照键（路径、大小、修改时间、内容哈希）
+
+    路径/大小/修改时间与上次记录一致时直接复用记录的哈希，冷启动无需重读整个CSV；
+    否则重新计算内容哈希（文件被touch或复制过来时，哈希相同仍可命中旧快照）。
+    """
+    key = _stat_key(csv_path)
+    pointer = _read_json(_pointer_path(csv_path))
+    if pointer and pointer.get("format") == SNAPSHOT_FORMAT and all(
+            pointer.get(name) == value for name, value in key.items()):
+        key["hash"] = pointer["hash"]
+    else:
+        key["hash"] = file_hash(csv_path)
+        key["rehashed"] = True
+    return key
+
+
+def _snapshot_dir(csv_path: str, key: Dict) -> str:
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(snapshot_root(csv_path), f"{stem}-v{SNAPSHOT_FORMAT}-{key['hash']}")
+
+
+def load_snapshot(csv_path: str, key: Dict) -> Optional[SnapshotColumns]:
+    """按快照键加载快照（数组以只读内存映射方式打开，多进程共享同一份页缓存）"""
+    directory = _snapshot_dir(csv_path, key)
+    manifest = _read_json(os.path.join(directory, "manifest.json"))
+    if not manifest or manifest.get("format") != SNAPSHOT_FORMAT or manifest.get("hash") != key["hash"]:
+        return None
+    try:
+        codes = {field: np.load(os.path.join(directory, f"{field}.codes.npy"), mmap_mode="r")
+                 for field in manifest["vocabs"]}
+        vocabs = {field: np.array(values, dtype=object) for field, values in manifest["vocabs"].items()}
+        numerics = {field: np.load(os.path.join(directory, f"{field}.npy"), mmap_mode="r")
+                    for field in manifest["numerics"]}
+        derived = {name: np.load(os.path.join(directory, f"{name}.derived.npy"), mmap_mode="r")
+                   for name in manifest.get("derived", [])}
+    except (OSError, ValueError) as e:
+        print(f"读取CSV快照失败，将重新解析CSV：{str(e)}")
+        return None
+    if key.get("rehashed"):
+        _write_pointer(csv_path, key)  # 记录最新的stat信息，下次启动跳过哈希
+    return codes, vocabs, numerics, derived
+
+
+def save_snapshot(csv_path: str, key: Dict, codes: Dict[str, np.ndarray], vocabs: Dict[str, np.ndarray],
+                  numerics: Dict[str, np.ndarray], derived: Optional[Dict[str, np.ndarray]] = None) -> Optional[str]:
+    """写出快照：先写临时目录再原子重命名，多个worker并发写入时只保留先完成的一份"""
+    directory = _snapshot_dir(csv_path, key)
+    root = snapshot_root(csv_path)
+    try:
+        os.makedirs(root, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=root)
+        os.chmod(tmp_dir, 0o755)  # 其他用户运行的worker也需要只读映射
+        for field, array in codes.items():
+            np.save(os.path.join(tmp_dir, f"{field}.codes.npy"), np.ascontiguousarray(array))
+        for field, array in numerics.items():
+            np.save(os.path.join(tmp_dir, f"{field}.npy"), np.ascontiguousarray(array))
+        derived = derived or {}
+        for name, array in derived.items():
+            np.save(os.path.join(tmp_dir, f"{name}.derived.npy"), np.ascontiguousarray(array))
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "hash": key["hash"],
+            "source": key["path"],
+            "rows": int(len(next(iter(numerics.values())))),
+            "vocabs": {field: list(vocab) for field, vocab in vocabs.items()},
+            "numerics": list(numerics),
+            "derived": list(derived),
+        }
+        with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        try:
+            os.rename(tmp_dir, directory)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)  # 其他进程已写好同一快照
+        _write_pointer(csv_path, key)
+        _remove_stale(csv_path, directory)
+        return directory
+    except OSError as e:
+        print(f"写入CSV快照失败（不影响本次加载）：{str(e)}")
+        return None
+
+
+@contextmanager
+def snapshot_build_lock(csv_path: str) -> Iterator[None]:
+    """快照构建锁（按CSV文件的文件锁）：同一时刻只有一个进程解析CSV并写快照
+
+    其余进程阻塞到锁释放后再尝试映射刚写好的快照；进程退出时锁由内核自动释放。
+    目录不可写或平台不支持文件锁时不加锁。
+    """
+    handle = None
+    if fcntl is not None:
+        try:
+            os.makedirs(snapshot_root(csv_path), exist_ok=True)
+            handle = open(os.path.join(snapshot_root(csv_path), os.path.basename(csv_path) + ".lock"), "a")
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        except OSError:
+            if handle is not None:
+                handle.close()
+            handle = None
+    try:
+        yield
+    finally:
+        if handle is not None:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+            handle.close()
+
+
+def _write_pointer(csv_path: str, key: Dict) -> None:
+    pointer_path = _pointer_path(csv_path)
+    try:
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(pointer_path))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"path": key["path"], "size": key["size"], "mtime_ns": key["mtime_ns"],
+                       "hash": key["hash"], "format": SNAPSHOT_FORMAT}, f)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, pointer_path)
+    except OSError:
+        pass  # 清单只是加速手段，写不进去时下次启动重新计算哈希即可
+
+
+def _remove_stale(csv_path: str, keep: str) -> None:
+    """删除同一CSV的旧快照（已映射旧快照的进程仍可继续读取，直到其自行重载）"""
+    stem = os.path.splitext(os.path.basename(csv_path))[0] + "-v"
+    root = snapshot_root(csv_path)
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if name.startswith(stem) and path != keep and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
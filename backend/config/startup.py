@@ -0,0 +1,68 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from backend.config.database import EVDataRegistry, init_ev_data
+
+# --------------------------
+# 启动预热（数据集加载移出模块导入，由main.py的lifespan触发）
+# --------------------------
+# 启动模式：
+#   eager      —— lifespan中同步加载完成后才开始接受请求（原有行为，但不再发生在import时）
+#   background —— 立即接受请求，后台线程预热数据集与任务后端；就绪前到达的数据请求等待构建完成
+#   lazy       —— 不预热，首个数据请求时在线程池中构建
+STARTUP_MODES = ("eager", "background", "lazy")
+STARTUP_MODE = os.getenv("EV_STARTUP_MODE", "background").lower()
+
+
+class DataWarmup:
+    """预热数据集（并提前创建任务后端，首个报告请求无需在事件循环中导入Celery），记录就绪状态"""
+
+    def __init__(self, mode: str = STARTUP_MODE):
+        if mode not in STARTUP_MODES:
+            raise ValueError(f"未知的启动模式 EV_STARTUP_MODE={mode}（可选：{', '.join(STARTUP_MODES)}）")
+        self.mode = mode
+        self.state = "idle"  # idle / loading / ready / failed
+        self.seconds: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> bool:
+        """background模式下启动后台预热线程"""
+        if self.mode != "background" or self._thread is not None:
+            return False
+        self._thread = threading.Thread(target=self.run, name="ev-warmup", daemon=True)
+        self._thread.start()
+        return True
+
+    def run(self) -> bool:
+        """同步预热（eager模式在lifespan中经线程池调用，background模式在预热线程中调用）"""
+        self.state = "loading"
+        start = time.perf_counter()
+        loaded = init_ev_data()
+        self.seconds = time.perf_counter() - start
+        self.state = "ready" if loaded else "failed"
+        try:
+            # 延迟导入：只有预热时才加载任务后端（Celery及其Broker配置）
+            from backend.tasks.task_backend import get_task_backend
+            get_task_backend()
+        except Exception as e:
+            print(f"任务后端预热失败（首个任务请求时重试）：{str(e)}")
+        return loaded
+
+    def ready(self) -> bool:
+        # lazy模式下数据集随首个请求构建，服务本身即视为就绪
+        return EVDataRegistry.is_loaded() or self.mode == "lazy"
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready(),
+            "mode": self.mode,
+            "warmup": self.state,
+            "warmup_seconds": round(self.seconds, 3) if self.seconds is not None else None,
+            "data_loaded": EVDataRegistry.is_loaded(),
+        }
+
+
+# API进程内的启动预热器（由main.py的lifespan触发）
+data_warmup = DataWarmup()
@@ -1,20 +1,53 @@
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.base import BaseHTTPMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
 from pathlib import Path
 import logging
-from backend.routes import model_routes, region_routes, task_routes
-from backend.config.database import init_ev_data
+import time
+from backend import __version__
+from backend.routes import (admin_routes, health_routes, metrics_routes, model_routes, query_routes,
+                            ranking_routes, record_routes, region_routes, search_routes, task_routes)
+from backend.config.database import EVDataRegistry
+from backend.config.http_cache import conditional_get, is_cacheable
+from backend.config.metrics import (PROFILING_OPEN, ProfilerBusy, RequestProfiler, TimedJSONResponse,
+                                    http_latency, server_timing, start_request_stages)
+from backend.config.query_pool import ensure_dataset
+from backend.config.reloader import csv_watcher
+from backend.config.startup import data_warmup
+from backend.tasks.task_backend import local_backend_warning
 import uvicorn
 
+
+# 应用生命周期：数据集加载不在模块导入时进行（EV_STARTUP_MODE 见 backend/config/startup.py）
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warning = local_backend_warning()
+    if warning:
+        logger.warning(warning)
+    if data_warmup.mode == "eager":
+        await run_in_threadpool(data_warmup.run)
+    elif data_warmup.start():
+        logger.info("已启动后台数据预热，就绪状态见 /health/ready")
+    # CSV热重载：文件监视（EV_RELOAD_INTERVAL>0时启用）
+    if csv_watcher.start():
+        logger.info(f"已启用CSV文件监视（间隔 {csv_watcher.interval:g}s），变更后后台重建数据集")
+    yield
+    csv_watcher.stop()
+
+
 # 1. 初始化FastAPI应用
 app = FastAPI(
     title="美国电动汽车数据分析API",
     description="提供电动汽车品牌、车型及区域数据查询接口，支持异步任务处理，基于CSV数据驱动",
-    version="1.0.0",
+    version=__version__,
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=TimedJSONResponse,  # JSON序列化耗时计入 json_encode 阶段
+    lifespan=lifespan
 )
 
 # 2. 配置日志
@@ -26,6 +59,8 @@ logging.basicConfig(
 logger = logging.getLogger("ev_data_api")
 
 # 3. 跨域配置
+# 条件GET与响应体缓存须先于跨域中间件注册（位于其内层），缓存命中的响应同样经过跨域处理
+app.add_middleware(BaseHTTPMiddleware, dispatch=conditional_get)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5500", "http://127.0.0.1:5500", "http://localhost:3000"],
@@ -47,14 +82,62 @@ else:
 app.include_router(model_routes.router)
 app.include_router(region_routes.router)
 app.include_router(task_routes.router)
+app.include_router(record_routes.router)
+app.include_router(search_routes.router)
+app.include_router(query_routes.router)
+app.include_router(ranking_routes.router)
+app.include_router(admin_routes.router)
+app.include_router(health_routes.router)
+app.include_router(metrics_routes.router)
 logger.info("路由模块注册完成")
 
-# 6. 初始化CSV数据（启动时加载）
-try:
-    init_ev_data()
-    logger.info("CSV数据初始化成功，服务可正常提供数据查询")
-except Exception as e:
-    logger.error(f"CSV数据初始化失败：{str(e)}", exc_info=True)
+# 6. 请求级数据版本固定 + 请求耗时指标（CSV数据由lifespan在启动后加载，见上方）
+# 合并为一个最外层中间件（每多一层BaseHTTPMiddleware约增加0.3ms），耗时覆盖缓存/跨域中间件；
+# 流式响应只计到响应头发出。?profile=1 或 X-Profile: 1 时返回该请求的cProfile剖析结果
+# （须携带有效的 X-Admin-Token，或以 EV_PROFILING=1 显式开放）
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    profile = request.query_params.get("profile") == "1" or request.headers.get("x-profile") == "1"
+    if profile and not (PROFILING_OPEN or admin_routes.is_admin(request.headers.get("x-admin-token"))):
+        return JSONResponse(status_code=403, content={"success": False, "message": "剖析需要有效的管理令牌",
+                                                      "error_code": 403, "path": request.url.path})
+    stages = start_request_stages()
+    start = time.perf_counter()
+    # 同一请求内的多次查询固定在同一数据版本，热重载替换数据集时进行中的请求仍读旧版本
+    with EVDataRegistry.pinned():
+        if request.url.path.startswith("/api/"):
+            # 数据集未就绪时在查询线程池中构建并固定到本请求，路由及缓存中间件不会在事件循环中解析CSV
+            await ensure_dataset()
+        if not profile:
+            response = await call_next(request)
+        else:
+            try:
+                with RequestProfiler() as profiler:
+                    response = await call_next(request)
+                    body_bytes = 0
+                    async for chunk in response.body_iterator:  # 序列化/流式生成也计入剖析
+                        body_bytes += len(chunk)
+            except ProfilerBusy as e:
+                return JSONResponse(status_code=409, content={"success": False, "message": str(e),
+                                                              "error_code": 409, "path": request.url.path})
+    elapsed = time.perf_counter() - start
+    # 缓存命中/304在路由匹配前返回；可缓存路径不含路径参数，直接以路径为标签
+    route = getattr(request.scope.get("route"), "path", None)
+    route = route or (request.url.path if is_cacheable(request) else "unmatched")
+    http_latency.observe(elapsed, request.method, route, str(response.status_code))
+    timing = server_timing(stages, elapsed)
+    if profile:
+        return JSONResponse(headers={"Server-Timing": timing}, content={"success": True, "data": {
+            "path": request.url.path,
+            "status": response.status_code,
+            "body_bytes": body_bytes,
+            "duration_ms": round(elapsed * 1e3, 3),
+            "stages": {stage: {"ms": round(seconds * 1e3, 3), "calls": int(calls)}
+                       for stage, (seconds, calls) in stages.items()},
+            "profile": profiler.top(),
+        }})
+    response.headers["Server-Timing"] = timing
+    return response
 
 # 7. 根路径接口
 @app.get("/", response_class=HTMLResponse, tags=["首页"])
@@ -0,0 +1,57 @@
+import hmac
+import os
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from backend.config.database import EVDataRegistry
+from backend.config.http_cache import response_cache
+
+router = APIRouter(
+    prefix="/api/admin",
+    tags=["数据管理"],
+    responses={403: {"description": "管理令牌无效"}}
+)
+
+# 管理接口须携带与 EV_ADMIN_TOKEN 相同的 X-Admin-Token 请求头；未配置令牌时管理接口一律拒绝（默认关闭）
+ADMIN_TOKEN = os.getenv("EV_ADMIN_TOKEN")
+
+
+def is_admin(token: Optional[str]) -> bool:
+    """请求头中的令牌与已配置的管理令牌一致（未配置令牌时恒为False）"""
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+def _check_token(token: Optional[str]) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="未配置 EV_ADMIN_TOKEN，管理接口已禁用")
+    if not is_admin(token):
+        raise HTTPException(status_code=403, detail="管理令牌无效")
+
+
+@router.post("/reload")
+async def reload_data(
+    wait: bool = Query(False, description="是否等待重建完成后再返回"),
+    force: bool = Query(False, description="CSV内容未变化时也重建"),
+    x_admin_token: Optional[str] = Header(None)
+):
+    """重新加载CSV：后台构建新版本的存储、索引和聚合表，完成后原子替换
+
+    重建期间所有请求继续使用旧版本，不会等待；wait=true时在线程池中同步重建，返回新版本号。
+    """
+    _check_token(x_admin_token)
+    if wait:
+        try:
+            await run_in_threadpool(EVDataRegistry.reload, None, force)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"数据重建失败，继续使用当前版本：{str(e)}")
+        return {"success": True, "message": "数据已重新加载", "data": EVDataRegistry.reload_status()}
+    EVDataRegistry.reload_async(force=force)
+    return {"success": True, "message": "数据重建已在后台开始，完成后自动切换到新版本",
+            "data": EVDataRegistry.reload_status()}
+
+
+@router.get("/dataset")
+async def get_dataset_status(x_admin_token: str = Header(None)):
+    """当前数据版本、记录数、后台重建状态及HTTP响应缓存命中统计"""
+    _check_token(x_admin_token)
+    return {"success": True, "data": {**EVDataRegistry.reload_status(), "http_cache": response_cache.stats()}}
@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from backend.config.startup import data_warmup
+
+# 存活/就绪探针：不在/api下，不经过数据版本固定与响应缓存，探测时不会触发数据集构建
+router = APIRouter(
+    prefix="/health",
+    tags=["健康检查"],
+    responses={503: {"description": "服务尚未就绪"}}
+)
+
+
+@router.get("/live")
+async def liveness():
+    """存活探针：进程能响应请求即返回200（数据集是否加载不影响）"""
+    return {"success": True, "data": {"status": "alive"}}
+
+
+@router.get("/ready")
+async def readiness():
+    """就绪探针：数据集已加载（lazy模式下始终就绪）返回200，否则返回503及预热状态"""
+    status = data_warmup.status()
+    if not status["ready"]:
+        return JSONResponse(status_code=503, content={"success": False, "data": status})
+    return {"success": True, "data": status}
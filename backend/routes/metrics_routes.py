@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from backend.config.metrics import metrics
+
+# Prometheus抓取端点：不在/api下，不经过数据版本固定与响应缓存
+router = APIRouter(tags=["运行指标"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus文本格式指标：接口延迟直方图、数据层分阶段耗时直方图、缓存命中率、数据集版本等"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
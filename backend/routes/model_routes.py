@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Query, HTTPException
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Body, Query, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from backend.services.model_service import get_model_data, get_model_list  # 保留服务层调用（后续可迁移逻辑到EVDataQuery）
-from backend.tasks.data_tasks import generate_detailed_report
+from backend.tasks.task_backend import TaskQueueFullError, get_task_backend
+from backend.tasks.report_cache import report_cache, report_key
 from backend.config.database import EVDataQuery  # 引入CSV数据查询工具
+from backend.services.pagination import MAX_PAGE_SIZE, paginate, parse_batch, parse_fields
 
 # 定义路由前缀和标签
 router = APIRouter(
@@ -10,42 +14,40 @@ router = APIRouter(
     responses={404: {"description": "未找到"}}
 )
 
+MODEL_LIST_FIELDS = ("brand", "model")
+
 @router.get("/list")
 async def get_available_models(
-    brand: str = Query(None, description="品牌过滤（可选，如tesla）")
+    brand: str = Query(None, description="品牌过滤（可选，如tesla）"),
+    cursor: str = Query(None, description="分页游标（上一页返回的next_cursor）"),
+    limit: int = Query(None, ge=1, le=MAX_PAGE_SIZE, description="每页条数（可选，未传cursor与limit时返回全部）"),
+    fields: str = Query(None, description="返回字段（逗号分隔，可选：brand,model）")
 ):
-    """获取所有可用车型列表（支持品牌过滤，数据来自CSV）"""
-    # 适配CSV查询工具：获取指定品牌的所有车型（去重排序）
-    if brand:
-        models = [{"brand": brand, "model": model} for model in EVDataQuery.get_brand_models(brand)]
-    else:
-        # 若需全品牌车型，可扩展EVDataQuery实现全品牌查询
-        all_records = EVDataQuery._get_all_records()
-        brand_model_set = {(r.make, r.model) for r in all_records if r.make and r.model}
-        models = [{"brand": b, "model": m} for b, m in sorted(brand_model_set)]
+    """获取所有可用车型列表（支持品牌过滤、游标分页与字段投影，数据来自CSV）"""
+    # 数据层预先去重排序：指定品牌时为该品牌的车型列表，否则为全部（品牌，车型）组合
+    try:
+        names = parse_fields(fields, MODEL_LIST_FIELDS)
+        if brand:
+            page, next_cursor = paginate(EVDataQuery.get_brand_models(brand), cursor, limit)
+            models = [{"brand": brand, "model": model} for model in page]
+        else:
+            page, next_cursor = paginate(EVDataQuery.get_brand_model_pairs(), cursor, limit)
+            models = [{"brand": b, "model": m} for b, m in page]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     if not models:
         raise HTTPException(status_code=404, detail="未找到车型数据")
-    return {"success": True, "data": models}
+    if len(names) < len(MODEL_LIST_FIELDS):
+        models = [{name: item[name] for name in names} for item in models]
+    return {"success": True, "data": models, "next_cursor": next_cursor}
 
-@router.get("/")
-async def query_model(
-    brand: str = Query(..., description="品牌（如tesla）"),
-    model: str = Query(..., description="车型（如Model 3）")
-):
-    """查询特定车型的基础数据（数据来自CSV）"""
-    # 从品牌记录中筛选匹配车型
-    brand_records = EVDataQuery.get_by_brand(brand)
-    target_record = next(
-        (r for r in brand_records if r.model and r.model.lower() == model.lower()),
-        None
-    )
-    
-    if not target_record:
-        raise HTTPException(status_code=404, detail="未找到该车型数据")
-    
-    # 构造返回数据（映射CSV字段）
-    return {"success": True, "data": {
+def _model_data(brand: str, model: str) -> Optional[Dict[str, Any]]:
+    """车型基础数据（取该车型首次出现的记录，映射CSV字段），未命中返回None"""
+    target_record = EVDataQuery.get_model_first_record(brand, model)
+    if target_record is None:
+        return None
+    return {
         "brand": target_record.make,
         "model": target_record.model,
         "model_year": target_record.model_year,
@@ -53,7 +55,33 @@ async def query_model(
         "electric_range": target_record.electric_range,
         "base_msrp": target_record.base_msrp,
         "cafv_eligibility": target_record.cafv_eligibility
-    }}
+    }
+
+@router.get("/")
+async def query_model(
+    brand: str = Query(..., description="品牌（如tesla）"),
+    model: str = Query(..., description="车型（如Model 3）")
+):
+    """查询特定车型的基础数据（数据来自CSV）"""
+    data = _model_data(brand, model)
+    if data is None:
+        raise HTTPException(status_code=404, detail="未找到该车型数据")
+    return {"success": True, "data": data}
+
+@router.post("/batch")
+async def query_models_batch(
+    items: List[Dict[str, Any]] = Body(..., embed=True, description="车型列表，如 [{\"brand\": \"TESLA\", \"model\": \"MODEL 3\"}]")
+):
+    """批量查询车型基础数据：一次请求返回多个车型，结果与items逐项对应（未找到的项为null）
+
+    同一请求内固定在同一数据版本，每项只查一次预计算的车型聚合表，不逐项发起HTTP请求。
+    """
+    try:
+        pairs = parse_batch(items, ("brand", "model"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    data = [_model_data(brand, model) for brand, model in pairs]
+    return {"success": True, "data": data, "found": sum(item is not None for item in data)}
 
 @router.get("/detailed-report")
 async def create_detailed_report(
@@ -62,19 +90,29 @@ async def create_detailed_report(
 ):
     """提交详细报告生成任务（异步，基于CSV数据）"""
     # 验证车型是否存在（使用CSV查询工具）
-    brand_records = EVDataQuery.get_by_brand(brand)
-    model_exists = any(
-        r.model and r.model.lower() == model.lower() 
-        for r in brand_records
-    )
+    model_exists = bool(EVDataQuery.get_by_brand_model(brand, model))
     
     if not model_exists:
         raise HTTPException(status_code=404, detail="未找到该车型数据，无法生成报告")
     
-    # 提交Celery任务（传递品牌和车型）
-    task = generate_detailed_report.delay(brand, model)
+    # 同一数据版本下相同车型的报告：已有结果直接复用，进行中则复用其task_id，不再重复入队
+    key = report_key(brand, model, EVDataQuery.get_data_version())
+    backend = get_task_backend()
+    try:
+        # Celery后端入队需访问Broker（网络I/O），放到线程池中执行，不阻塞事件循环
+        task_id, source = await run_in_threadpool(
+            report_cache.submit, key, lambda: backend.submit("generate_detailed_report", brand, model))
+    except TaskQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    messages = {
+        "cached": "详细报告已生成（命中缓存），可直接查询结果",
+        "inflight": "相同车型的报告正在生成中，已复用该任务",
+        "submitted": "详细报告生成任务已提交，正在处理中（基于CSV数据）",
+    }
     return {
         "success": True,
-        "task_id": task.id,
-        "message": "详细报告生成任务已提交，正在处理中（基于CSV数据）"
-    }
\ No newline at end of file
+        "task_id": task_id,
+        "cached": source == "cached",
+        "deduplicated": source == "inflight",
+        "message": messages[source]
+    }
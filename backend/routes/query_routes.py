@@ -0,0 +1,34 @@
+from typing import Any, Dict
+from fastapi import APIRouter, Body, HTTPException
+from backend.config.query_engine import run_aggregate_query
+from backend.config.query_pool import run_query
+
+router = APIRouter(
+    prefix="/api/query",
+    tags=["自定义查询"],
+    responses={400: {"description": "无效的查询"}}
+)
+
+QUERY_EXAMPLE = {
+    "filters": {"make": "TESLA", "model_year": {"gte": 2020}},
+    "group_by": ["county"],
+    "metrics": ["count", "sum:vehicle_count", "mean:electric_range"],
+    "order_by": ["-sum_vehicle_count"],
+    "limit": 10,
+}
+
+
+@router.post("/")
+async def aggregate_query(
+    spec: Dict[str, Any] = Body(..., examples=[QUERY_EXAMPLE], description="声明式查询（格式见 backend/config/query_engine.py）")
+):
+    """自定义过滤/分组统计：任意记录字段过滤，按字段分组，count/sum/mean/min/max指标，按指标取top-k
+
+    查询编译为列式数据上的向量化执行计划并按数据版本缓存，相同结构的查询不再重复编译。
+    """
+    # 未被索引覆盖的条件与分组需扫描候选行，放到查询线程池执行
+    try:
+        result = await run_query(run_aggregate_query, spec)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, "data": result}
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Query, HTTPException
+from backend.config.database import EVDataQuery, RANK_METRICS
+from backend.config.query_pool import run_query
+
+router = APIRouter(
+    prefix="/api/rankings",
+    tags=["排行榜"],
+    responses={404: {"description": "未找到"}, 400: {"description": "无效的参数"}}
+)
+
+MAX_RANKING_LIMIT = 100
+
+
+@router.get("/{dimension}")
+async def get_ranking(
+    dimension: str,
+    state: str = Query(None, description="州（可选，范围条件均不区分大小写）"),
+    county: str = Query(None, description="县（可选）"),
+    city: str = Query(None, description="城市（可选）"),
+    make: str = Query(None, description="品牌（可选）"),
+    model: str = Query(None, description="车型（可选）"),
+    ev_type: str = Query(None, description="电动车类型（可选）"),
+    metric: str = Query("vehicles", description=f"排序指标（{'/'.join(RANK_METRICS)}）"),
+    share_of: str = Query(None, description="metric=share时的电动车类型（如BEV、PHEV或完整类型名）"),
+    min_vehicles: int = Query(0, ge=0, description="只排名车辆数不少于该值的项（按占比排名时过滤小样本）"),
+    limit: int = Query(10, ge=1, le=MAX_RANKING_LIMIT, description="返回的名次数")
+):
+    """排行榜：指定范围内按品牌/车型/州/城市/县/电力供应商排名（车辆数、记录数或某电动车类型占比）
+
+    例：/api/rankings/model?state=WA 为该州车型Top10；/api/rankings/city?metric=share&share_of=BEV 为纯电占比最高的城市。
+    dimension可选：make/model/state/city/county/electric_utility。
+    每个数据版本首次查询某种范围组合时一次分组构建有序排行表，之后的查询只取表中一段。
+    """
+    scope = {"state": state, "county": county, "city": city, "make": make, "model": model, "ev_type": ev_type}
+    try:
+        # 首次查询某范围组合时需一次全表分组构建排行表，在查询线程池中执行以免阻塞事件循环
+        result = await run_query(EVDataQuery.get_ranking, dimension, scope, metric, share_of, limit, min_vehicles)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="该范围内无排行数据")
+    ranking, total_vehicles, total_groups = result
+    for item in ranking:
+        # share：占范围内车辆总数的百分比；type_share：该项内指定电动车类型的车辆占比（仅metric=share）
+        score = item.pop("score")
+        item["share"] = round(item["vehicles"] / total_vehicles * 100, 2) if total_vehicles else 0.0
+        if metric == "share":
+            item["type_share"] = round(score, 2)
+    return {"success": True, "data": ranking, "total_vehicles": total_vehicles, "total_groups": total_groups}
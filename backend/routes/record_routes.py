@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+from typing import Iterator, Tuple
+from fastapi import APIRouter, Query, HTTPException
+from fastapi.responses import StreamingResponse
+from backend.config.database import EVDataQuery, EVRecordSet, RECORD_FIELDS
+from backend.config.query_pool import run_query
+from backend.services.pagination import parse_fields
+
+router = APIRouter(
+    prefix="/api/records",
+    tags=["原始记录"],
+    responses={404: {"description": "未找到"}}
+)
+
+EXPORT_CHUNK_ROWS = 2000  # 每次解码/序列化的行数：内存占用与单个分块大小相关，与结果总行数无关
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def _ndjson_chunks(records: EVRecordSet, fields: Tuple[str, ...]) -> Iterator[bytes]:
+    for chunk in records.chunks(EXPORT_CHUNK_ROWS):
+        columns = chunk.to_columns(fields)
+        lines = (json.dumps(dict(zip(fields, row)), ensure_ascii=False)
+                 for row in zip(*(columns[field] for field in fields)))
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _csv_chunks(records: EVRecordSet, fields: Tuple[str, ...]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for chunk in records.chunks(EXPORT_CHUNK_ROWS):
+        columns = chunk.to_columns(fields)
+        writer.writerows(zip(*(columns[field] for field in fields)))
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+
+@router.get("/export")
+async def export_records(
+    format: str = Query("ndjson", description="导出格式：ndjson 或 csv"),
+    state: str = Query(None, description="州（可选，不区分大小写）"),
+    county: str = Query(None, description="县（可选）"),
+    city: str = Query(None, description="城市（可选）"),
+    make: str = Query(None, description="品牌（可选）"),
+    model: str = Query(None, description="车型（可选）"),
+    ev_type: str = Query(None, description="电动车类型（可选，如Battery Electric Vehicle (BEV)）"),
+    model_year: int = Query(None, description="车型年份（可选）"),
+    fields: str = Query(None, description="导出字段（逗号分隔，可选，默认全部记录字段）")
+):
+    """按条件流式导出原始记录（NDJSON或CSV，分块生成，内存占用与结果行数无关）"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"不支持的导出格式：{format}（可选：{', '.join(EXPORT_FORMATS)}）")
+    try:
+        names = parse_fields(fields, RECORD_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # 未被索引覆盖的条件需在候选行上做掩码过滤，耗时随行数增长，放到查询线程池执行
+    records = await run_query(
+        EVDataQuery.filter_records,
+        {"state": state, "county": county, "city": city, "make": make, "model": model, "ev_type": ev_type},
+        model_year=model_year)
+    if not records:
+        raise HTTPException(status_code=404, detail="未找到符合条件的记录")
+
+    # 生成器持有所选数据版本的行集合，导出期间数据热重载不影响本次结果
+    chunks = _csv_chunks(records, names) if format == "csv" else _ndjson_chunks(records, names)
+    headers = {"X-Record-Count": str(len(records)), "X-Data-Version": str(EVDataQuery.get_data_version())}
+    if format == "csv":
+        headers["Content-Disposition"] = 'attachment; filename="ev_records.csv"'
+    return StreamingResponse(chunks, media_type=EXPORT_FORMATS[format], headers=headers)
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Query, HTTPException
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Body, Query, HTTPException
 from backend.config.database import EVDataQuery  # 引入CSV数据查询工具
+from backend.services.pagination import MAX_PAGE_SIZE, paginate, parse_batch
 
 router = APIRouter(
     prefix="/api/regions",
@@ -8,30 +10,37 @@ router = APIRouter(
 )
 
 @router.get("/states")
-async def get_all_states():
-    """获取所有州列表（数据来自CSV）"""
-    # 从所有记录中提取不重复的州，排除空值并排序
-    all_records = EVDataQuery._get_all_records()
-    states = {record.state for record in all_records if record.state and record.state != "未知"}
-    sorted_states = sorted(states)
+async def get_all_states(
+    cursor: str = Query(None, description="分页游标（上一页返回的next_cursor）"),
+    limit: int = Query(None, ge=1, le=MAX_PAGE_SIZE, description="每页条数（可选，未传cursor与limit时返回全部）")
+):
+    """获取所有州列表（支持游标分页，数据来自CSV）"""
+    # 数据层预先去重排序的州列表（排除空值）
+    try:
+        sorted_states, next_cursor = paginate(EVDataQuery.get_states(), cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     if not sorted_states:
         raise HTTPException(status_code=404, detail="未找到州数据")
-    return {"success": True, "data": sorted_states}
+    return {"success": True, "data": sorted_states, "next_cursor": next_cursor}
 
 @router.get("/cities")
 async def get_cities(
-    state: str = Query(..., description="州名称（如california，不区分大小写）")
+    state: str = Query(..., description="州名称（如california，不区分大小写）"),
+    cursor: str = Query(None, description="分页游标（上一页返回的next_cursor）"),
+    limit: int = Query(None, ge=1, le=MAX_PAGE_SIZE, description="每页条数（可选，未传cursor与limit时返回全部）")
 ):
-    """根据州获取城市列表（数据来自CSV）"""
-    # 获取指定州的所有记录，提取不重复的城市
-    state_records = EVDataQuery.get_by_state(state)
-    cities = {record.city for record in state_records if record.city}
-    sorted_cities = sorted(cities)
+    """根据州获取城市列表（支持游标分页，数据来自CSV）"""
+    # 数据层预先按州分组、去重排序的城市列表，无需每次从该州全部记录中提取
+    try:
+        sorted_cities, next_cursor = paginate(EVDataQuery.get_state_cities(state), cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     if not sorted_cities:
         raise HTTPException(status_code=404, detail=f"未找到{state}的城市数据")
-    return {"success": True, "data": sorted_cities}
+    return {"success": True, "data": sorted_cities, "next_cursor": next_cursor}
 
 @router.get("/counties")
 async def get_counties(
@@ -40,18 +49,29 @@ async def get_counties(
 ):
     """根据城市和所属州获取县列表（数据来自CSV）"""
     # 先通过州筛选，再通过城市筛选，提取不重复的县
-    state_records = EVDataQuery.get_by_state(state)
-    city_records = [
-        r for r in state_records 
-        if r.city and r.city.lower() == city.lower()
-    ]
-    counties = {record.county for record in city_records if record.county}
-    sorted_counties = sorted(counties)
+    city_records = EVDataQuery.get_by_region(state, city)
+    sorted_counties = city_records.distinct("county")
     
     if not sorted_counties:
         raise HTTPException(status_code=404, detail=f"未找到{city}的县数据")
     return {"success": True, "data": sorted_counties}
 
+def _region_data(state: str, city: Optional[str] = None, county: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """区域汇总数据（查预计算的区域聚合表，州/市/县组合，不区分大小写），未命中返回None"""
+    summary = EVDataQuery.get_region_summary(state, city, county)
+    if not summary:
+        return None
+    return {
+        "state": state,
+        "city": city,
+        "county": county,
+        "total_ev_count": summary["vehicles"],
+        # 估算值：有电力供应商信息的记录数（CSV中无充电站数量），根据实际业务调整
+        "charging_stations_estimated": summary["utility_records"],
+        "ev_type_distribution": dict(summary["ev_type_distribution"]),
+        "record_count": summary["records"]  # 数据记录条数
+    }
+
 @router.get("/")
 async def query_region(
     state: str = Query(..., description="州"),
@@ -59,41 +79,22 @@ async def query_region(
     county: str = Query(None, description="县（可选）")
 ):
     """查询特定区域的电动汽车数据（数据来自CSV）"""
-    # 基础筛选：先按州过滤
-    records = EVDataQuery.get_by_state(state)
-    
-    # 可选筛选：城市
-    if city:
-        city_lower = city.lower()
-        records = [r for r in records if r.city and r.city.lower() == city_lower]
-    
-    # 可选筛选：县
-    if county:
-        county_lower = county.lower()
-        records = [r for r in records if r.county and r.county.lower() == county_lower]
-    
-    if not records:
+    data = _region_data(state, city, county)
+    if data is None:
         raise HTTPException(status_code=404, detail="未找到该区域数据")
-    
-    # 计算汇总数据（基于CSV中的字段）
-    total_ev = sum(record.vehicle_count for record in records)
-    total_stations = sum(
-        # 假设CSV中"Electric Utility"字段可能包含充电站相关信息，此处简化处理
-        1 for record in records if record.electric_utility  # 实际场景可能需要更精确的统计逻辑
-    )
-    # 提取该区域的电动车类型分布
-    ev_type_distribution = {}
-    for record in records:
-        if record.ev_type:
-            ev_type = record.ev_type
-            ev_type_distribution[ev_type] = ev_type_distribution.get(ev_type, 0) + record.vehicle_count
-    
-    return {"success": True, "data": {
-        "state": state,
-        "city": city,
-        "county": county,
-        "total_ev_count": total_ev,
-        "charging_stations_estimated": total_stations,  # 估算值，根据实际业务调整
-        "ev_type_distribution": ev_type_distribution,
-        "record_count": len(records)  # 数据记录条数
-    }}
\ No newline at end of file
+    return {"success": True, "data": data}
+
+@router.post("/batch")
+async def query_regions_batch(
+    items: List[Dict[str, Any]] = Body(..., embed=True, description="区域列表，如 [{\"state\": \"WA\", \"city\": \"Seattle\"}]（city、county可选）")
+):
+    """批量查询区域数据：一次请求返回多个区域，结果与items逐项对应（未找到的项为null）
+
+    同一请求内固定在同一数据版本，每项只查一次预计算的区域聚合表，不逐项发起HTTP请求。
+    """
+    try:
+        regions = parse_batch(items, ("state",), ("city", "county"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    data = [_region_data(state, city, county) for state, city, county in regions]
+    return {"success": True, "data": data, "found": sum(item is not None for item in data)}
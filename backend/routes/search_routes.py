@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Query, HTTPException
+from backend.config.database import EVDataQuery, SEARCH_FIELDS
+
+router = APIRouter(
+    prefix="/api/search",
+    tags=["搜索联想"],
+    responses={400: {"description": "无效的字段"}, 422: {"description": "输入内容为空"}}
+)
+
+MAX_SUGGESTIONS = 50
+
+
+@router.get("/autocomplete")
+async def autocomplete(
+    field: str = Query(..., description=f"联想字段（{'/'.join(SEARCH_FIELDS)}）"),
+    q: str = Query(..., min_length=1, max_length=64, description="已输入的内容（不区分大小写）"),
+    limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS, description="最多返回的联想条数"),
+    brand: str = Query(None, description="品牌（可选，field=model时只联想该品牌的车型）")
+):
+    """输入联想：前缀匹配的取值在前、包含输入子串的在后，同类按车辆数降序（基于取值表搜索索引）"""
+    # min_length只校验原始长度，纯空白的输入在去除首尾空白后同样视为空
+    q = q.strip()
+    if not q:
+        raise HTTPException(status_code=422, detail="输入内容不能为空")
+    try:
+        suggestions = EVDataQuery.search_values(field, q, limit, brand)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # 无匹配时返回空列表（联想场景下不视为错误）
+    return {"success": True, "data": suggestions}
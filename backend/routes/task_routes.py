@@ -1,6 +1,12 @@
+import asyncio
+import json
+import time
 from fastapi import APIRouter, Path, HTTPException
-from typing import Dict, Any
-from backend.config.celery_config import app as celery_app
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Dict, Any
+from backend.tasks.task_backend import TaskNotFoundError, TaskState, get_task_backend
+from backend.tasks.report_cache import report_cache
 
 router = APIRouter(
     prefix="/api/tasks",
@@ -8,32 +14,25 @@ router = APIRouter(
     responses={404: {"description": "任务未找到"}, 400: {"description": "无效的任务ID"}}
 )
 
-@router.get("/{task_id}", response_model=Dict[str, Any])
-async def get_task_result(
-    task_id: str = Path(..., 
-                       description="Celery异步任务的唯一标识ID",
-                       min_length=32,  # 通常Celery任务ID长度为36位左右，增加基本校验
-                       max_length=40)
-):
-    """查询异步任务的执行状态和结果
-    
-    支持的任务状态：
-    - pending: 任务等待执行
-    - running: 任务正在执行
-    - success: 任务执行成功（返回结果）
-    - failure: 任务执行失败（返回错误信息）
-    - revoked: 任务被取消
-    - retry: 任务正在重试
-    """
-    try:
-        task = celery_app.AsyncResult(task_id)
-    except Exception as e:
-        raise HTTPException(
-            status_code=400,
-            detail=f"无效的任务ID: {str(e)}"
-        )
+STREAM_HEARTBEAT_SECONDS = 15  # SSE心跳间隔（防止代理断开空闲连接）
+STREAM_MAX_SECONDS = 600  # 单个SSE连接的最长时间，超时后客户端可重连或改为轮询
+
+TASK_ID_PARAM = dict(description="异步任务的唯一标识ID（Celery或本地任务后端）",
+                     min_length=32,  # 通常Celery任务ID长度为36位左右，增加基本校验
+                     max_length=40)
+
+
+def _cached_payload(task_id: str) -> Any:
+    """报告缓存命中：直接返回结果，无需访问Broker/结果后端"""
+    cached = report_cache.get_result(task_id)
+    if cached is None:
+        return None
+    return {"success": True, "task_id": task_id, "status": "success",
+            "message": "任务执行成功（缓存结果）", "result": cached}
+
 
-    # 统一返回结构处理
+def _task_payload(task_id: str, task: TaskState) -> Dict[str, Any]:
+    """统一返回结构（轮询接口与SSE推送共用）；报告缓存在任务结束时由任务后端回调写入"""
     response = {
         "success": True,
         "task_id": task_id,
@@ -54,8 +53,97 @@ async def get_task_result(
         response["success"] = False
         response["message"] = "任务已被取消"
     elif task.state == "RETRY":
-        response["message"] = f"任务正在重试（第{task.request.retries + 1}次）"
+        response["message"] = f"任务正在重试（第{task.retries}次）" if task.retries else "任务正在重试"
     else:
         response["message"] = f"任务处于{task.state}状态"
 
-    return response
\ No newline at end of file
+    return response
+
+
+@router.get("/{task_id}", response_model=Dict[str, Any])
+async def get_task_result(
+    task_id: str = Path(..., **TASK_ID_PARAM)
+):
+    """查询异步任务的执行状态和结果
+
+    支持的任务状态：
+    - pending: 任务等待执行
+    - running: 任务正在执行
+    - success: 任务执行成功（返回结果）
+    - failure: 任务执行失败（返回错误信息）
+    - revoked: 任务被取消
+    - retry: 任务正在重试
+    """
+    cached = _cached_payload(task_id)
+    if cached is not None:
+        return cached
+
+    try:
+        # Celery后端需访问结果后端（网络I/O），放到线程池中执行，不阻塞事件循环
+        task = await run_in_threadpool(get_task_backend().status, task_id)
+    except TaskNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"无效的任务ID: {str(e)}"
+        )
+
+    return _task_payload(task_id, task)
+
+
+def _sse(event: str, payload: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n"
+
+
+async def _stream_events(task_id: str, queue: asyncio.Queue) -> AsyncIterator[str]:
+    backend = get_task_backend()
+    deadline = time.monotonic() + STREAM_MAX_SECONDS
+    last_state = None
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                yield _sse("timeout", {"success": False, "task_id": task_id, "message": "推送超时，请重新订阅或改为轮询"})
+                return
+            try:
+                task = await asyncio.wait_for(queue.get(), timeout=min(STREAM_HEARTBEAT_SECONDS, remaining))
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if task.ready:
+                # 最终状态只推送一次（含完整报告），随后关闭连接
+                yield _sse("done", _task_payload(task_id, task))
+                return
+            if (task.state, task.retries) != last_state:
+                last_state = (task.state, task.retries)
+                yield _sse("status", _task_payload(task_id, task))
+    finally:
+        backend.unsubscribe(task_id, queue)
+
+
+@router.get("/{task_id}/stream")
+async def stream_task_result(
+    task_id: str = Path(..., **TASK_ID_PARAM)
+):
+    """以Server-Sent Events推送任务状态变化（status事件）与最终结果（done事件，仅一次）
+
+    由任务生命周期事件驱动：本地后端在状态变化时直接发布，Celery后端由进程内唯一的监听线程
+    消费worker发出的任务事件并发布变化，SSE连接不轮询结果后端。
+    """
+    cached = _cached_payload(task_id)
+    if cached is not None:
+        async def cached_stream() -> AsyncIterator[str]:
+            yield _sse("done", cached)
+        events = cached_stream()
+    else:
+        try:
+            queue = await get_task_backend().subscribe(task_id)
+        except TaskNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"无效的任务ID: {str(e)}")
+        events = _stream_events(task_id, queue)
+
+    return StreamingResponse(events, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
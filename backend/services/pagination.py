@@ -0,0 +1,85 @@
+import base64
+import json
+from bisect import bisect_right
+from typing import Any, List, Optional, Sequence, Tuple
+
+# --------------------------
+# 列表接口的游标分页、字段投影与批量请求解析
+# --------------------------
+DEFAULT_PAGE_SIZE = 100  # 传入cursor但未指定limit时的每页条数
+MAX_PAGE_SIZE = 1000  # 单页上限，限制响应大小与序列化耗时
+MAX_BATCH_ITEMS = 500  # 批量查询单次请求的条目上限
+
+
+def encode_cursor(key: Any) -> str:
+    """把上一页最后一项编码为不透明游标（URL安全的base64）"""
+    raw = json.dumps(key, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Any:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(raw.decode("utf-8"))
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(f"无效的分页游标：{cursor}")
+    return tuple(key) if isinstance(key, list) else key
+
+
+def paginate(items: Sequence, cursor: Optional[str] = None,
+             limit: Optional[int] = None) -> Tuple[Sequence, Optional[str]]:
+    """键集分页：items须已排序且互不重复，返回（本页，下一页游标；无下一页时为None）
+
+    游标记录的是上一页最后一项本身而非偏移量，下一页从严格大于它的项开始（二分查找定位），
+    翻页期间数据热重载也不会重复或跳过未变化的项。cursor与limit都未传时返回全部。
+    """
+    if cursor is None and limit is None:
+        return items, None
+    start = 0
+    if cursor:
+        key = decode_cursor(cursor)
+        try:
+            start = bisect_right(items, key)
+        except TypeError:
+            raise ValueError(f"分页游标与当前列表不匹配：{cursor}")
+    limit = min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    page = items[start:start + limit]
+    next_cursor = encode_cursor(page[-1]) if start + limit < len(items) else None
+    return page, next_cursor
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> Tuple[str, ...]:
+    """解析逗号分隔的fields投影参数（保持请求中的顺序、去重），未传时返回全部字段"""
+    if not fields:
+        return tuple(allowed)
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in allowed]
+    if unknown or not names:
+        raise ValueError(f"不支持的字段：{', '.join(unknown) or fields}（可选：{', '.join(allowed)}）")
+    return names
+
+
+def parse_batch(items: Sequence[Any], required: Sequence[str],
+                optional: Sequence[str] = ()) -> List[Tuple[Optional[str], ...]]:
+    """解析批量查询的条目列表：每项为对象，按 required + optional 的顺序取出字符串字段（可选字段缺省为None）"""
+    if not items:
+        raise ValueError("items不能为空")
+    if len(items) > MAX_BATCH_ITEMS:
+        raise ValueError(f"单次批量查询最多{MAX_BATCH_ITEMS}项（当前{len(items)}项）")
+    parsed = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f"第{i + 1}项须为对象")
+        unknown = set(item) - set(required) - set(optional)
+        if unknown:
+            raise ValueError(f"第{i + 1}项含不支持的字段：{', '.join(sorted(unknown))}")
+        values = []
+        for name in tuple(required) + tuple(optional):
+            value = item.get(name)
+            if value is not None and not isinstance(value, str):
+                raise ValueError(f"第{i + 1}项的{name}须为字符串")
+            if name in required and not (value and value.strip()):
+                raise ValueError(f"第{i + 1}项缺少{name}")
+            values.append(value.strip() if value and value.strip() else None)
+        parsed.append(tuple(values))
+    return parsed
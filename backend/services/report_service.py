@@ -0,0 +1,172 @@
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+import numpy as np
+from backend.config.database import EVDataQuery, EVDataRegistry
+from backend.config.metrics import timed
+
+# 基于CSV真实数据生成车型详细报告（替代原sleep + 随机数的模拟报告）
+
+# 竞品筛选窗口：续航、价格与目标车型的相对差距上限
+COMPETITOR_RANGE_WINDOW = 0.25
+COMPETITOR_PRICE_WINDOW = 0.30
+COMPETITOR_LIMIT = 3
+TREND_YEARS = 5  # 登记趋势展示的最近车型年份数
+MARKET_FACTORS = ["政策补贴延续", "充电网络扩展", "电池技术进步", "消费者环保意识提升"]
+
+
+class ReportNotFoundError(LookupError):
+    """请求的品牌/车型在数据中不存在（重试无意义，直接失败）"""
+
+
+# 按数据版本缓存的车型特征矩阵（竞品检索用），数据版本变化时重建
+_feature_cache: Dict[str, Any] = {"version": None}
+
+
+def _average(summary: Dict[str, Any], name: str) -> Optional[float]:
+    """车型聚合表中的平均续航/价格（0与缺失值不参与平均）"""
+    count = summary[f"{name}_n"]
+    return summary[f"{name}_sum"] / count if count else None
+
+
+def _dominant(distribution: Dict[str, int]) -> Optional[str]:
+    """分布中车辆数最多的键（并列时取首次出现者）"""
+    return max(distribution.items(), key=lambda x: x[1])[0] if distribution else None
+
+
+def _model_features() -> Dict[str, Any]:
+    """全部车型的特征数组：品牌、平均续航、平均价格、主力电动车类型、车辆数"""
+    global _feature_cache
+    version = EVDataQuery.get_data_version()
+    features = _feature_cache
+    if features["version"] != version:
+        models = EVDataQuery._get_aggregates().models()
+        # 整体替换而非原地更新：热重载前后的并发任务不会读到新旧版本混合的特征
+        features = _feature_cache = {
+            "version": version,
+            "models": models,
+            "make": np.array([m["make"].lower() for m in models], dtype=object),
+            "range": np.array([_average(m, "range") or np.nan for m in models], dtype=np.float64),
+            "price": np.array([_average(m, "msrp") or np.nan for m in models], dtype=np.float64),
+            "ev_type": np.array([_dominant(m["ev_type_vehicles"]) for m in models], dtype=object),
+            "vehicles": np.array([m["vehicles"] for m in models], dtype=np.int64),
+        }
+    return features
+
+
+def find_competitors(summary: Dict[str, Any], limit: int = COMPETITOR_LIMIT) -> List[Dict[str, Any]]:
+    """检索真实竞品：其他品牌、主力电动车类型相同、续航/价格相近的车型
+
+    相似度为续航与价格相对差距之和（价格缺失时只看续航），先在窗口内按相似度、
+    车辆数排序取前limit个；窗口内不足时放宽窗口，按相似度补足。
+    """
+    features = _model_features()
+    target_range, target_price = _average(summary, "range"), _average(summary, "msrp")
+    ev_type = _dominant(summary["ev_type_vehicles"])
+
+    candidates = (features["make"] != summary["make"].lower()) & (features["ev_type"] == ev_type)
+    if target_range:
+        range_gap = np.abs(features["range"] - target_range) / target_range
+        candidates &= ~np.isnan(range_gap)
+    else:
+        range_gap = np.zeros(len(features["models"]))
+    price_gap = (np.abs(features["price"] - target_price) / target_price if target_price
+                 else np.full(len(features["models"]), np.nan))
+    score = range_gap + np.nan_to_num(price_gap, nan=0.0)
+    in_window = (range_gap <= COMPETITOR_RANGE_WINDOW) & (np.isnan(price_gap) | (price_gap <= COMPETITOR_PRICE_WINDOW))
+
+    picked: List[int] = []
+    for mask in (candidates & in_window, candidates & ~in_window):
+        ids = np.flatnonzero(mask)
+        picked.extend(ids[np.lexsort((-features["vehicles"][ids], score[ids]))].tolist())
+        if len(picked) >= limit:
+            break
+
+    total = EVDataQuery.get_total_vehicles()
+    competitors = []
+    for i in picked[:limit]:
+        model = features["models"][i]
+        price, e_range = features["price"][i], features["range"][i]
+        competitors.append({
+            "brand": model["make"],
+            "model": model["model"],
+            "price": round(float(price), 2) if not np.isnan(price) else None,
+            "range": round(float(e_range), 1) if not np.isnan(e_range) else None,
+            "ev_type": features["ev_type"][i],
+            "total_vehicles": model["vehicles"],
+            "market_share": round(model["vehicles"] / total * 100, 2) if total else 0.0,
+        })
+    return competitors
+
+
+def registration_trend(summary: Dict[str, Any], years: int = TREND_YEARS) -> Dict[str, List[int]]:
+    """按车型年份统计的登记量趋势（取最近years个年份）"""
+    trend = list(summary["year_vehicles"].items())[-years:]
+    return {"years": [year for year, _ in trend], "sales": [count for _, count in trend]}
+
+
+def _forecast(trend: Dict[str, List[int]]) -> str:
+    """由最近年份登记量的复合增长率推算下一年趋势"""
+    sales = [count for count in trend["sales"] if count > 0]
+    if len(sales) < 2:
+        return "数据年份不足，暂无法预测"
+    growth = (sales[-1] / sales[0]) ** (1 / (len(sales) - 1)) - 1
+    return f"按近{len(sales)}个车型年份登记量推算，预计{'增长' if growth >= 0 else '下降'}{abs(growth) * 100:.1f}%"
+
+
+def _region_share(distribution: Dict[str, int], total: int, limit: int = 5) -> List[Dict[str, Any]]:
+    """车辆数最多的前limit个区域及其占比（%）"""
+    ranked = sorted(distribution.items(), key=lambda x: x[1], reverse=True)[:limit]
+    return [{"region": region, "vehicles": count, "share": round(count / total * 100, 2)}
+            for region, count in ranked] if total else []
+
+
+@timed("report")
+def build_detailed_report(brand: str, model: str) -> Optional[Dict[str, Any]]:
+    """生成车型详细分析报告（全部由预计算聚合表与索引计算，无模拟数据），车型不存在时返回None"""
+    summary = EVDataQuery.get_model_summary(brand, model)
+    if not summary:
+        return None
+
+    brand_total = EVDataQuery.get_by_brand(brand).total_vehicles()
+    model_records = EVDataQuery.get_by_brand_model(brand, model)
+    avg_range, avg_price = _average(summary, "range"), _average(summary, "msrp")
+    trend = registration_trend(summary)
+
+    base_data = {
+        "brand": summary["make"],
+        "model": summary["model"],
+        "range": round(avg_range, 1) if avg_range is not None else 0,  # 平均续航里程
+        "price": round(avg_price, 2) if avg_price is not None else 0,  # 平均基础价格
+        "market_share": round(summary["vehicles"] / brand_total * 100, 2) if brand_total else 0,  # 占品牌比例（%）
+        "overall_market_share": round(summary["vehicles"] / EVDataQuery.get_total_vehicles() * 100, 2),
+        "popular_region": _dominant(summary["states"]) or "未知",
+        "year": summary["model_years"][-1] if summary["model_years"] else 0,  # 最新车型年份
+        "ev_type": _dominant(summary["ev_type_vehicles"]) or "未知",
+        "total_vehicles": summary["vehicles"],
+    }
+
+    return {
+        "model_info": base_data,
+        "sales_trend": trend,
+        "region_share": {
+            "states": _region_share(summary["states"], summary["vehicles"]),
+            "counties": _region_share(model_records.weighted_counts("county"), summary["vehicles"]),
+        },
+        "competitor_analysis": find_competitors(summary),
+        "market_forecast": {
+            "next_year_prediction": _forecast(trend),
+            "factors": MARKET_FACTORS,
+        },
+        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "data_version": EVDataQuery.get_data_version(),
+        "data_coverage": f"基于{summary['records']}条原始数据记录生成",
+    }
+
+
+def require_detailed_report(brand: str, model: str) -> Dict[str, Any]:
+    """生成详细报告，车型不存在时抛出ReportNotFoundError（供各任务后端调用）"""
+    with EVDataRegistry.pinned():  # 任务线程不继承请求上下文，报告内各项统计固定在同一数据版本
+        report = build_detailed_report(brand, model)
+    if report is None:
+        raise ReportNotFoundError(f"未找到 {brand} {model} 的车型数据")
+    return report
@@ -1,114 +1,15 @@
 from backend.config.celery_config import app as celery_app
-from backend.config.database import EVDataQuery, ElectricVehicleRecord
-import time
-import pandas as pd
-import numpy as np
-from typing import List, Dict, Optional
+from backend.services.report_service import ReportNotFoundError, require_detailed_report
+
 
 @celery_app.task(bind=True, max_retries=3)
 def generate_detailed_report(self, brand: str, model: str):
     """生成车型详细分析报告（基于CSV数据，异步任务）"""
     try:
-        # 1. 从CSV数据中获取基础车型数据
-        brand_lower = brand.lower()
-        model_lower = model.lower()
-        
-        # 获取该品牌的所有记录
-        brand_records: List[ElectricVehicleRecord] = EVDataQuery.get_by_brand(brand)
-        if not brand_records:
-            raise ValueError(f"未找到品牌 {brand} 的任何数据")
-        
-        # 筛选出匹配的车型记录
-        model_records = [
-            record for record in brand_records
-            if record.model and record.model.lower() == model_lower
-        ]
-        if not model_records:
-            raise ValueError(f"未找到 {brand} {model} 的车型数据")
-        
-        # 提取基础数据（取第一条有效记录的核心字段，或聚合计算）
-        first_record = model_records[0]
-        total_vehicle_count = sum(record.vehicle_count for record in model_records)
-        
-        # 计算市场占比（该车型占品牌总销量的比例）
-        brand_total = sum(record.vehicle_count for record in brand_records)
-        market_share = round((total_vehicle_count / brand_total) * 100, 2) if brand_total > 0 else 0
-        
-        # 构建基础数据结构（与原接口保持兼容）
-        base_data: Dict = {
-            "brand": brand,
-            "model": model,
-            "range": first_record.electric_range or 0,  # 续航里程
-            "price": first_record.base_msrp or 0,       # 基础价格
-            "market_share": market_share,               # 市场占比（%）
-            "popular_region": self._get_popular_region(model_records),  # 热门区域
-            "year": first_record.model_year or 0,       # 车型年份
-            "ev_type": first_record.ev_type or "未知"    # 电动车类型
-        }
-        
-        # 2. 模拟耗时计算（趋势分析、竞品对比）
-        time.sleep(6)  # 调整为6秒更合理
-        
-        # 3. 生成销售趋势数据（基于实际车型数据量调整范围）
-        base_sales = max(10000, total_vehicle_count // 5)  # 基于实际数量的基数
-        years = [2019, 2020, 2021, 2022, 2023]
-        sales_trend = {
-            "years": years,
-            "sales": [
-                np.random.randint(base_sales, base_sales * 2),
-                np.random.randint(base_sales * 1.5, base_sales * 3),
-                np.random.randint(base_sales * 2, base_sales * 4),
-                np.random.randint(base_sales * 3, base_sales * 5),
-                np.random.randint(base_sales * 4, base_sales * 6)
-            ]
-        }
-        
-        # 4. 生成竞品对比（基于CSV中实际存在的品牌）
-        competitors = self._generate_competitors(base_data)
-        
-        # 5. 生成完整报告
-        report = {
-            "model_info": base_data,
-            "sales_trend": sales_trend,
-            "competitor_analysis": competitors,
-            "market_forecast": {
-                "next_year_prediction": f"预计销量增长{np.random.randint(8, 25)}%",
-                "factors": ["政策补贴延续", "充电网络扩展", "电池技术进步", "消费者环保意识提升"]
-            },
-            "generated_at": pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "data_coverage": f"基于{len(model_records)}条原始数据记录生成"
-        }
-        
-        return report
-        
+        # 登记趋势、区域占比、竞品均由预计算聚合表与索引实时计算，毫秒级完成
+        return require_detailed_report(brand, model)
+    except ReportNotFoundError:
+        raise
     except Exception as e:
         # 重试机制（最多3次）
         self.retry(exc=e, countdown=5)
-
-@staticmethod
-def _get_popular_region(records: List[ElectricVehicleRecord]) -> str:
-    """统计车型最受欢迎的区域（州）"""
-    region_counts = {}
-    for record in records:
-        if record.state:
-            region_counts[record.state] = region_counts.get(record.state, 0) + record.vehicle_count
-    return max(region_counts.items(), key=lambda x: x[1])[0] if region_counts else "未知"
-
-@staticmethod
-def _generate_competitors(base_data: Dict) -> List[Dict]:
-    """基于基础数据生成合理的竞品对比（参考CSV中可能存在的品牌）"""
-    base_price = base_data["price"]
-    base_range = base_data["range"]
-    
-    # 选择市场上常见的竞品品牌（更贴近实际数据）
-    return [
-        {"brand": "Ford", "model": "Mustang Mach-E", 
-         "price": round(base_price * np.random.uniform(1.02, 1.08), 2), 
-         "range": round(base_range * np.random.uniform(0.88, 0.95), 1)},
-        {"brand": "Chevrolet", "model": "Bolt EUV", 
-         "price": round(base_price * np.random.uniform(0.82, 0.88), 2), 
-         "range": round(base_range * np.random.uniform(0.78, 0.85), 1)},
-        {"brand": "Hyundai", "model": "Ioniq 5", 
-         "price": round(base_price * np.random.uniform(0.95, 1.02), 2), 
-         "range": round(base_range * np.random.uniform(0.92, 1.0), 1)}
-    ]
\ No newline at end of file
@@ -0,0 +1,197 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from backend.config.metrics import metrics, sample
+from backend.tasks.task_backend import SUCCESS, TaskState, add_finish_listener
+
+# --------------------------
+# 详细报告结果缓存 + 进行中任务去重
+# --------------------------
+# 缓存键：规范化品牌/车型 + 数据版本的内容哈希；数据重载（版本变化）后旧报告自然失效
+REPORT_CACHE_TTL = float(os.getenv("EV_REPORT_CACHE_TTL", "600"))  # 报告缓存有效期（秒）
+REPORT_CACHE_SIZE = int(os.getenv("EV_REPORT_CACHE_SIZE", "256"))  # 最多缓存的报告数（LRU淘汰）
+INFLIGHT_TTL = float(os.getenv("EV_REPORT_INFLIGHT_TTL", "120"))  # 进行中任务的去重窗口（防止worker异常后永久挂起）
+EARLY_FINISHED_SIZE = 64  # 提交返回task_id之前就已结束的任务（本地后端毫秒级完成）最多暂存数
+
+
+def report_key(brand: str, model: str, version: int) -> str:
+    """报告缓存键（品牌/车型忽略大小写与首尾空格）"""
+    normalized = f"{version}\x1f{brand.strip().lower()}\x1f{model.strip().lower()}"
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ReportCache:
+    """报告结果缓存（TTL + LRU）与进行中任务表（同一报告只提交一次任务）"""
+
+    def __init__(self, max_entries: int = REPORT_CACHE_SIZE, ttl: float = REPORT_CACHE_TTL,
+                 inflight_ttl: float = INFLIGHT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.inflight_ttl = inflight_ttl
+        self._lock = threading.Lock()
+        self._results: "OrderedDict[str, Tuple[float, str, Any]]" = OrderedDict()  # key -> (过期时间, task_id, 报告)
+        self._task_results: Dict[str, str] = {}  # 已完成 task_id -> key
+        self._inflight: Dict[str, Tuple[float, str]] = {}  # key -> (过期时间, task_id)
+        self._inflight_tasks: Dict[str, str] = {}  # 进行中 task_id -> key
+        self._submitting: Dict[str, threading.Event] = {}  # 正在提交（尚未拿到task_id）的 key -> 提交完成事件
+        self._early: "OrderedDict[str, Tuple[bool, Any]]" = OrderedDict()  # 登记前已结束的 task_id -> (是否成功, 报告)
+        self.hits = 0
+        self.misses = 0
+        self.deduplicated = 0
+
+    # ---------- 内部工具（调用方须持有锁） ----------
+    def _cached(self, key: str, now: float) -> Optional[Tuple[float, str, Any]]:
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            self._drop_result(key)
+            return None
+        self._results.move_to_end(key)
+        return entry
+
+    def _drop_result(self, key: str) -> None:
+        _, task_id, _ = self._results.pop(key)
+        self._task_results.pop(task_id, None)
+
+    def _running(self, key: str, now: float) -> Optional[str]:
+        entry = self._inflight.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            self._inflight.pop(key)
+            self._inflight_tasks.pop(entry[1], None)
+            return None
+        return entry[1]
+
+    # ---------- 对外接口 ----------
+    def submit(self, key: str, submit: Callable[[], str]) -> Tuple[str, str]:
+        """返回（task_id, 来源）：来源为 cached（已有结果）、inflight（复用进行中任务）或 submitted（新提交）
+
+        锁内只登记"提交中"占位，入队（Celery需访问Broker）在锁外执行，Broker缓慢时不阻塞其他读缓存的请求；
+        同一key的并发请求等待该次提交完成后复用其task_id，提交失败则由其中一个请求重新提交。
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                entry = self._cached(key, now)
+                if entry is not None:
+                    self.hits += 1
+                    return entry[1], "cached"
+                task_id = self._running(key, now)
+                if task_id is not None:
+                    self.deduplicated += 1
+                    return task_id, "inflight"
+                submitting = self._submitting.get(key)
+                if submitting is None:
+                    submitting = self._submitting[key] = threading.Event()
+                    self.misses += 1
+                    break
+            submitting.wait(self.inflight_ttl)
+        try:
+            task_id = submit()
+        except BaseException:
+            with self._lock:
+                self._submitting.pop(key, None)
+            submitting.set()
+            raise
+        with self._lock:
+            self._submitting.pop(key, None)
+            self._inflight[key] = (time.monotonic() + self.inflight_ttl, task_id)
+            self._inflight_tasks[task_id] = key
+            early = self._early.pop(task_id, None)
+        submitting.set()
+        if early is not None:
+            ok, result = early
+            if ok:
+                self.complete(task_id, result)
+            else:
+                self.fail(task_id)
+        return task_id, "submitted"
+
+    def get_result(self, task_id: str) -> Optional[Any]:
+        """按task_id取已缓存的报告（命中时无需访问Broker/结果后端）"""
+        with self._lock:
+            key = self._task_results.get(task_id)
+            if key is None:
+                return None
+            entry = self._cached(key, time.monotonic())
+            return entry[2] if entry is not None else None
+
+    def _remember_early(self, task_id: str, ok: bool, result: Any) -> None:
+        """任务在提交方登记task_id之前就已结束：暂存，登记时补记（调用方须持有锁）"""
+        if self._submitting:
+            self._early[task_id] = (ok, result)
+            while len(self._early) > EARLY_FINISHED_SIZE:
+                self._early.popitem(last=False)
+
+    def complete(self, task_id: str, result: Any) -> None:
+        """任务成功：结果写入缓存，并移出进行中任务表"""
+        with self._lock:
+            key = self._inflight_tasks.pop(task_id, None)
+            if key is None:
+                self._remember_early(task_id, True, result)
+                return  # 非本进程提交（或已过去重窗口）的任务，无法确定缓存键
+            self._inflight.pop(key, None)
+            if key in self._results:
+                self._drop_result(key)
+            self._results[key] = (time.monotonic() + self.ttl, task_id, result)
+            self._task_results[task_id] = key
+            while len(self._results) > self.max_entries:
+                self._drop_result(next(iter(self._results)))
+
+    def fail(self, task_id: str) -> None:
+        """任务失败/取消：移出进行中任务表，下次请求重新提交"""
+        with self._lock:
+            key = self._inflight_tasks.pop(task_id, None)
+            if key is not None:
+                self._inflight.pop(key, None)
+            else:
+                self._remember_early(task_id, False, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+            self._task_results.clear()
+            self._inflight.clear()
+            self._inflight_tasks.clear()
+            self._early.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._results), "inflight": len(self._inflight), "hits": self.hits,
+                    "misses": self.misses, "deduplicated": self.deduplicated}
+
+
+# API进程内共享的报告缓存
+report_cache = ReportCache()
+
+
+def _on_task_finished(task_id: str, state: TaskState) -> None:
+    """任务结束即写入/释放缓存，不依赖客户端查询任务结果"""
+    if state.state == SUCCESS:
+        report_cache.complete(task_id, state.result)
+    else:
+        report_cache.fail(task_id)
+
+
+add_finish_listener(_on_task_finished)
+
+
+def _report_cache_metrics() -> Iterator[str]:
+    """/metrics 采集回调：报告缓存条目数、命中/未命中/去重计数与命中率"""
+    stats = report_cache.stats()
+    total = stats["hits"] + stats["misses"]
+    yield from sample("ev_report_cache_entries", "gauge", "报告缓存条目数", stats["entries"])
+    yield from sample("ev_report_cache_inflight", "gauge", "进行中的报告任务数", stats["inflight"])
+    yield from sample("ev_report_cache_requests_total", "counter", "报告请求按结果计数",
+                      {"hit": stats["hits"], "miss": stats["misses"], "deduplicated": stats["deduplicated"]},
+                      label="result")
+    yield from sample("ev_report_cache_hit_ratio", "gauge", "报告缓存命中率",
+                      round(stats["hits"] / total, 6) if total else 0)
+
+
+metrics.register_collector(_report_cache_metrics)
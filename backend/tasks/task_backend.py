@@ -0,0 +1,430 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Type
+
+from starlette.concurrency import run_in_threadpool
+
+# --------------------------
+# 可插拔的异步任务后端
+# --------------------------
+# EV_TASK_BACKEND=celery（默认，RabbitMQ + Celery worker）或 local（进程内线程池，单机部署无需Broker）
+TASK_BACKEND = os.getenv("EV_TASK_BACKEND", "celery").lower()
+LOCAL_WORKERS = int(os.getenv("EV_TASK_WORKERS", "4"))  # 本地后端并发执行的任务数
+LOCAL_QUEUE_SIZE = int(os.getenv("EV_TASK_QUEUE_SIZE", "256"))  # 本地后端最多排队+执行中的任务数
+LOCAL_RESULT_TTL = float(os.getenv("EV_TASK_RESULT_TTL", "3600"))  # 已完成任务结果的保留时间（秒）
+LOCAL_MAX_RESULTS = int(os.getenv("EV_TASK_MAX_RESULTS", "1024"))  # 最多保留的已完成任务数
+WATCH_TIMEOUT = float(os.getenv("EV_TASK_WATCH_TIMEOUT", "600"))  # Celery任务事件监听的最长等待（秒，新订阅会续期）
+EVENTS_RETRY = float(os.getenv("EV_TASK_EVENTS_RETRY", "2"))  # Celery事件连接断开后的重连间隔（秒）
+# Web服务的worker进程数：uvicorn/gunicorn以 WEB_CONCURRENCY 作为 --workers 的默认值，多worker部署请通过它指定
+SERVER_WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+# 与Celery一致的状态名（Celery的STARTED统一为RUNNING）
+PENDING, RUNNING, RETRY, SUCCESS, FAILURE, REVOKED = "PENDING", "RUNNING", "RETRY", "SUCCESS", "FAILURE", "REVOKED"
+READY_STATES = (SUCCESS, FAILURE, REVOKED)
+
+
+class TaskNotFoundError(LookupError):
+    """任务ID不存在（或结果已过期被清理）"""
+
+
+class TaskQueueFullError(RuntimeError):
+    """本地任务队列已满"""
+
+
+@dataclass
+class TaskState:
+    """任务状态快照（result：成功时为返回值，失败时为异常）"""
+    state: str
+    result: Any = None
+    retries: Optional[int] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state in READY_STATES
+
+
+def _detailed_report_task() -> Callable:
+    from backend.services.report_service import require_detailed_report
+    return require_detailed_report
+
+
+def _not_retryable() -> Tuple[Type[BaseException], ...]:
+    from backend.services.report_service import ReportNotFoundError
+    return (ReportNotFoundError,)
+
+
+# 任务结束回调（任意线程中调用，须线程安全且快速返回）：每个任务的最终状态发布时调用一次
+_finish_listeners: List[Callable[[str, "TaskState"], None]] = []
+
+
+def add_finish_listener(listener: Callable[[str, "TaskState"], None]) -> None:
+    """注册任务结束回调（与是否有客户端订阅或查询无关），如报告缓存在任务完成时写入结果"""
+    _finish_listeners.append(listener)
+
+
+class TaskEventBus:
+    """任务生命周期事件总线：后端在状态变化时发布，订阅者（SSE连接）通过asyncio队列接收"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+
+    def subscribe(self, task_id: str) -> asyncio.Queue:
+        """须在事件循环内调用；返回的队列按发生顺序收到TaskState"""
+        queue: asyncio.Queue = asyncio.Queue()
+        with self._lock:
+            self._subscribers.setdefault(task_id, []).append((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, task_id: str, queue: asyncio.Queue) -> None:
+        with self._lock:
+            remaining = [item for item in self._subscribers.get(task_id, []) if item[1] is not queue]
+            if remaining:
+                self._subscribers[task_id] = remaining
+            else:
+                self._subscribers.pop(task_id, None)
+
+    def has_subscribers(self, task_id: str) -> bool:
+        with self._lock:
+            return task_id in self._subscribers
+
+    def publish(self, task_id: str, state: "TaskState") -> None:
+        """可在任意线程调用（worker线程/监听线程），通过call_soon_threadsafe投递到订阅者的事件循环"""
+        if state.ready:
+            for listener in _finish_listeners:
+                try:
+                    listener(task_id, state)
+                except Exception as e:
+                    print(f"任务结束回调出错（{task_id}）：{str(e)}")
+        with self._lock:
+            subscribers = list(self._subscribers.get(task_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, state)
+            except RuntimeError:
+                pass  # 订阅者的事件循环已关闭
+
+
+# 任务注册表：任务名 -> (本地执行函数工厂, 最大重试次数, 重试间隔秒)；任务名与 backend.tasks.data_tasks 中的Celery任务同名
+TASKS: Dict[str, Tuple[Callable[[], Callable], int, float]] = {
+    "generate_detailed_report": (_detailed_report_task, 3, 5),
+}
+
+
+class TaskBackend:
+    """任务后端接口：提交任务、查询状态、等待完成、订阅状态变化"""
+    name = ""
+
+    def __init__(self):
+        self.events = TaskEventBus()
+
+    def submit(self, task_name: str, *args: Any) -> str:
+        raise NotImplementedError
+
+    def status(self, task_id: str) -> TaskState:
+        raise NotImplementedError
+
+    def wait(self, task_id: str, timeout: Optional[float] = None) -> TaskState:
+        """等待任务结束（超时则返回当前状态）"""
+        raise NotImplementedError
+
+    async def subscribe(self, task_id: str) -> asyncio.Queue:
+        """订阅任务状态：先推送当前状态，之后每次状态变化推送一次（任务结束时为最终状态）
+
+        须在事件循环内调用；取当前状态（Celery后端需访问结果后端）在线程池中执行，不阻塞事件循环。
+        """
+        queue = self.events.subscribe(task_id)  # 先订阅再取当前状态，避免两者之间的状态变化丢失
+        try:
+            state = await run_in_threadpool(self.status, task_id)
+        except Exception:
+            self.events.unsubscribe(task_id, queue)
+            raise
+        queue.put_nowait(state)
+        if not state.ready:
+            self._watch(task_id)
+        return queue
+
+    def unsubscribe(self, task_id: str, queue: asyncio.Queue) -> None:
+        self.events.unsubscribe(task_id, queue)
+
+    def _watch(self, task_id: str) -> None:
+        """确保任务结束时有事件发布（由后端实现）"""
+        raise NotImplementedError
+
+
+class CeleryTaskBackend(TaskBackend):
+    """Celery后端：任务经Broker分发到worker执行，结果从结果后端读取
+
+    任务状态变化由worker发出的任务事件（worker_send_task_events）驱动：进程内唯一的事件监听线程
+    消费事件并发布给订阅者，不轮询结果后端。只有任务成功时读取一次结果后端取报告；
+    监听连接建立（或断线重连）时补读一次被监听任务的状态，弥补连接建立前错过的事件。
+    """
+    name = "celery"
+
+    def __init__(self):
+        # 延迟导入：选择本地后端时无需加载Celery及Broker配置
+        from backend.config.celery_config import app
+        from backend.tasks import data_tasks
+        super().__init__()
+        self.app = app
+        self.tasks = data_tasks
+        self._watching: Dict[str, float] = {}  # 任务ID -> 监听截止时刻
+        self._unread: Set[str] = set()  # 已结束但结果读取失败、待重读的任务
+        self._watch_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+
+    def submit(self, task_name: str, *args: Any) -> str:
+        task_id = getattr(self.tasks, task_name).delay(*args).id
+        self._watch(task_id)  # 本进程提交的任务都监听到结束，结束事件据此发布（报告缓存依赖它）
+        return task_id
+
+    def _state(self, task) -> TaskState:
+        state = task.state
+        state = RUNNING if state == "STARTED" else state
+        return TaskState(state, task.result if state in READY_STATES else None)
+
+    def status(self, task_id: str) -> TaskState:
+        return self._state(self.app.AsyncResult(task_id))
+
+    def wait(self, task_id: str, timeout: Optional[float] = None) -> TaskState:
+        from celery.exceptions import TimeoutError as CeleryTimeoutError
+        task = self.app.AsyncResult(task_id)
+        try:
+            task.get(timeout=timeout, propagate=False)
+        except CeleryTimeoutError:
+            pass
+        return self._state(task)
+
+    def _watch(self, task_id: str) -> None:
+        """把任务加入监听集合（已在监听时续期）；整个进程只有一个监听线程，无被监听任务时退出"""
+        with self._watch_lock:
+            self._watching[task_id] = time.monotonic() + WATCH_TIMEOUT
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._event_loop, name="ev-task-events", daemon=True)
+                self._watcher.start()
+
+    def _event_loop(self) -> None:
+        while True:
+            try:
+                with self.app.connection_for_read() as connection:
+                    receiver = self.app.events.Receiver(connection, handlers={"*": self._on_event})
+                    receiver.on_consume_ready = self._catch_up
+                    # 每次等待事件（至多1秒）前检查监听截止与待重读的结果，无被监听任务时停止消费
+                    receiver.on_iteration = lambda: self._tick(receiver)
+                    receiver.capture(limit=None, timeout=None, wakeup=False)
+            except Exception as e:
+                print(f"任务事件监听连接中断，{EVENTS_RETRY}秒后重连：{str(e)}")
+                time.sleep(EVENTS_RETRY)
+            with self._watch_lock:
+                self._expire()
+                if not self._watching:
+                    self._watcher = None
+                    return
+
+    def _catch_up(self, *args: Any, **kwargs: Any) -> None:
+        with self._watch_lock:
+            watching = list(self._watching)
+        for task_id in watching:
+            self._refresh(task_id)
+
+    def _expire(self) -> None:
+        """移出超过监听截止时刻的任务（调用方须持有 _watch_lock）"""
+        now = time.monotonic()
+        for task_id in [task_id for task_id, deadline in self._watching.items() if deadline <= now]:
+            self._watching.pop(task_id)
+            self._unread.discard(task_id)
+
+    def _tick(self, receiver) -> None:
+        with self._watch_lock:
+            self._expire()
+            unread = list(self._unread)
+            receiver.should_stop = not self._watching
+        for task_id in unread:
+            self._refresh(task_id, finished=True)
+
+    def _on_event(self, event: Dict[str, Any]) -> None:
+        task_id, kind = event.get("uuid"), event.get("type")
+        with self._watch_lock:
+            if task_id not in self._watching and not self.events.has_subscribers(task_id):
+                return
+        if kind == "task-started":
+            self.events.publish(task_id, TaskState(RUNNING))
+        elif kind == "task-retried":
+            self.events.publish(task_id, TaskState(RETRY, event.get("exception")))
+        elif kind == "task-succeeded":
+            self._refresh(task_id, finished=True)  # 事件中只有结果的截断repr，完整报告从结果后端读取一次
+        elif kind == "task-failed":
+            self._finish(task_id, TaskState(FAILURE, event.get("exception")))
+        elif kind == "task-revoked":
+            self._finish(task_id, TaskState(REVOKED))
+
+    def _refresh(self, task_id: str, finished: bool = False) -> None:
+        """读取一次任务状态并发布
+
+        读取失败（网络抖动等）不当作任务失败；已收到结束事件（finished）但读取失败或结果尚未写入时，
+        留待下次重读，直到读到最终状态或监听截止。
+        """
+        try:
+            state = self.status(task_id)
+        except Exception:
+            state = None
+        if state is not None and state.ready:
+            self._finish(task_id, state)
+            return
+        with self._watch_lock:
+            if finished and task_id in self._watching:
+                self._unread.add(task_id)
+        if state is not None and not finished:
+            self.events.publish(task_id, state)
+
+    def _finish(self, task_id: str, state: TaskState) -> None:
+        with self._watch_lock:
+            self._watching.pop(task_id, None)
+            self._unread.discard(task_id)
+        self.events.publish(task_id, state)
+
+
+class _LocalTask:
+    __slots__ = ("name", "args", "state", "result", "retries", "finished_at", "done")
+
+    def __init__(self, name: str, args: Tuple):
+        self.name = name
+        self.args = args
+        self.state = PENDING
+        self.result = None
+        self.retries = 0
+        self.finished_at = 0.0
+        self.done = threading.Event()
+
+
+class LocalTaskBackend(TaskBackend):
+    """进程内后端：有界队列 + 线程池执行 + 内存结果存储（TTL/数量上限淘汰）
+
+    报告任务直接读取本进程已加载的只读数据集（向量化计算，毫秒级），线程池即可，
+    免去Broker往返与worker进程重复加载数据。
+
+    限制：任务状态只存在于提交任务的进程内，只适用于单worker部署。多个uvicorn worker时，
+    落到其他worker的轮询/SSE请求会对有效的task_id返回404，须改用Celery后端
+    （SERVER_WORKERS>1时启动阶段记录告警，见 local_backend_warning）。
+    """
+    name = "local"
+
+    def __init__(self, workers: int = LOCAL_WORKERS, queue_size: int = LOCAL_QUEUE_SIZE,
+                 result_ttl: float = LOCAL_RESULT_TTL, max_results: int = LOCAL_MAX_RESULTS):
+        super().__init__()
+        self.queue_size = queue_size
+        self.result_ttl = result_ttl
+        self.max_results = max_results
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ev-task")
+        self._lock = threading.Lock()
+        self._tasks: "OrderedDict[str, _LocalTask]" = OrderedDict()
+        self._active = 0
+
+    def submit(self, task_name: str, *args: Any) -> str:
+        if task_name not in TASKS:
+            raise ValueError(f"未注册的任务：{task_name}")
+        task_id = str(uuid.uuid4())
+        task = _LocalTask(task_name, args)
+        with self._lock:
+            if self._active >= self.queue_size:
+                raise TaskQueueFullError(f"任务队列已满（{self.queue_size}），请稍后重试")
+            self._active += 1
+            self._tasks[task_id] = task
+            self._evict()
+        self._executor.submit(self._run, task_id, task)
+        return task_id
+
+    def _transition(self, task_id: str, task: _LocalTask, state: str, result: Any = None) -> None:
+        task.result, task.state = result, state
+        self.events.publish(task_id, TaskState(state, result if state in READY_STATES else None, task.retries))
+
+    def _run(self, task_id: str, task: _LocalTask) -> None:
+        factory, max_retries, countdown = TASKS[task.name]
+        try:
+            func, not_retryable = factory(), _not_retryable()
+            while True:
+                self._transition(task_id, task, RUNNING)
+                try:
+                    result, state = func(*task.args), SUCCESS
+                    break
+                except not_retryable as e:
+                    result, state = e, FAILURE
+                    break
+                except Exception as e:
+                    if task.retries >= max_retries:
+                        result, state = e, FAILURE
+                        break
+                    # 重试机制（与Celery任务一致：最多max_retries次，间隔countdown秒）
+                    task.retries += 1
+                    self._transition(task_id, task, RETRY, e)
+                    time.sleep(countdown)
+        except Exception as e:
+            result, state = e, FAILURE
+        task.result, task.state = result, state  # 先写最终状态再置完成标志，wait()返回后读到的即最终状态
+        with self._lock:
+            self._active -= 1
+            task.finished_at = time.monotonic()
+        # 先发布（含任务结束回调，如写入报告缓存）再置完成标志：wait()返回时回调已执行
+        self.events.publish(task_id, TaskState(state, result, task.retries))
+        task.done.set()
+
+    def _evict(self) -> None:
+        """清理过期或超出数量上限的已完成任务（调用方须持有锁）"""
+        now = time.monotonic()
+        finished = [task_id for task_id, task in self._tasks.items() if task.done.is_set()]
+        overflow = len(finished) - self.max_results
+        for i, task_id in enumerate(finished):
+            if i < overflow or now - self._tasks[task_id].finished_at > self.result_ttl:
+                del self._tasks[task_id]
+
+    def _get(self, task_id: str) -> _LocalTask:
+        with self._lock:
+            task = self._tasks.get(task_id)
+        if task is None:
+            raise TaskNotFoundError(f"任务不存在或结果已过期：{task_id}")
+        return task
+
+    def status(self, task_id: str) -> TaskState:
+        task = self._get(task_id)
+        return TaskState(task.state, task.result if task.state in READY_STATES else None, task.retries)
+
+    def wait(self, task_id: str, timeout: Optional[float] = None) -> TaskState:
+        self._get(task_id).done.wait(timeout)
+        return self.status(task_id)
+
+    def _watch(self, task_id: str) -> None:
+        pass  # 本地任务在每次状态变化时直接发布事件
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+def local_backend_warning() -> Optional[str]:
+    """本地后端与多worker部署同时启用时的告警文本（无冲突时为None）"""
+    if TASK_BACKEND == LocalTaskBackend.name and SERVER_WORKERS > 1:
+        return (f"EV_TASK_BACKEND=local 的任务状态只保存在单个进程内，当前 WEB_CONCURRENCY={SERVER_WORKERS}："
+                "落到其他worker的任务查询会返回404，多worker部署请使用 EV_TASK_BACKEND=celery")
+    return None
+
+
+BACKENDS: Dict[str, Type[TaskBackend]] = {"celery": CeleryTaskBackend, "local": LocalTaskBackend}
+_backend: Optional[TaskBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_task_backend() -> TaskBackend:
+    """按 EV_TASK_BACKEND 创建（进程内单例）任务后端"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if TASK_BACKEND not in BACKENDS:
+                    raise ValueError(f"未知的任务后端 EV_TASK_BACKEND={TASK_BACKEND}（可选：{', '.join(BACKENDS)}）")
+                _backend = BACKENDS[TASK_BACKEND]()
+    return _backend
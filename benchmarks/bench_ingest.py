@@ -0,0 +1,83 @@
+"""CSV解析基准：原加载方式（全列、类型推断、逐个编码重试） vs 类型化列裁剪解析
+
+每种方式在独立子进程中运行，统计解析耗时与进程峰值内存（ru_maxrss）。
+用法：python -m benchmarks.bench_ingest --rows 200000 [--encoding latin-1]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_csv
+
+
+def legacy_load(path: str):
+    """原load_csv_data实现：全部列、类型推断，按utf-8/gbk/latin-1顺序整文件重试"""
+    import pandas as pd
+    for encoding in ["utf-8", "gbk", "latin-1"]:
+        try:
+            return pd.read_csv(path, encoding=encoding)
+        except UnicodeDecodeError:
+            continue
+    raise ValueError("无法解析CSV文件")
+
+
+def typed_load(path: str):
+    from backend.config.database import read_ev_csv
+    return read_ev_csv(path)
+
+
+LOADERS = {"legacy": legacy_load, "typed": typed_load}
+
+
+def _child(mode: str, path: str) -> None:
+    # 预先导入，避免把导入开销算进解析耗时
+    import pandas  # noqa: F401
+    import backend.config.database  # noqa: F401
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    df = LOADERS[mode](path)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        "mode": mode,
+        "seconds": round(elapsed, 4),
+        "peak_rss_delta_mb": round((peak - baseline) / 1024, 1),
+        "frame_mb": round(df.memory_usage(deep=True).sum() / 2 ** 20, 1),
+        "columns": len(df.columns),
+    }))
+
+
+def run(path: str) -> list:
+    results = []
+    for mode in LOADERS:
+        output = subprocess.run([sys.executable, "-m", "benchmarks.bench_ingest", "--child", mode, path],
+                                check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="CSV解析基准")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--encoding", default="utf-8")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = generate_csv(os.path.join(tmp, "ev.csv"), args.rows, encoding=args.encoding)
+        for result in run(path):
+            print(f"{result['mode']:<7} rows={args.rows:<9} encoding={args.encoding:<8} "
+                  f"time={result['seconds']:7.3f}s peak_rss+={result['peak_rss_delta_mb']:7.1f}MB "
+                  f"frame={result['frame_mb']:7.1f}MB columns={result['columns']}")
+
+
+if __name__ == "__main__":
+    main()
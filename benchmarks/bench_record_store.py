@@ -0,0 +1,78 @@
+"""列式存储 vs 原ElectricVehicleRecord对象列表：转换耗时与常驻内存对比
+
+用法：python -m benchmarks.bench_record_store --rows 200000
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from backend.config.database import ElectricVehicleRecord, EVRecordStore
+from benchmarks.synthetic import generate_csv
+
+
+def legacy_records(df: pd.DataFrame):
+    """原get_records实现（iterrows逐行构建dataclass），仅作基准对照"""
+    records = []
+    for idx, row in df.iterrows():
+        def _num(name, cast, default=None):
+            value = row.get(name)
+            try:
+                return cast(value) if pd.notna(value) else default
+            except (ValueError, TypeError):
+                return default
+
+        records.append(ElectricVehicleRecord(
+            id=idx + 1,
+            vin_1_to_10=str(row.get("VIN (1-10)", "")).strip() or None,
+            county=str(row.get("County", "")).strip() or None,
+            city=str(row.get("City", "")).strip() or None,
+            state=str(row.get("State", "")).strip() or "未知",
+            model_year=_num("Model Year", int),
+            make=str(row.get("Make", "")).strip() or None,
+            model=str(row.get("Model", "")).strip() or None,
+            ev_type=str(row.get("Electric Vehicle Type", "")).strip() or None,
+            cafv_eligibility=str(row.get("Clean Alternative Fuel Vehicle (CAFV) Eligibility", "")).strip() or None,
+            electric_range=_num("Electric Range", float),
+            base_msrp=_num("Base MSRP", float),
+            electric_utility=str(row.get("Electric Utility", "")).strip() or None,
+            vehicle_count=_num("Vehicle Count", int, 1),
+        ))
+    return records
+
+
+def measure(build, df: pd.DataFrame):
+    """返回（耗时秒，构建结果常驻内存MB，峰值内存MB）"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build(df)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, current / 2 ** 20, peak / 2 ** 20
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="列式存储转换基准")
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = generate_csv(os.path.join(tmp, "ev.csv"), args.rows)
+        df = pd.read_csv(path)
+
+    for name, build in (("legacy list[ElectricVehicleRecord]", legacy_records),
+                        ("EVRecordStore", EVRecordStore.from_dataframe)):
+        elapsed, retained, peak = measure(build, df)
+        print(f"{name:<36} rows={args.rows:<9} time={elapsed:8.3f}s "
+              f"retained={retained:8.1f}MB peak={peak:8.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
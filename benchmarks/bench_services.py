@@ -0,0 +1,145 @@
+"""服务层基准：向量化实现 vs 原对象列表实现
+
+在合成夹具CSV上分别运行原model_service/region_service的逐条记录实现（对
+ElectricVehicleRecord列表做推导式）与当前基于列式存储/索引/聚合表的实现，报告耗时。
+两者输出的一致性由 tests/test_service_parity.py 校验（复用本文件中的legacy_*实现）。
+
+用法：python -m benchmarks.bench_services --rows 50000
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.synthetic import generate_csv
+
+
+# --------------------------
+# 原实现（逐条记录），仅作对照
+# --------------------------
+def legacy_get_model_list(records, brand: str = None) -> List[Dict[str, str]]:
+    model_set = set()
+    for record in records:
+        if record.make and record.model:
+            model_set.add((record.make.lower(), record.make, record.model))
+    filtered = [{"brand": b, "model": m} for key, b, m in model_set if not brand or brand.lower() in key]
+    filtered.sort(key=lambda x: (x["brand"].lower(), x["model"].lower()))
+    return filtered
+
+
+def legacy_get_model_data(records, brand: str, model: str) -> Optional[Dict]:
+    matched = [r for r in records if r.make and r.model
+               and r.make.lower() == brand.lower() and r.model.lower() == model.lower()]
+    if not matched:
+        return None
+    ranges = [r.electric_range for r in matched if r.electric_range]
+    prices = [r.base_msrp for r in matched if r.base_msrp]
+    total = sum(r.vehicle_count for r in matched)
+    region_counts = {}
+    for r in matched:
+        if r.state:
+            region_counts[r.state] = region_counts.get(r.state, 0) + r.vehicle_count
+    distribution = {state: round(count / total * 100, 1) for state, count in region_counts.items()}
+    return {
+        "brand": matched[0].make,
+        "model": matched[0].model,
+        "range": round(float(np.mean(ranges)), 1) if ranges else None,
+        "price": round(float(np.mean(prices)), 2) if prices else None,
+        "market_share": round(total / sum(r.vehicle_count for r in records) * 100, 2),
+        "popular_region": max(distribution.items(), key=lambda x: x[1])[0] if distribution else None,
+        "region_distribution": distribution,
+        "model_years": sorted({r.model_year for r in matched if r.model_year}),
+        "ev_types": sorted({r.ev_type for r in matched if r.ev_type}),
+        "total_vehicles": total,
+    }
+
+
+def legacy_get_regions_by_level(records, level: str) -> List[str]:
+    return sorted({getattr(r, level) for r in records if getattr(r, level) and getattr(r, level).strip()})
+
+
+def legacy_get_cities_by_state(records, state: str) -> List[str]:
+    return sorted({r.city for r in records if r.state and r.state.lower() == state.lower() and r.city})
+
+
+def legacy_get_counties_by_city(records, city: str) -> List[str]:
+    return sorted({r.county for r in records if r.city and r.city.lower() == city.lower() and r.county})
+
+
+def legacy_get_region_data(records, state: str, city: str = None, county: str = None) -> Optional[Dict]:
+    state_records = [r for r in records if r.state and r.state.lower() == state.lower()]
+    if not state_records:
+        return None
+    filtered = state_records
+    if city:
+        filtered = [r for r in filtered if r.city and r.city.lower() == city.lower()]
+        if not filtered:
+            return None
+    if county:
+        filtered = [r for r in filtered if r.county and r.county.lower() == county.lower()]
+        if not filtered:
+            return None
+    total = sum(r.vehicle_count for r in filtered)
+    state_total = sum(r.vehicle_count for r in state_records)
+    return {
+        "state": state, "city": city, "county": county, "ev_count": total,
+        "ev_ratio": round(total / state_total * 100, 2) if state_total > 0 else 0.0,
+        "charging_stations": sorted({r.electric_utility for r in filtered if r.electric_utility}),
+        "data_points": len(filtered),
+    }
+
+
+def normalize_region(result):
+    if isinstance(result, dict) and "charging_stations" in result:
+        result = dict(result, charging_stations=sorted(result["charging_stations"]))
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="服务层基准")
+    parser.add_argument("--rows", type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        os.makedirs(os.path.join(root, "data"))
+        generate_csv(os.path.join(root, "data", "Electric_Vehicle_Population_Datas.csv"), args.rows)
+        os.environ["EV_DATA_ROOT"] = root
+        os.environ["EV_SNAPSHOT"] = "0"
+        from backend.config.database import EVDataQuery
+        from backend.services import model_service, region_service
+
+        records = EVDataQuery._get_all_records().to_records()
+        pairs = [(p["brand"], p["model"]) for p in model_service.get_model_list()]
+        regions = [("WA", None, None), ("wa", "City0101", None), ("WA", "City0101", "County01"),
+                   ("WA", None, "county07"), ("CA", None, None), ("WA", "missing", None), ("ZZ", None, None)]
+        cases = [
+            ("get_model_list()", lambda rs: legacy_get_model_list(rs), lambda: model_service.get_model_list()),
+            ("get_model_list('o')", lambda rs: legacy_get_model_list(rs, "o"),
+             lambda: model_service.get_model_list("o")),
+            ("get_model_data(*all)", lambda rs: [legacy_get_model_data(rs, b, m) for b, m in pairs],
+             lambda: [model_service.get_model_data(b, m) for b, m in pairs]),
+            ("get_regions_by_level(city)", lambda rs: legacy_get_regions_by_level(rs, "city"),
+             lambda: region_service.get_regions_by_level("city")),
+            ("get_cities_by_state(wa)", lambda rs: legacy_get_cities_by_state(rs, "wa"),
+             lambda: region_service.get_cities_by_state("wa")),
+            ("get_counties_by_city", lambda rs: legacy_get_counties_by_city(rs, "City0101"),
+             lambda: region_service.get_counties_by_city("City0101")),
+            ("get_region_data(*regions)", lambda rs: [legacy_get_region_data(rs, *r) for r in regions],
+             lambda: [normalize_region(region_service.get_region_data(*r)) for r in regions]),
+        ]
+
+        for name, legacy, current in cases:
+            start = time.perf_counter()
+            legacy(records)
+            legacy_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            current()
+            current_seconds = time.perf_counter() - start
+            print(f"{name:<28} legacy={legacy_seconds * 1000:9.2f}ms current={current_seconds * 1000:8.2f}ms "
+                  f"speedup={legacy_seconds / max(current_seconds, 1e-9):8.1f}x")
+
+if __name__ == "__main__":
+    main()
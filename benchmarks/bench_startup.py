@@ -0,0 +1,106 @@
+"""启动耗时基准：各启动模式（EV_STARTUP_MODE）下，冷启动（解析CSV并写出快照）与快照命中两种情况
+
+每轮在独立子进程中启动uvicorn，轮询记录：
+- import：导入backend.main的耗时（单独子进程测得，不含数据加载）
+- live：进程开始接受连接（/health/live 返回200）的时刻
+- ready：数据集加载完成（/health/ready 返回200）的时刻
+- first：进程可连接后立即发出的首个数据请求（/api/regions/states）完成的时刻
+所有时刻均从启动子进程开始计时。
+
+用法：python -m benchmarks.bench_startup --rows 500000
+"""
+import argparse
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, Optional
+
+from benchmarks.synthetic import generate_csv
+
+MODES = ("eager", "background", "lazy")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _status(url: str) -> Optional[int]:
+    try:
+        with urllib.request.urlopen(url, timeout=30) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return None  # 尚未开始监听
+
+
+def _import_seconds(env: Dict[str, str]) -> float:
+    code = "import time; t = time.perf_counter(); import backend.main; print(time.perf_counter() - t)"
+    output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def run(mode: str, root: str, cached: bool, timeout: float = 120) -> Dict[str, float]:
+    snapshot_dir = os.path.join(root, "snapshots")
+    if not cached:
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+    env = {**os.environ, "EV_DATA_ROOT": root, "EV_SNAPSHOT_DIR": snapshot_dir, "EV_STARTUP_MODE": mode,
+           "EV_TASK_BACKEND": "local", "PYTHONPATH": os.getcwd()}
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port),
+                             "--log-level", "warning"], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    result: Dict[str, float] = {}
+    try:
+        while "live" not in result:
+            if time.perf_counter() - start > timeout or proc.poll() is not None:
+                raise RuntimeError(f"[{mode}] 服务未能启动")
+            if _status(base + "/health/live") == 200:
+                result["live"] = time.perf_counter() - start
+            else:
+                time.sleep(0.01)
+        # 可连接后立即发出首个数据请求（background模式下会等待预热中的构建完成）
+        _status(base + "/api/regions/states")
+        result["first"] = time.perf_counter() - start
+        while _status(base + "/health/ready") != 200:
+            if time.perf_counter() - start > timeout:
+                raise RuntimeError(f"[{mode}] 服务未能就绪")
+            time.sleep(0.01)
+        result["ready"] = time.perf_counter() - start
+    finally:
+        proc.terminate()
+        proc.wait()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="应用启动耗时基准")
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--modes", default=",".join(MODES), help="逗号分隔的启动模式")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        os.makedirs(os.path.join(root, "data"))
+        generate_csv(os.path.join(root, "data", "Electric_Vehicle_Population_Datas.csv"), args.rows)
+        env = {**os.environ, "EV_DATA_ROOT": root, "PYTHONPATH": os.getcwd()}
+        print(f"import backend.main: {_import_seconds(env):.3f}s（不含数据加载）")
+        for mode in args.modes.split(","):
+            for cached in (False, True):
+                result = run(mode, root, cached)
+                label = "snapshot" if cached else "cold"
+                print(f"[{mode:<10} {label:<8}] live {result['live']:6.2f}s  first {result['first']:6.2f}s  "
+                      f"ready {result['ready']:6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
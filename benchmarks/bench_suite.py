@@ -0,0 +1,291 @@
+"""基准测试套件：数据层微基准 + 进程内ASGI接口压测，结果写出为JSON便于跨提交比较
+
+- 按 --sizes 生成合成CSV（10k/100k/1m/5m，生成结果缓存在 --data-dir 下，重复运行直接复用）
+- 每个规模在独立子进程中运行，避免数据集、导入状态与内存互相影响
+- micro：CSV解析、数据集构建（解析CSV / 映射快照）、EVDataQuery.get_by_*、服务层函数等逐函数计时
+- http：经httpx.ASGITransport在进程内并发请求 /api/models、/api/regions 下的每个路由
+  （nocache：禁用HTTP响应缓存，衡量路由本身；cached：启用缓存，衡量热点查询）
+- --compare 读取此前的结果JSON逐项对比（微基准取最小耗时，受调度噪声影响最小；接口取p50），
+  超出 --threshold 倍视为退化并以非零状态退出
+
+用法：
+    python -m benchmarks.bench_suite --sizes 10k,100k --out bench.json
+    python -m benchmarks.bench_suite --sizes 10k,100k --out bench_new.json --compare bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.synthetic import generate_csv
+
+SIZE_PRESETS = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "5m": 5_000_000}
+CSV_NAME = "Electric_Vehicle_Population_Datas.csv"
+
+
+def _parse_size(label: str) -> int:
+    label = label.strip().lower()
+    return SIZE_PRESETS[label] if label in SIZE_PRESETS else int(label)
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def measure(func: Callable[[], Any], min_time: float = 0.2, min_calls: int = 5, max_calls: int = 2000,
+            warmup: bool = True) -> Dict[str, float]:
+    """重复调用func直到累计min_time秒（至少min_calls次），返回各次耗时统计（微秒）"""
+    if warmup:
+        func()
+    samples: List[float] = []
+    start = time.perf_counter()
+    while len(samples) < min_calls or (time.perf_counter() - start < min_time and len(samples) < max_calls):
+        begin = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - begin)
+    return {"calls": len(samples), "min_us": min(samples) * 1e6, "median_us": statistics.median(samples) * 1e6,
+            "p95_us": _percentile(samples, 0.95) * 1e6, "mean_us": statistics.fmean(samples) * 1e6}
+
+
+# --------------------------
+# 数据层微基准（子进程内运行）
+# --------------------------
+def run_micro() -> Dict[str, Dict[str, float]]:
+    from backend.config.database import (DEFAULT_CSV_NAME, EVDataLoader, EVDataQuery, EVDataRegistry,
+                                         get_csv_path)
+    from backend.services import model_service, region_service
+    from backend.services.report_service import build_detailed_report
+
+    EVDataRegistry.get()  # 构建数据集并写出快照（快照基准直接映射）
+    csv_path = get_csv_path()
+    # 耗时以秒计的用例只跑3次且不预热
+    heavy = {"min_time": 0, "min_calls": 3, "warmup": False}
+    cases: List[Tuple[str, Callable[[], Any], Dict[str, Any]]] = [
+        ("EVDataLoader.load_data", lambda: EVDataLoader.load_data(force_reload=True), heavy),
+        ("dataset_build.csv",
+         lambda: EVDataRegistry._from_dataframe(DEFAULT_CSV_NAME, None, 0, time.perf_counter()), heavy),
+        ("dataset_build.snapshot",
+         lambda: EVDataRegistry._from_snapshot(csv_path, DEFAULT_CSV_NAME, 0, time.perf_counter()), heavy),
+        ("EVDataLoader.get_records", lambda: len(EVDataLoader.get_records()), {}),
+        ("EVDataQuery.get_by_brand", lambda: EVDataQuery.get_by_brand("tesla").total_vehicles(), {}),
+        ("EVDataQuery.get_by_state", lambda: EVDataQuery.get_by_state("wa").total_vehicles(), {}),
+        ("EVDataQuery.get_by_city", lambda: EVDataQuery.get_by_city("city0101").total_vehicles(), {}),
+        ("EVDataQuery.get_by_brand_model",
+         lambda: EVDataQuery.get_by_brand_model("TESLA", "MODEL Y").total_vehicles(), {}),
+        ("EVDataQuery.get_by_region",
+         lambda: EVDataQuery.get_by_region("WA", "City0101", "County01").total_vehicles(), {}),
+        ("EVDataQuery.get_by_ev_type",
+         lambda: EVDataQuery.get_by_ev_type("Battery Electric Vehicle (BEV)").total_vehicles(), {}),
+        ("EVDataQuery.filter_records",
+         lambda: len(EVDataQuery.filter_records(
+             {"state": "WA", "make": "TESLA", "ev_type": "Battery Electric Vehicle (BEV)"}, model_year=2020)), {}),
+        ("EVDataQuery.search_values", lambda: EVDataQuery.search_values("model", "mod", 10), {}),
+        ("model_service.get_model_list", lambda: model_service.get_model_list(), {}),
+        ("model_service.get_model_list(brand)", lambda: model_service.get_model_list("o"), {}),
+        ("model_service.get_model_data", lambda: model_service.get_model_data("TESLA", "MODEL Y"), {}),
+        ("region_service.get_region_data(state)", lambda: region_service.get_region_data("WA"), {}),
+        ("region_service.get_region_data(city)",
+         lambda: region_service.get_region_data("WA", "City0101"), {}),
+        ("region_service.get_cities_by_state", lambda: region_service.get_cities_by_state("wa"), {}),
+        ("region_service.get_counties_by_city", lambda: region_service.get_counties_by_city("City0101"), {}),
+        ("region_service.get_regions_by_level", lambda: region_service.get_regions_by_level("city"), {}),
+        ("report_service.build_detailed_report", lambda: build_detailed_report("TESLA", "MODEL Y"), {}),
+    ]
+    results = {}
+    for name, func, options in cases:
+        results[name] = measure(func, **options)
+    EVDataLoader._cache.clear()  # 释放解析基准留下的DataFrame
+    return results
+
+
+# --------------------------
+# 进程内ASGI接口压测（子进程内运行）
+# --------------------------
+# 路由 -> 轮换使用的查询参数（参数轮换使缓存阶段同时包含命中与未命中）
+HTTP_ROUTES: List[Tuple[str, List[Dict[str, Any]]]] = [
+    ("/api/models/list", [{}, {"brand": "TESLA"}, {"brand": "KIA"}, {"limit": 20}]),
+    ("/api/models/", [{"brand": "TESLA", "model": "MODEL Y"}, {"brand": "nissan", "model": "leaf"},
+                      {"brand": "FORD", "model": "F-150"}]),
+    ("/api/models/detailed-report", [{"brand": "TESLA", "model": "MODEL 3"}]),
+    ("/api/regions/states", [{}, {"limit": 3}]),
+    ("/api/regions/cities", [{"state": "WA"}, {"state": "wa", "limit": 50}, {"state": "CA"}]),
+    ("/api/regions/counties", [{"state": "WA", "city": "City0101"}, {"state": "WA", "city": "City0505"}]),
+    ("/api/regions/", [{"state": "WA"}, {"state": "WA", "city": "City0101"},
+                       {"state": "WA", "city": "City0101", "county": "County01"}]),
+]
+
+
+async def _load(client, path: str, params: List[Dict[str, Any]], requests: int, concurrency: int
+                ) -> Dict[str, float]:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        for i in counter:
+            begin = time.perf_counter()
+            response = await client.get(path, params=params[i % len(params)])
+            latencies.append(time.perf_counter() - begin)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {"requests": requests, "rps": requests / elapsed, "p50_ms": _percentile(latencies, 0.5) * 1e3,
+            "p99_ms": _percentile(latencies, 0.99) * 1e3, "max_ms": max(latencies) * 1e3, "status": statuses}
+
+
+def run_http(requests: int, concurrency: int) -> Dict[str, Dict[str, Any]]:
+    import httpx
+    from backend.config.http_cache import response_cache
+    from backend.main import app
+
+    async def _run() -> Dict[str, Dict[str, Any]]:
+        results = {}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for phase, cache_size in (("nocache", 0), ("cached", response_cache.max_entries)):
+                response_cache.clear()
+                response_cache.max_entries, saved = cache_size, response_cache.max_entries
+                try:
+                    for path, params in HTTP_ROUTES:
+                        await client.get(path, params=params[0])  # 预热
+                        results[f"{phase} GET {path}"] = await _load(client, path, params, requests, concurrency)
+                finally:
+                    response_cache.max_entries = saved
+        return results
+
+    return asyncio.run(_run())
+
+
+def _child(args: argparse.Namespace) -> None:
+    result = {"rows": args.rows, "micro": run_micro()}
+    if args.requests > 0:
+        result["http"] = run_http(args.requests, args.concurrency)
+    print("BENCH_RESULT " + json.dumps(result))
+
+
+# --------------------------
+# 主进程：生成数据、逐规模运行子进程、汇总与比较
+# --------------------------
+def _dataset_root(data_dir: str, rows: int, seed: int) -> str:
+    root = os.path.join(data_dir, f"ev_{rows}_{seed}")
+    csv_path = os.path.join(root, "data", CSV_NAME)
+    if not os.path.exists(csv_path):
+        os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+        start = time.perf_counter()
+        generate_csv(csv_path + ".tmp", rows, seed=seed)
+        os.replace(csv_path + ".tmp", csv_path)
+        print(f"已生成 {rows} 行合成数据（{time.perf_counter() - start:.1f}s）：{csv_path}", file=sys.stderr)
+    return root
+
+
+def _metadata() -> Dict[str, Any]:
+    def _git(*cmd: str) -> Optional[str]:
+        try:
+            return subprocess.run(["git", *cmd], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    import numpy
+    import pandas
+    return {"timestamp": datetime.now().isoformat(timespec="seconds"), "commit": _git("rev-parse", "HEAD"),
+            "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "python": platform.python_version(), "numpy": numpy.__version__, "pandas": pandas.__version__,
+            "platform": platform.platform(), "cpu_count": os.cpu_count()}
+
+
+def _metrics(result: Dict[str, Any]) -> Dict[str, float]:
+    """扁平化为 规模/类别/名称 -> 比较用耗时（微基准为min_us，接口为p50_ms）"""
+    flat = {}
+    for size, data in result["sizes"].items():
+        for name, stats in data.get("micro", {}).items():
+            flat[f"{size}/micro/{name}"] = stats["min_us"]
+        for name, stats in data.get("http", {}).items():
+            flat[f"{size}/http/{name}"] = stats["p50_ms"]
+    return flat
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> int:
+    """逐项比较耗时，打印变化并返回退化项数"""
+    now, before = _metrics(current), _metrics(baseline)
+    regressions = 0
+    print(f"\n对比基线 {baseline['meta'].get('commit', '?')[:12]} -> {current['meta'].get('commit', '?')[:12]}"
+          f"（退化阈值 {threshold:.2f}x）")
+    for key in sorted(now.keys() & before.keys()):
+        ratio = now[key] / before[key] if before[key] else float("inf")
+        flag = ""
+        if ratio > threshold:
+            flag, regressions = "  <-- 退化", regressions + 1
+        elif ratio < 1 / threshold:
+            flag = "  (改进)"
+        print(f"  {key:<70} {before[key]:12.2f} -> {now[key]:12.2f}  x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="数据层与HTTP接口基准测试套件")
+    parser.add_argument("--sizes", default="10k,100k", help="逗号分隔的行数（10k/100k/1m/5m或整数）")
+    parser.add_argument("--out", default="bench_results.json", help="结果JSON输出路径")
+    parser.add_argument("--compare", default=None, help="作为基线比较的此前结果JSON")
+    parser.add_argument("--threshold", type=float, default=1.5, help="耗时超过基线的该倍数视为退化")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "ev_bench_data"),
+                        help="合成CSV缓存目录")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=500, help="每个路由的请求数（0表示跳过接口压测）")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--rows", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args)
+        return
+
+    result: Dict[str, Any] = {"meta": _metadata(), "sizes": {}}
+    for label in args.sizes.split(","):
+        rows = _parse_size(label)
+        root = _dataset_root(args.data_dir, rows, args.seed)
+        env = {**os.environ, "EV_DATA_ROOT": root, "EV_SNAPSHOT": "1",
+               "EV_SNAPSHOT_DIR": os.path.join(root, "snapshots"), "EV_TASK_BACKEND": "local",
+               "PYTHONPATH": os.getcwd()}
+        command = [sys.executable, "-m", "benchmarks.bench_suite", "--child", "--rows", str(rows),
+                   "--requests", str(args.requests), "--concurrency", str(args.concurrency)]
+        output = subprocess.run(command, env=env, capture_output=True, text=True)
+        lines = [line for line in output.stdout.splitlines() if line.startswith("BENCH_RESULT ")]
+        if output.returncode != 0 or not lines:
+            sys.stderr.write(output.stderr)
+            raise SystemExit(f"规模 {label} 的基准运行失败（退出码 {output.returncode}）")
+        data = json.loads(lines[-1][len("BENCH_RESULT "):])
+        result["sizes"][label] = data
+
+        print(f"[{label}] {rows} 行")
+        for name, stats in data["micro"].items():
+            print(f"  {name:<45} median {stats['median_us']:12.1f}us  p95 {stats['p95_us']:12.1f}us"
+                  f"  ({stats['calls']} 次)")
+        for name, stats in data.get("http", {}).items():
+            print(f"  {name:<45} {stats['rps']:8.0f} req/s  p50 {stats['p50_ms']:7.2f}ms"
+                  f"  p99 {stats['p99_ms']:7.2f}ms  {stats['status']}")
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.threshold)
+        if regressions:
+            raise SystemExit(f"{regressions} 项超出退化阈值")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""任务后端基准：提交到拿到结果的延迟（本地线程池后端 vs Celery/RabbitMQ）
+
+- serial：逐个提交并等待结果（单个请求的端到端延迟）
+- burst：一次性提交全部任务后再逐个等待（并发吞吐）
+
+Celery后端需要可达的Broker以及已启动的worker（worker读取同一份数据，
+EV_DATA_ROOT需一致）；Broker不可达时跳过并给出原因。
+
+用法：python -m benchmarks.bench_task_backend --rows 50000 --tasks 200 --backends local celery
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from typing import List, Tuple
+
+from benchmarks.synthetic import generate_csv
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def run_serial(backend, jobs: List[Tuple[str, str]], timeout: float) -> List[float]:
+    latencies = []
+    for brand, model in jobs:
+        start = time.perf_counter()
+        task_id = backend.submit("generate_detailed_report", brand, model)
+        state = backend.wait(task_id, timeout)
+        if state.state != "SUCCESS":
+            raise RuntimeError(f"任务 {task_id} 未成功：{state.state} {state.result}")
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run_burst(backend, jobs: List[Tuple[str, str]], timeout: float) -> float:
+    start = time.perf_counter()
+    task_ids = [backend.submit("generate_detailed_report", brand, model) for brand, model in jobs]
+    for task_id in task_ids:
+        state = backend.wait(task_id, timeout)
+        if state.state != "SUCCESS":
+            raise RuntimeError(f"任务 {task_id} 未成功：{state.state} {state.result}")
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="任务后端提交-结果延迟基准")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--backends", nargs="+", default=["local", "celery"], choices=["local", "celery"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        os.makedirs(os.path.join(root, "data"))
+        generate_csv(os.path.join(root, "data", "Electric_Vehicle_Population_Datas.csv"), args.rows)
+        os.environ.setdefault("EV_DATA_ROOT", root)
+        os.environ["EV_SNAPSHOT"] = "0"
+        from backend.config.database import EVDataQuery
+        from backend.tasks.task_backend import BACKENDS
+
+        pairs = EVDataQuery.get_brand_model_pairs()
+        jobs = [pairs[i % len(pairs)] for i in range(args.tasks)]
+
+        for name in args.backends:
+            try:
+                backend = BACKENDS[name]()
+                latencies = run_serial(backend, jobs, args.timeout)
+                burst = run_burst(backend, jobs, args.timeout)
+            except Exception as e:
+                print(f"{name:<7} 跳过：{type(e).__name__}: {e}")
+                continue
+            print(f"{name:<7} tasks={args.tasks:<6} "
+                  f"serial mean={statistics.mean(latencies) * 1000:8.2f}ms "
+                  f"p50={_percentile(latencies, 0.5) * 1000:8.2f}ms "
+                  f"p95={_percentile(latencies, 0.95) * 1000:8.2f}ms "
+                  f"burst={burst:7.3f}s ({args.tasks / burst:8.1f} tasks/s)")
+            if hasattr(backend, "shutdown"):
+                backend.shutdown()
+
+
+if __name__ == "__main__":
+    main()
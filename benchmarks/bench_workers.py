@@ -0,0 +1,93 @@
+"""多worker内存基准：每个worker各自解析CSV（private） vs 映射共享快照（shared）
+
+同时启动N个worker进程（模拟uvicorn/Celery多worker），全部加载完数据集并跑一遍
+典型查询后，在所有进程仍存活时读取 /proc/self/smaps_rollup：
+- RSS：常驻内存（共享页在每个进程里都会被计入）
+- PSS：按共享进程数均摊后的内存，N个worker的PSS之和约等于真实占用
+- Private：该进程独占的内存
+- Anon：匿名内存（堆上的数组/对象，无法与其他进程共享；共享快照模式下这部分应大幅下降）
+
+用法：python -m benchmarks.bench_workers --rows 500000 --workers 4
+"""
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+from typing import Dict
+
+from benchmarks.synthetic import generate_csv
+
+
+def _smaps() -> Dict[str, float]:
+    """当前进程的内存统计（MB）；非Linux平台退回ru_maxrss"""
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = dict(line.split(":", 1) for line in f.read().splitlines()[1:])
+        kb = {name: int(value.split()[0]) for name, value in fields.items()}
+        return {"rss": kb["Rss"] / 1024, "pss": kb["Pss"] / 1024,
+                "private": (kb["Private_Clean"] + kb["Private_Dirty"]) / 1024, "anon": kb["Anonymous"] / 1024}
+    except OSError:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return {"rss": rss, "pss": rss, "private": rss, "anon": rss}
+
+
+def _worker(env: Dict[str, str], barrier, results) -> None:
+    os.environ.update(env)
+    from backend.config.database import EVDataQuery
+    from backend.services import model_service, region_service
+
+    before = _smaps()
+    dataset = EVDataQuery._get_dataset()
+    # 跑一遍典型查询，让惰性部分（解码表、索引切片等）都被触及
+    model_service.get_model_list()
+    region_service.get_region_data("WA")
+    EVDataQuery.get_by_state("wa").distinct("city")
+    barrier.wait()  # 所有worker都映射完成后再统计，PSS才能反映共享
+    after = _smaps()
+    results.put((os.getpid(), dataset.source, before, after))
+    barrier.wait()  # 统计完成前保持存活
+
+
+def run(mode: str, root: str, workers: int) -> None:
+    env = {"EV_DATA_ROOT": root, "EV_SNAPSHOT": "1" if mode == "shared" else "0",
+           "EV_SNAPSHOT_DIR": os.path.join(root, "snapshots")}
+    ctx = mp.get_context("spawn")
+    barrier, results = ctx.Barrier(workers), ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(env, barrier, results)) for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+    rows = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+
+    print(f"[{mode}] {workers} workers")
+    totals = {"rss": 0.0, "pss": 0.0, "private": 0.0, "anon": 0.0}
+    for pid, source, before, after in sorted(rows):
+        delta = {name: after[name] - before[name] for name in totals}
+        for name in totals:
+            totals[name] += delta[name]
+        print(f"  pid={pid:<7} source={source:<8} "
+              f"before rss={before['rss']:7.1f}MB  after rss={after['rss']:7.1f}MB "
+              f"pss={after['pss']:7.1f}MB private={after['private']:7.1f}MB  "
+              f"(dataset: +{delta['rss']:.1f} rss / +{delta['pss']:.1f} pss / +{delta['private']:.1f} private / "
+              f"+{delta['anon']:.1f} anon)")
+    print(f"  dataset total across workers: rss +{totals['rss']:.1f}MB, pss +{totals['pss']:.1f}MB, "
+          f"private +{totals['private']:.1f}MB, anon +{totals['anon']:.1f}MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="多worker数据集内存基准")
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        os.makedirs(os.path.join(root, "data"))
+        generate_csv(os.path.join(root, "data", "Electric_Vehicle_Population_Datas.csv"), args.rows)
+        run("private", root, args.workers)
+        run("shared", root, args.workers)  # 首个worker写出快照，其余worker等待后直接映射
+
+
+if __name__ == "__main__":
+    main()
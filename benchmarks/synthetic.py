@@ -0,0 +1,121 @@
+"""生成与华盛顿州电动汽车人口数据结构一致的合成CSV（用于基准测试）
+
+用法：python -m benchmarks.synthetic --rows 200000 --out /tmp/ev.csv
+"""
+import argparse
+import csv
+import random
+from typing import Optional
+
+HEADER = [
+    "VIN (1-10)", "County", "City", "State", "Postal Code", "Model Year", "Make", "Model",
+    "Electric Vehicle Type", "Clean Alternative Fuel Vehicle (CAFV) Eligibility",
+    "Electric Range", "Base MSRP", "Legislative District", "DOL Vehicle ID",
+    "Vehicle Location", "Electric Utility", "2020 Census Tract",
+]
+
+MAKES = {
+    "TESLA": ["MODEL 3", "MODEL Y", "MODEL S", "MODEL X", "CYBERTRUCK"],
+    "NISSAN": ["LEAF", "ARIYA"],
+    "CHEVROLET": ["BOLT EV", "BOLT EUV", "VOLT"],
+    "FORD": ["MUSTANG MACH-E", "F-150", "FUSION", "ESCAPE"],
+    "KIA": ["NIRO", "EV6", "SOUL"],
+    "BMW": ["I3", "X5", "IX", "330E"],
+    "TOYOTA": ["PRIUS PRIME", "RAV4 PRIME", "BZ4X"],
+    "RIVIAN": ["R1S", "R1T"],
+    "HYUNDAI": ["IONIQ 5", "KONA ELECTRIC", "IONIQ"],
+    "VOLKSWAGEN": ["ID.4", "E-GOLF"],
+    "JEEP": ["WRANGLER", "GRAND CHEROKEE"],
+    "VOLVO": ["XC90", "XC60", "C40"],
+    "AUDI": ["E-TRON", "Q5 E"],
+    "CHRYSLER": ["PACIFICA"],
+    "POLESTAR": ["PS2"],
+}
+EV_TYPES = ["Battery Electric Vehicle (BEV)", "Plug-in Hybrid Electric Vehicle (PHEV)"]
+CAFV = [
+    "Clean Alternative Fuel Vehicle Eligible",
+    "Not eligible due to low battery range",
+    "Eligibility unknown as battery range has not been researched",
+]
+UTILITIES = [
+    "PUGET SOUND ENERGY INC||CITY OF TACOMA - (WA)",
+    "PUGET SOUND ENERGY INC",
+    "CITY OF SEATTLE - (WA)|CITY OF TACOMA - (WA)",
+    "BONNEVILLE POWER ADMINISTRATION||PUD NO 1 OF CLARK COUNTY - (WA)",
+    "PACIFICORP",
+    "AVISTA CORP",
+]
+
+
+def _regions(n_counties: int = 40, cities_per_county: int = 12):
+    """构造州→县→市的层级结构（WA为主，少量外州记录）"""
+    regions = []
+    for c in range(n_counties):
+        county = f"County{c:02d}"
+        for k in range(cities_per_county):
+            regions.append(("WA", county, f"City{c:02d}{k:02d}"))
+    for state in ("CA", "OR", "TX", "VA", "MD", "NY", "BC"):
+        regions.append((state, f"{state}County", f"{state}City"))
+    regions.append(("ID", "Kootenai", "Coeur d'Alène"))  # 非ASCII取值，覆盖编码探测
+    return regions
+
+
+def generate_csv(path: str, rows: int, seed: int = 42, missing_ratio: float = 0.002,
+                 vehicle_count: bool = False, encoding: str = "utf-8") -> str:
+    """写出rows行合成数据，返回文件路径
+
+    - 州分布以WA为主（约99%），与真实数据偏斜一致
+    - 按missing_ratio随机留空县/市/续航/价格等字段，覆盖缺失值处理分支
+    - vehicle_count=True时额外写出“Vehicle Count”列
+    - encoding可设为latin-1/gbk等，模拟不同系统导出的文件
+    """
+    rng = random.Random(seed)
+    regions = _regions()
+    wa_regions = [r for r in regions if r[0] == "WA"]
+    other_regions = [r for r in regions if r[0] != "WA"]
+    makes = list(MAKES)
+    make_weights = [40, 8, 7, 6, 5, 4, 4, 3, 3, 3, 2, 2, 2, 1, 1]
+    header = HEADER + (["Vehicle Count"] if vehicle_count else [])
+    # 真实数据中VIN前10位高度重复（同批次车辆），用有限池模拟其基数
+    vins = [f"{rng.randrange(16 ** 10):010X}" for _ in range(max(1, rows // 15))]
+
+    def _maybe(value) -> Optional[object]:
+        return "" if rng.random() < missing_ratio else value
+
+    with open(path, "w", newline="", encoding=encoding) as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for i in range(rows):
+            state, county, city = (rng.choice(wa_regions) if rng.random() < 0.99
+                                   else rng.choice(other_regions))
+            make = rng.choices(makes, weights=make_weights)[0]
+            model = rng.choice(MAKES[make])
+            ev_type = EV_TYPES[0] if rng.random() < 0.78 else EV_TYPES[1]
+            year = rng.randint(2011, 2025)
+            e_range = rng.choice([0, 0, 0, 21, 25, 32, 84, 150, 215, 238, 259, 291, 308, 322, 337])
+            msrp = rng.choice([0] * 20 + [31950, 36900, 52650, 59900, 69900, 110950])
+
+            row = [
+                rng.choice(vins), _maybe(county), _maybe(city), state,
+                98000 + rng.randrange(1000), year, make, model, ev_type, rng.choice(CAFV),
+                _maybe(e_range), _maybe(msrp), rng.randint(1, 49), 100000000 + i,
+                f"POINT (-122.{rng.randrange(10 ** 5)} 47.{rng.randrange(10 ** 5)})",
+                _maybe(rng.choice(UTILITIES)), 53033000000 + rng.randrange(10 ** 6),
+            ]
+            if vehicle_count:
+                row.append(rng.randint(1, 3))
+            writer.writerow(row)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成合成电动汽车人口CSV")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--out", default="Electric_Vehicle_Population_Datas.csv")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--vehicle-count", action="store_true", help="额外写出Vehicle Count列")
+    parser.add_argument("--encoding", default="utf-8")
+    args = parser.parse_args()
+    generate_csv(args.out, args.rows, seed=args.seed, vehicle_count=args.vehicle_count,
+                 encoding=args.encoding)
+    print(f"已生成 {args.rows} 行：{args.out}")
@@ -62,7 +62,7 @@ async function submitDetailedReport(brand, model) {
             throw new Error(data.message || "提交报告任务失败：未获取到任务ID");
         }
         
-        return data.task_id; // 返回任务ID，供后续轮询结果使用
+        return data.task_id; // 返回任务ID，供后续订阅结果使用
     } catch (error) {
         console.error("提交报告任务错误:", error);
         alert(error.message || "提交失败，请重试");
@@ -70,7 +70,7 @@ async function submitDetailedReport(brand, model) {
     }
 }
 
-// 轮询异步任务结果（查询报告生成状态）
+// 查询一次异步任务状态（推送连接无法建立时用于取得错误信息）
 async function checkTaskResult(taskId) {
     try {
         const response = await fetch(`http://localhost:8000/api/tasks/${taskId}`);
@@ -88,8 +88,91 @@ async function checkTaskResult(taskId) {
     }
 }
 
+// 订阅异步任务结果（服务端推送SSE，不轮询）
+// onUpdate(状态对象)在每次状态变化时调用；返回的Promise在任务结束时resolve为最终结果（含result）
+// 服务端推送超时后重新订阅；连接被拒绝（如任务不存在）时查询一次状态作为最终结果
+function watchTaskResult(taskId, onUpdate) {
+    return new Promise((resolve) => {
+        const subscribe = () => {
+            const source = new EventSource(`http://localhost:8000/api/tasks/${taskId}/stream`);
+            source.addEventListener('status', (e) => {
+                if (onUpdate) onUpdate(JSON.parse(e.data));
+            });
+            source.addEventListener('done', (e) => {
+                source.close();
+                const result = JSON.parse(e.data);
+                if (onUpdate) onUpdate(result);
+                resolve(result);
+            });
+            source.addEventListener('timeout', () => {
+                source.close();
+                subscribe();
+            });
+            source.onerror = async () => {
+                // 连接中断时EventSource自动重连（服务端会先推送当前状态）；已关闭说明请求被拒绝
+                if (source.readyState !== EventSource.CLOSED) return;
+                resolve(await checkTaskResult(taskId));
+            };
+        };
+        subscribe();
+    });
+}
+
+// 生成详细报告并等待结果：提交任务后订阅推送，onUpdate接收进度；返回最终结果（失败时为null）
+async function generateDetailedReport(brand, model, onUpdate) {
+    const taskId = await submitDetailedReport(brand, model);
+    if (!taskId) return null;
+    const result = await watchTaskResult(taskId, onUpdate);
+    return result && result.status === 'success' ? result.result : null;
+}
+
+// 输入联想（品牌/车型/州/市/县）：返回[{value, vehicles}]，失败时返回空数组（联想失败不打扰用户）
+async function fetchSuggestions(field, q, brand, limit = 10) {
+    try {
+        const params = new URLSearchParams({ field, q, limit });
+        if (brand) params.append('brand', brand);
+        const response = await fetch(`http://localhost:8000/api/search/autocomplete?${params}`);
+        const data = await response.json();
+        return response.ok ? data.data : [];
+    } catch (error) {
+        console.error("获取联想结果错误:", error);
+        return [];
+    }
+}
+
+// 为文本输入框挂载联想下拉（datalist），输入停顿delay毫秒后再请求，getBrand可限定车型所属品牌
+function attachAutocomplete(input, field, getBrand, delay = 150) {
+    const datalist = document.createElement('datalist');
+    datalist.id = `${input.id}-suggestions`;
+    input.after(datalist);
+    input.setAttribute('list', datalist.id);
+    input.setAttribute('autocomplete', 'off');
+    let timer = null;
+    input.addEventListener('input', () => {
+        clearTimeout(timer);
+        const q = input.value.trim();
+        if (!q) return;
+        timer = setTimeout(async () => {
+            const suggestions = await fetchSuggestions(field, q, getBrand ? getBrand() : null);
+            if (input.value.trim() !== q) return; // 已有更新的输入，丢弃过期结果
+            datalist.replaceChildren(...suggestions.map(({ value }) => {
+                const option = document.createElement('option');
+                option.value = value;
+                return option;
+            }));
+        }, delay);
+    });
+}
+
 // 绑定表单提交事件（确保DOM加载完成后执行，避免元素不存在报错）
 document.addEventListener('DOMContentLoaded', () => {
+    // 车型输入联想（按已选品牌限定）
+    const modelInput = document.getElementById('model');
+    if (modelInput) {
+        const brandSelect = document.getElementById('brand');
+        attachAutocomplete(modelInput, 'model', () => (brandSelect ? brandSelect.value.trim() : null));
+    }
+
     // 车型查询表单提交（增加DOM存在性检查，增强兼容性）
     const modelForm = document.getElementById('model-query-form');
     if (modelForm) {
@@ -123,6 +206,30 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
+    // 详细报告：提交异步任务，经SSE接收进度与最终报告
+    const reportButton = document.getElementById('report-button');
+    if (reportButton) {
+        reportButton.addEventListener('click', async () => {
+            const brand = document.getElementById('brand').value.trim();
+            const model = document.getElementById('model').value.trim();
+            if (!brand || !model) {
+                alert("请输入品牌和车型（不能为空）");
+                return;
+            }
+            const status = document.getElementById('report-status');
+            reportButton.disabled = true;
+            const report = await generateDetailedReport(brand, model, (update) => {
+                status.textContent = update.message || '';
+            });
+            reportButton.disabled = false;
+            if (report) {
+                const info = report.model_info;
+                status.textContent = `报告已生成：${info.brand} ${info.model}，共${info.total_vehicles.toLocaleString()}辆，`
+                    + `热门区域 ${info.popular_region}。${report.market_forecast.next_year_prediction}`;
+            }
+        });
+    }
+
     // 区域查询表单提交（同样增加DOM检查和参数验证）
     const regionForm = document.getElementById('region-query-form');
     if (regionForm) {
@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+# 测试在导入backend之前固定运行环境：不读写快照、不连Celery、不在导入时预热或监视CSV
+os.environ["EV_SNAPSHOT"] = "0"
+os.environ["EV_TASK_BACKEND"] = "local"
+os.environ["EV_STARTUP_MODE"] = "lazy"
+os.environ["EV_RELOAD_INTERVAL"] = "0"
+
+from backend.config.database import EVDataRegistry  # noqa: E402
+from benchmarks.synthetic import generate_csv  # noqa: E402
+
+FIXTURE_ROWS = 3000
+
+
+@pytest.fixture(scope="session")
+def data_root(tmp_path_factory):
+    """合成夹具CSV所在的数据根目录（EV_DATA_ROOT）"""
+    root = tmp_path_factory.mktemp("ev_data")
+    os.makedirs(root / "data")
+    generate_csv(str(root / "data" / "Electric_Vehicle_Population_Datas.csv"), FIXTURE_ROWS)
+    previous = os.environ.get("EV_DATA_ROOT")
+    os.environ["EV_DATA_ROOT"] = str(root)
+    yield root
+    if previous is None:
+        os.environ.pop("EV_DATA_ROOT", None)
+    else:
+        os.environ["EV_DATA_ROOT"] = previous
+
+
+@pytest.fixture
+def registry(data_root):
+    """清空已物化的数据集与转换计数，每个测试从未加载状态开始"""
+    EVDataRegistry.invalidate()
+    EVDataRegistry._conversions = 0
+    yield EVDataRegistry
+    EVDataRegistry.invalidate()
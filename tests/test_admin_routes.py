@@ -0,0 +1,23 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.routes import admin_routes
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def test_admin_routes_fail_closed_without_token(client, monkeypatch):
+    monkeypatch.setattr(admin_routes, "ADMIN_TOKEN", None)
+    assert client.post("/api/admin/reload").status_code == 403
+    assert client.get("/api/admin/dataset").status_code == 403
+    assert client.get("/api/admin/dataset", headers={"X-Admin-Token": ""}).status_code == 403
+
+
+def test_admin_routes_require_matching_token(client, registry, monkeypatch):
+    monkeypatch.setattr(admin_routes, "ADMIN_TOKEN", "secret")
+    assert client.get("/api/admin/dataset", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/api/admin/dataset", headers={"X-Admin-Token": "secret"}).status_code == 200
@@ -0,0 +1,40 @@
+from backend.config.database import EVDataQuery, get_ev_data, init_ev_data
+from backend.config.query_engine import run_aggregate_query
+from backend.services import model_service, region_service
+from backend.services.report_service import build_detailed_report
+
+
+def _touch_every_consumer():
+    brand, model = EVDataQuery.get_brand_model_pairs()[0]
+    assert model_service.get_model_list()
+    assert model_service.get_model_data(brand, model)
+    assert region_service.get_regions_by_level("state")
+    assert region_service.get_region_data("WA")
+    assert build_detailed_report(brand, model)
+    assert run_aggregate_query({"group_by": ["make"], "metrics": ["count"]})["groups"]
+    assert EVDataQuery.search_values("make", brand[:2])
+    assert EVDataQuery.get_ranking("make", {"state": "WA"})
+    assert len(get_ev_data())
+
+
+def test_conversion_runs_once_per_data_version(registry):
+    assert init_ev_data()
+    _touch_every_consumer()
+    _touch_every_consumer()
+    assert registry.conversion_count() == 1
+
+
+def test_invalidate_builds_a_new_version(registry):
+    _touch_every_consumer()
+    version = EVDataQuery.get_data_version()
+    registry.invalidate()
+    _touch_every_consumer()
+    assert registry.conversion_count() == 2
+    assert EVDataQuery.get_data_version() > version
+
+
+def test_forced_reload_converts_again(registry):
+    _touch_every_consumer()
+    registry.reload(force=True)
+    _touch_every_consumer()
+    assert registry.conversion_count() == 2
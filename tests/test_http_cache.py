@@ -0,0 +1,31 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.config import http_cache
+from backend.main import app
+
+
+@pytest.fixture
+def client(registry):
+    return TestClient(app)
+
+
+def test_etag_changes_with_build_id(client, monkeypatch):
+    first = client.get("/api/regions/states")
+    etag = first.headers["etag"]
+    assert client.get("/api/regions/states", headers={"If-None-Match": etag}).status_code == 304
+
+    monkeypatch.setattr(http_cache, "BUILD_ID", "next-build")
+    second = client.get("/api/regions/states", headers={"If-None-Match": etag})
+    assert second.status_code == 200
+    assert second.headers["etag"] != etag
+
+
+def test_if_modified_since_respects_build_time(client, monkeypatch):
+    last_modified = client.get("/api/regions/states").headers["last-modified"]
+    assert client.get("/api/regions/states", headers={"If-Modified-Since": last_modified}).status_code == 304
+
+    monkeypatch.setattr(http_cache, "BUILD_TIME", http_cache.BUILD_TIME + 3600)
+    response = client.get("/api/regions/states", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 200
+    assert response.headers["last-modified"] != last_modified
@@ -0,0 +1,53 @@
+import shutil
+
+import pytest
+
+from backend.config.database import EVDataRegistry
+
+FILE_NAME = "append_test.csv"
+
+
+@pytest.fixture
+def csv_file(registry, data_root):
+    path = data_root / "data" / FILE_NAME
+    shutil.copyfile(data_root / "data" / "Electric_Vehicle_Population_Datas.csv", path)
+    yield path
+    path.unlink()
+
+
+def _rows(path, count):
+    """取CSV前count条数据行（改写车辆ID，避免与已有行完全相同）"""
+    lines = path.read_bytes().splitlines(keepends=True)[1:count + 1]
+    return [line.replace(b",1000", b",2000", 1) for line in lines]
+
+
+def test_append_without_snapshots(csv_file):
+    base = EVDataRegistry.get(FILE_NAME)
+    assert base.fingerprint and base.source_size == csv_file.stat().st_size
+    with open(csv_file, "ab") as f:
+        f.writelines(_rows(csv_file, 5))
+    dataset = EVDataRegistry.reload(FILE_NAME)
+    assert dataset.source == "append"
+    assert dataset.store.size == base.store.size + 5
+
+
+def test_half_written_row_is_left_for_the_next_reload(csv_file):
+    base = EVDataRegistry.get(FILE_NAME)
+    first, second = _rows(csv_file, 2)
+    cut = len(second) // 2
+    with open(csv_file, "ab") as f:
+        f.write(first + second[:cut])
+    dataset = EVDataRegistry.reload(FILE_NAME)
+    assert dataset.source == "append"
+    assert dataset.store.size == base.store.size + 1
+    assert dataset.source_size == base.source_size + len(first)
+
+    # 行还没写完时不重建，继续使用当前版本
+    assert EVDataRegistry.reload(FILE_NAME) is dataset
+
+    with open(csv_file, "ab") as f:
+        f.write(second[cut:])
+    finished = EVDataRegistry.reload(FILE_NAME)
+    assert finished.source == "append"
+    assert finished.store.size == base.store.size + 2
+    assert finished.source_size == csv_file.stat().st_size
@@ -0,0 +1,35 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.config import metrics
+from backend.routes import admin_routes
+
+
+@pytest.fixture
+def client(registry, monkeypatch):
+    monkeypatch.setattr(main, "PROFILING_OPEN", False)
+    monkeypatch.setattr(admin_routes, "ADMIN_TOKEN", None)
+    return TestClient(main.app)
+
+
+def test_profiling_closed_by_default(client):
+    assert client.get("/api/regions/states", params={"profile": "1"}).status_code == 403
+
+
+def test_profiling_with_admin_token(client, monkeypatch):
+    monkeypatch.setattr(admin_routes, "ADMIN_TOKEN", "secret")
+    response = client.get("/api/regions/states", params={"profile": "1"}, headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.json()["data"]["profile"]
+
+
+def test_profiling_opt_in(client, monkeypatch):
+    monkeypatch.setattr(main, "PROFILING_OPEN", True)
+    assert client.get("/api/regions/states", params={"profile": "1"}).status_code == 200
+
+
+def test_concurrent_profile_is_busy(client, monkeypatch):
+    monkeypatch.setattr(main, "PROFILING_OPEN", True)
+    with metrics.RequestProfiler():
+        assert client.get("/api/regions/states", params={"profile": "1"}).status_code == 409
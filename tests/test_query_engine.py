@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from backend.config.query_engine import QueryPlan, run_aggregate_query
+
+
+class _IntColumnStore:
+    """只提供数值列的最小存储，用于直接检查分组编码"""
+
+    def __init__(self, **columns):
+        self.columns = columns
+        self.size = len(next(iter(columns.values())))
+
+    def values(self, field):
+        return self.columns[field]
+
+
+def test_metrics_default_only_when_absent(registry):
+    result = run_aggregate_query({"group_by": ["make"]})
+    assert result["groups"] and "count" in result["groups"][0]
+    for metrics in ([], None):
+        with pytest.raises(ValueError):
+            run_aggregate_query({"group_by": ["make"], "metrics": metrics})
+
+
+def test_dense_int_group_codes():
+    store = _IntColumnStore(model_year=np.array([2020, 2022, 2020, 0], dtype=np.int16))
+    codes, display = QueryPlan(store, {"group_by": ["model_year"]})._group_column("model_year", None)
+    assert display.tolist() == [2020, 2021, 2022]
+    assert codes.tolist() == [0, 2, 0, -1]
+
+
+def test_wide_int_span_falls_back_to_unique():
+    store = _IntColumnStore(vehicle_count=np.array([1, 2_000_000_000, 1, 7], dtype=np.int64))
+    codes, display = QueryPlan(store, {"group_by": ["vehicle_count"]})._group_column("vehicle_count", None)
+    assert display.tolist() == [1, 7, 2_000_000_000]
+    assert codes.tolist() == [0, 2, 0, 1]
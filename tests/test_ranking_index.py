@@ -0,0 +1,38 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+
+from backend.config import database
+from backend.config.database import EVDataRegistry, EVRankingIndex
+from backend.main import app
+
+
+def test_build_runs_outside_the_index_lock(registry, monkeypatch):
+    index = EVRankingIndex(EVDataRegistry.get().store)
+    ready = index.table((), "make", "vehicles")
+    build = database._build_ranking_table
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_build(*args):
+        calls.append(args)
+        started.set()
+        release.wait(5)
+        return build(*args)
+
+    monkeypatch.setattr(database, "_build_ranking_table", slow_build)
+    with ThreadPoolExecutor(4) as pool:
+        pending = [pool.submit(index.table, ("state",), "model", "vehicles") for _ in range(3)]
+        assert started.wait(5)
+        # 另一张表构建期间，已建好的表仍可直接取用
+        assert index.table((), "make", "vehicles") is ready
+        release.set()
+        tables = {id(future.result(5)) for future in pending}
+    assert len(calls) == 1 and len(tables) == 1
+
+
+def test_ranking_route(registry):
+    response = TestClient(app).get("/api/rankings/make", params={"state": "WA", "limit": 3})
+    assert response.status_code == 200
+    assert len(response.json()["data"]) <= 3
@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.config.database import EVDataQuery
+from backend.main import app
+from backend.tasks.report_cache import ReportCache, report_cache
+from backend.tasks.task_backend import get_task_backend
+
+
+def test_submit_does_not_hold_the_lock():
+    cache = ReportCache()
+
+    def slow_submit():
+        # Broker往返期间其他请求仍可读取缓存状态
+        reader = threading.Thread(target=cache.stats)
+        reader.start()
+        reader.join(1)
+        assert not reader.is_alive()
+        return "task-1"
+
+    assert cache.submit("k", slow_submit) == ("task-1", "submitted")
+
+
+def test_concurrent_submits_share_one_task():
+    cache = ReportCache()
+    calls = []
+
+    def submit():
+        calls.append(1)
+        time.sleep(0.05)
+        return "task-1"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.submit("k", submit))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert sorted(source for _, source in results) == ["inflight"] * 4 + ["submitted"]
+
+
+def test_failed_submit_rolls_back():
+    cache = ReportCache()
+
+    def broken():
+        raise ConnectionError("broker unreachable")
+
+    with pytest.raises(ConnectionError):
+        cache.submit("k", broken)
+    assert cache.submit("k", lambda: "task-2") == ("task-2", "submitted")
+
+
+def test_completion_before_registration_is_cached():
+    cache = ReportCache()
+
+    def submit():
+        cache.complete("task-3", {"report": 1})  # 本地后端可能在返回task_id前就已完成
+        return "task-3"
+
+    cache.submit("k", submit)
+    assert cache.get_result("task-3") == {"report": 1}
+
+
+def test_report_cached_on_completion_without_polling(registry):
+    report_cache.clear()
+    brand, model = EVDataQuery.get_brand_model_pairs()[0]
+    response = TestClient(app).get("/api/models/detailed-report", params={"brand": brand, "model": model})
+    task_id = response.json()["task_id"]
+    assert get_task_backend().wait(task_id, timeout=10).ready
+    assert report_cache.get_result(task_id) is not None
@@ -0,0 +1,21 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+
+
+@pytest.fixture
+def client(registry):
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("q", [" ", "   ", "\t"])
+def test_autocomplete_rejects_blank_input(client, q):
+    response = client.get("/api/search/autocomplete", params={"field": "make", "q": q})
+    assert response.status_code == 422
+
+
+def test_autocomplete_strips_input(client):
+    response = client.get("/api/search/autocomplete", params={"field": "make", "q": " te "})
+    assert response.status_code == 200
+    assert response.json()["data"]
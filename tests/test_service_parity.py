@@ -0,0 +1,49 @@
+"""向量化服务层实现与原逐条记录实现（benchmarks.bench_services中的legacy_*）的输出一致性"""
+import pytest
+
+from backend.config.database import EVDataQuery
+from backend.services import model_service, region_service
+from benchmarks.bench_services import (legacy_get_cities_by_state, legacy_get_counties_by_city,
+                                       legacy_get_model_data, legacy_get_model_list, legacy_get_region_data,
+                                       legacy_get_regions_by_level, normalize_region)
+
+REGIONS = [("WA", None, None), ("wa", "City0101", None), ("WA", "City0101", "County01"),
+           ("WA", None, "county07"), ("CA", None, None), ("WA", "missing", None), ("ZZ", None, None)]
+
+
+@pytest.fixture(scope="module")
+def records(data_root):
+    EVDataQuery.clear_query_cache()
+    return EVDataQuery._get_all_records().to_records()
+
+
+@pytest.mark.parametrize("brand", [None, "o", "TESLA", "nope"])
+def test_model_list(records, brand):
+    assert model_service.get_model_list(brand) == legacy_get_model_list(records, brand)
+
+
+def test_model_data_for_every_model(records):
+    pairs = [(item["brand"], item["model"]) for item in model_service.get_model_list()]
+    assert pairs
+    for brand, model in pairs + [(pairs[0][0].lower(), pairs[0][1].lower()), ("nope", "x")]:
+        assert model_service.get_model_data(brand, model) == legacy_get_model_data(records, brand, model)
+
+
+@pytest.mark.parametrize("level", ["state", "county", "city"])
+def test_regions_by_level(records, level):
+    assert region_service.get_regions_by_level(level) == legacy_get_regions_by_level(records, level)
+
+
+@pytest.mark.parametrize("state", ["wa", "CA", "ZZ"])
+def test_cities_by_state(records, state):
+    assert region_service.get_cities_by_state(state) == legacy_get_cities_by_state(records, state)
+
+
+@pytest.mark.parametrize("city", ["City0101", "city0101", "missing"])
+def test_counties_by_city(records, city):
+    assert region_service.get_counties_by_city(city) == legacy_get_counties_by_city(records, city)
+
+
+@pytest.mark.parametrize("region", REGIONS)
+def test_region_data(records, region):
+    assert normalize_region(region_service.get_region_data(*region)) == legacy_get_region_data(records, *region)
@@ -0,0 +1,83 @@
+import sys
+import time
+import types
+
+import pytest
+
+from backend.tasks import task_backend
+from backend.tasks.task_backend import FAILURE, RUNNING, SUCCESS, CeleryTaskBackend
+
+
+class _FakeResult:
+    def __init__(self, app, task_id):
+        if app.broken:
+            raise ConnectionError("result backend unreachable")
+        self.state, self.result = app.states.get(task_id, ("PENDING", None))
+
+
+class _FakeApp:
+    """只模拟结果后端读取：states 为 任务ID -> (状态, 结果)，broken 时读取抛出网络错误"""
+
+    def __init__(self):
+        self.states = {}
+        self.broken = False
+
+    def AsyncResult(self, task_id):
+        return _FakeResult(self, task_id)
+
+
+class _Receiver:
+    should_stop = False
+
+
+@pytest.fixture
+def celery_backend(monkeypatch):
+    app = _FakeApp()
+    monkeypatch.setitem(sys.modules, "backend.config.celery_config", types.SimpleNamespace(app=app))
+    monkeypatch.setitem(sys.modules, "backend.tasks.data_tasks", types.SimpleNamespace())
+    backend = CeleryTaskBackend()
+    backend._watcher = object()  # 不启动事件监听线程，测试中直接投递事件
+    published = []
+    monkeypatch.setattr(backend.events, "publish", lambda task_id, state: published.append((task_id, state)))
+    return backend, app, published
+
+
+def test_events_drive_state_changes(celery_backend):
+    backend, app, published = celery_backend
+    backend._watch("t1")
+    backend._on_event({"type": "task-started", "uuid": "t1"})
+    app.states["t1"] = ("SUCCESS", {"report": 1})
+    backend._on_event({"type": "task-succeeded", "uuid": "t1"})
+    assert [(state.state, state.result) for _, state in published] == [(RUNNING, None), (SUCCESS, {"report": 1})]
+    assert "t1" not in backend._watching
+    backend._on_event({"type": "task-failed", "uuid": "other", "exception": "boom"})
+    assert len(published) == 2  # 未监听、未订阅的任务事件直接忽略
+
+
+def test_result_read_errors_are_retried_not_failed(celery_backend):
+    backend, app, published = celery_backend
+    backend._watch("t2")
+    app.broken = True
+    backend._on_event({"type": "task-succeeded", "uuid": "t2"})
+    backend._tick(_Receiver())
+    assert not published and "t2" in backend._unread
+    app.broken = False
+    app.states["t2"] = ("SUCCESS", "done")
+    backend._tick(_Receiver())
+    assert [(state.state, state.result) for _, state in published] == [(SUCCESS, "done")]
+    assert not any(state.state == FAILURE for _, state in published)
+
+
+def test_new_subscriber_extends_watch_deadline(celery_backend, monkeypatch):
+    backend, _, _ = celery_backend
+    monkeypatch.setattr(task_backend, "WATCH_TIMEOUT", 0.05)
+    backend._watch("t3")
+    time.sleep(0.03)
+    backend._watch("t3")
+    time.sleep(0.03)
+    receiver = _Receiver()
+    backend._tick(receiver)
+    assert "t3" in backend._watching and not receiver.should_stop
+    time.sleep(0.06)
+    backend._tick(receiver)
+    assert "t3" not in backend._watching and receiver.should_stop